@@ -0,0 +1,282 @@
+import sys
+import os
+import asyncio
+from typing import Optional, List, Dict, Any, Sequence, Tuple
+
+# Add parent directory (and this directory, for the sibling modules) to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from web3utility import load_abi, cached_contract
+from async_web3utility import AsyncWeb3Utility
+from uniswap_utility import (
+    Uniutility,
+    UNISWAP_V3_ROUTER2_ADDRESS,
+    UNISWAP_V3_BASE_FACTORY,
+    UNI_V3_ROUTER2_ABI_PATH,
+    UNI_V3_FACTORY_ABI_PATH,
+    UNI_V3_FEE_TIERS,
+)
+from pool_index import PoolIndex
+
+
+class AsyncUniutility(AsyncWeb3Utility):
+    """
+    Async counterpart of Uniutility built on AsyncWeb3Utility.
+    Offline helpers (multicall/path decoding, path encoding) are shared with Uniutility.
+    """
+
+    INSTRUMENTED_METHODS = AsyncWeb3Utility.INSTRUMENTED_METHODS + (
+        "get_pool_address",
+        "index_pools",
+        "exact_input",
+        "exactInputSingle",
+        "exact_output",
+        "exactOutputSingle",
+        "multicall",
+    )
+
+    decode_multicall = Uniutility.decode_multicall
+    decode_multicall_path = Uniutility.decode_multicall_path
+    encode_path = Uniutility.encode_path
+    _missing_pool_keys = Uniutility._missing_pool_keys
+    router_decoder = Uniutility.router_decoder
+    router_encoder = Uniutility.router_encoder
+    encode_call = Uniutility.encode_call
+    encode_calls = Uniutility.encode_calls
+    decode_calls = Uniutility.decode_calls
+    gas_key = Uniutility.gas_key
+
+    def __init__(
+        self,
+        rpc_url: Optional[str] = None,
+        rpc_key: Optional[str] = None,
+        chain: Optional[str] = None,
+        contract_address: str = UNISWAP_V3_ROUTER2_ADDRESS,
+        abi: Optional[List[Dict[str, Any]]] = None,
+        user_address: Optional[str] = None,
+        metadata_db: Optional[str] = None,
+        provider_config: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Initialize the async Uniswap utility. Call ``await connect()`` (or use ``create``) before sending."""
+        super().__init__(
+            rpc_url=rpc_url,
+            rpc_key=rpc_key,
+            chain=chain,
+            contract_address=contract_address,
+            abi=abi if abi is not None else load_abi(UNI_V3_ROUTER2_ABI_PATH),
+            user_address=user_address,
+            metadata_db=metadata_db,
+            provider_config=provider_config
+        )
+        self.base_factory = self.w3.to_checksum_address(UNISWAP_V3_BASE_FACTORY)
+        self.pool_index = PoolIndex(metadata_db)
+        self._router_decoder = None
+        self._router_encoder = None
+
+    async def get_pool_address(self,
+                               tokenA: str = None,
+                               tokenB: str = None,
+                               poolFees: Dict[int, Any] = None) -> List[str]:
+        """Get pool addresses for token pairs with specified fees, served from the pool index when possible."""
+        tokenA = self.w3.to_checksum_address(tokenA)
+        tokenB = self.w3.to_checksum_address(tokenB)
+        await self.index_pools([tokenA, tokenB], poolFees)
+        chain_id = await self.get_chain_id()
+        return [self.pool_index.get(chain_id, tokenA, tokenB, poolFee) for poolFee in poolFees]
+
+    async def index_pools(
+        self,
+        tokens: List[str],
+        fees: Sequence[int] = UNI_V3_FEE_TIERS,
+        chunk_size: int = 500
+    ) -> Dict[Tuple[str, str, int], str]:
+        """Fill the pool index for every pair of ``tokens``, sending the getPool chunks concurrently."""
+        chain_id = await self.get_chain_id()
+        tokens, missing = self._missing_pool_keys(chain_id, tokens, fees)
+        factory = cached_contract(self.w3, self.base_factory, UNI_V3_FACTORY_ABI_PATH)
+        chunks = [missing[start:start + chunk_size] for start in range(0, len(missing), chunk_size)]
+        results = await asyncio.gather(*(
+            self.batch_call([factory.functions.getPool(*key) for key in chunk]) for chunk in chunks
+        ))
+        for chunk, pools in zip(chunks, results):
+            self.pool_index.set_many(chain_id, {key: pool for key, pool in zip(chunk, pools) if pool is not None})
+        return self.pool_index.pools(chain_id, tokens)
+
+    async def exact_input(
+        self,
+        path: List[str],
+        fee: int = 500,
+        pool_address: str = None,
+        path_forward: bool = True,
+        recipient: str = None,
+        amount_in: int = 0,
+        slippage: float = 0.05,
+        value: int = None,
+        gaslimit: bool = False
+    ) -> Dict[str, Any]:
+        """Execute exact input swap."""
+        encoded_path = self.encode_path(path, fee)
+
+        amount_out_minimum = (await self.simple_slippage(
+            path=path_forward,
+            pool_address=pool_address,
+            amount_in=amount_in,
+            slippage_percent=slippage
+        ))["min_amount_out"]
+
+        params = {
+            'path': encoded_path,
+            'recipient': recipient,
+            'amountIn': amount_in,
+            'amountOutMinimum': amount_out_minimum
+        }
+
+        encoded_data = self.encode_call("exactInput", [params])
+
+        if gaslimit:
+            gas_limit = await self.estimate_calldata_gas(encoded_data, value=value)
+            return {
+                "encoded_exactInput": encoded_data,
+                "gaslimit": gas_limit
+            }
+        return {"encoded_exactInput": encoded_data}
+
+    async def exactInputSingle(
+        self,
+        tokenIn: str = None,
+        tokenOut: str = None,
+        fee: int = None,
+        poolAddres: str = None,
+        path_forward: bool = True,
+        recipient: str = None,
+        amountIn: int = None,
+        sllipage: float = None,
+        sqrtPriceLimitX96: float = None,
+        value: int = None,
+        gaslimit: bool = False
+    ) -> Dict[str, Any]:
+        """Execute exact input single swap."""
+        pool_info = await self.simple_slippage(
+            pool_address=poolAddres,
+            path=path_forward,
+            amount_in=amountIn,
+            slippage_percent=sllipage
+        )
+
+        params = {
+            'tokenIn': tokenIn,
+            'tokenOut': tokenOut,
+            'fee': fee,
+            'recipient': recipient,
+            'amountIn': amountIn,
+            'amountOutMinimum': pool_info["min_amount_out"],
+            'sqrtPriceLimitX96': int(pool_info["sqrt_price_x96"] * (100 + sqrtPriceLimitX96) / 100)
+        }
+
+        encoded_data = self.encode_call("exactInputSingle", [params])
+
+        if gaslimit:
+            gas_limit = await self.estimate_calldata_gas(encoded_data, value=value)
+            return {
+                "encoded_exactInputsingle": encoded_data,
+                "gaslimit": gas_limit
+            }
+        return {"encoded_exactInputSingle": encoded_data}
+
+    async def exact_output(
+        self,
+        path: List[str],
+        fee: int = 500,
+        pool_address: str = None,
+        path_forward: bool = True,
+        recipient: str = None,
+        amount_out: int = 0,
+        amountInMaximum: float = 1.05,
+        value: int = None,
+        gaslimit: bool = False
+    ) -> Dict[str, Any]:
+        """Execute exact output swap."""
+        encoded_path = self.encode_path(path, fee)
+
+        amount_in_maximum = (await self.simple_slippage(
+            pool_address=pool_address,
+            path=path_forward,
+            amount_in=amount_out,
+            slippage_percent=amountInMaximum
+        ))["min_amount_out"]
+
+        params = {
+            "path": encoded_path,
+            "recipient": recipient,
+            "amountOut": amount_out,
+            "amountInMaximum": amount_in_maximum
+        }
+
+        encoded_data = self.encode_call("exactOutput", [params])
+
+        if gaslimit:
+            gas_limit = await self.estimate_calldata_gas(encoded_data, value=value)
+            return {
+                "encoded_exactOutput": encoded_data,
+                "gaslimit": gas_limit
+            }
+        return {"encoded_exactOutput": encoded_data}
+
+    async def exactOutputSingle(
+        self,
+        tokenIn: str = None,
+        tokenOut: str = None,
+        fee: int = None,
+        poolAddres: str = None,
+        path_forward: bool = True,
+        recipient: str = None,
+        amountOut: int = None,
+        amountInMaximum: float = None,
+        sqrtPriceLimitX96: float = None,
+        value: int = None,
+        gaslimit: bool = False
+    ) -> Dict[str, Any]:
+        """Execute exact output single swap."""
+        pool_info = await self.simple_slippage(
+            pool_address=poolAddres,
+            path=path_forward,
+            amount_in=amountOut,
+            slippage_percent=amountInMaximum
+        )
+
+        params = {
+            'tokenIn': tokenIn,
+            'tokenOut': tokenOut,
+            'fee': fee,
+            'recipient': recipient,
+            'amountOut': amountOut,
+            'amountInMaximum': pool_info["min_amount_out"],
+            'sqrtPriceLimitX96': int(pool_info["sqrt_price_x96"] * (100 + sqrtPriceLimitX96) / 100)
+        }
+
+        encoded_data = self.encode_call("exactOutputSingle", [params])
+
+        if gaslimit:
+            gas_limit = await self.estimate_calldata_gas(encoded_data, value=value)
+            return {
+                "encoded_exactOutputsingle": encoded_data,
+                "gaslimit": gas_limit
+            }
+        return {"encoded_exactOutputSingle": encoded_data}
+
+    async def multicall(
+        self,
+        data_list: List[bytes],
+        value: int = None,
+        gaslimit: bool = True
+    ) -> Dict[str, Any]:
+        """Execute multiple calls in a single transaction."""
+        encoded_data = self.encode_call("multicall", [data_list])
+
+        if gaslimit:
+            gas_limit = await self.estimate_calldata_gas(encoded_data, value=value)
+            return {
+                "encoded_multicall": encoded_data,
+                "gaslimit": gas_limit
+            }
+        return {"encoded_multicall": encoded_data}
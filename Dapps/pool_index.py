@@ -0,0 +1,169 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+"""
+PoolIndex class
+
+Persistent (token0, token1, fee) -> pool map for Uniswap V3 style factories.
+
+- Memory layer: dict keyed by (chain_id, token0, token1, fee), token pair sorted like the factory does
+- Persistent layer: sqlite, only when db_path is given (can share the MetadataCache file)
+- Tracks the last block scanned for PoolCreated logs per (chain_id, factory) for incremental refresh
+- Missing pools are stored as the zero address with the time they were checked; after missing_ttl seconds
+  get() treats them as unknown again so the next lookup re-checks the factory (PoolCreated backfill also
+  overwrites them)
+"""
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+# Seconds a "no pool" answer is trusted before getPool is asked again
+DEFAULT_MISSING_TTL = 3600
+
+
+def pool_key(token_a: str, token_b: str, fee: int) -> Tuple[str, str, int]:
+    """Order a token pair the way the factory does (by address value)."""
+    token0, token1 = sorted((token_a, token_b), key=lambda token: int(token, 16))
+    return token0, token1, int(fee)
+
+
+class PoolIndex:
+    def __init__(self, db_path: str = None, missing_ttl: float = DEFAULT_MISSING_TTL):
+        self.db_path = db_path
+        self.missing_ttl = missing_ttl
+        self._memory: Dict[Tuple[int, str, str, int], str] = {}
+        # (chain_id, token0, token1, fee) -> time the pool was found missing
+        self._missing_at: Dict[Tuple[int, str, str, int], float] = {}
+        self._last_blocks: Dict[Tuple[int, str], int] = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS pools ("
+                "chain_id INTEGER NOT NULL, "
+                "token0 TEXT NOT NULL, "
+                "token1 TEXT NOT NULL, "
+                "fee INTEGER NOT NULL, "
+                "pool TEXT NOT NULL, "
+                "PRIMARY KEY (chain_id, token0, token1, fee))"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS pool_index_state ("
+                "chain_id INTEGER NOT NULL, "
+                "factory TEXT NOT NULL, "
+                "last_block INTEGER NOT NULL, "
+                "PRIMARY KEY (chain_id, factory))"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS missing_pools ("
+                "chain_id INTEGER NOT NULL, "
+                "token0 TEXT NOT NULL, "
+                "token1 TEXT NOT NULL, "
+                "fee INTEGER NOT NULL, "
+                "checked_at REAL NOT NULL, "
+                "PRIMARY KEY (chain_id, token0, token1, fee))"
+            )
+            self._db.commit()
+            self._load()
+
+    def _load(self) -> None:
+        with self._lock:
+            for chain_id, token0, token1, fee, pool in self._db.execute(
+                "SELECT chain_id, token0, token1, fee, pool FROM pools"
+            ):
+                # Zero addresses written before missing_pools existed have no check time and are re-checked
+                if pool != ZERO_ADDRESS:
+                    self._memory[(chain_id, token0, token1, fee)] = pool
+            for chain_id, token0, token1, fee, checked_at in self._db.execute(
+                "SELECT chain_id, token0, token1, fee, checked_at FROM missing_pools"
+            ):
+                key = (chain_id, token0, token1, fee)
+                if key not in self._memory:
+                    self._memory[key] = ZERO_ADDRESS
+                    self._missing_at[key] = checked_at
+            for chain_id, factory, last_block in self._db.execute(
+                "SELECT chain_id, factory, last_block FROM pool_index_state"
+            ):
+                self._last_blocks[(chain_id, factory)] = last_block
+
+    def get(self, chain_id: int, token_a: str, token_b: str, fee: int) -> Optional[str]:
+        """Return the indexed pool (ZERO_ADDRESS if known not to exist) or None if never looked up.
+
+        A missing pool checked more than ``missing_ttl`` seconds ago is returned as None (unknown).
+        """
+        key = (chain_id, *pool_key(token_a, token_b, fee))
+        pool = self._memory.get(key)
+        if pool == ZERO_ADDRESS and time.time() - self._missing_at.get(key, 0.0) > self.missing_ttl:
+            return None
+        return pool
+
+    def set(self, chain_id: int, token_a: str, token_b: str, fee: int, pool: str) -> None:
+        self.set_many(chain_id, {pool_key(token_a, token_b, fee): pool})
+
+    def set_many(self, chain_id: int, entries: Dict[Tuple[str, str, int], str]) -> None:
+        """Store pools keyed by ``pool_key(token_a, token_b, fee)``; ZERO_ADDRESS records a missing pool."""
+        checked_at = time.time()
+        found, missing = [], []
+        for key, pool in entries.items():
+            self._memory[(chain_id, *key)] = pool
+            if pool == ZERO_ADDRESS:
+                self._missing_at[(chain_id, *key)] = checked_at
+                missing.append((chain_id, *key, checked_at))
+            else:
+                self._missing_at.pop((chain_id, *key), None)
+                found.append((chain_id, *key, pool))
+        if self._db is None or not entries:
+            return
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO pools (chain_id, token0, token1, fee, pool) VALUES (?, ?, ?, ?, ?)", found
+            )
+            self._db.executemany(
+                "DELETE FROM missing_pools WHERE chain_id = ? AND token0 = ? AND token1 = ? AND fee = ?",
+                [row[:4] for row in found]
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO missing_pools (chain_id, token0, token1, fee, checked_at) VALUES (?, ?, ?, ?, ?)",
+                missing
+            )
+            self._db.commit()
+
+    def pools(self, chain_id: int, tokens: Iterable[str] = None) -> Dict[Tuple[str, str, int], str]:
+        """Return every existing indexed pool on a chain, optionally limited to pairs within ``tokens``."""
+        token_set = set(tokens) if tokens is not None else None
+        return {
+            key[1:]: pool for key, pool in self._memory.items()
+            if key[0] == chain_id and pool != ZERO_ADDRESS
+            and (token_set is None or (key[1] in token_set and key[2] in token_set))
+        }
+
+    def last_block(self, chain_id: int, factory: str) -> Optional[int]:
+        return self._last_blocks.get((chain_id, factory))
+
+    def set_last_block(self, chain_id: int, factory: str, block_number: int) -> None:
+        self._last_blocks[(chain_id, factory)] = block_number
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pool_index_state (chain_id, factory, last_block) VALUES (?, ?, ?)",
+                (chain_id, factory, block_number)
+            )
+            self._db.commit()
+
+    def clear(self) -> None:
+        self._memory.clear()
+        self._missing_at.clear()
+        self._last_blocks.clear()
+        if self._db is not None:
+            with self._lock:
+                self._db.execute("DELETE FROM pools")
+                self._db.execute("DELETE FROM missing_pools")
+                self._db.execute("DELETE FROM pool_index_state")
+                self._db.commit()
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
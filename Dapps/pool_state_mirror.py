@@ -0,0 +1,158 @@
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from eth_utils import event_abi_to_log_topic
+
+from uniswap_v3_math import PoolSnapshot
+
+"""
+PoolStateMirror class
+
+Keeps PoolSnapshot copies of a fixed set of Uniswap V3 pools current from their Swap / Mint / Burn logs.
+
+- Pools are snapshotted once (slot0, liquidity, initialized ticks) with Uniutility.get_pool_snapshot
+- sync() reads the new head and fetches the logs of every mirrored pool in one eth_getLogs
+- Swap sets price / liquidity / tick; Mint and Burn update liquidityNet and the active liquidity
+- After each sync a checkpoint is kept (copy-on-write: only pools touched by a log are copied);
+  when the chain reorgs, state rolls back to the newest checkpoint still on the canonical chain
+- Pools whose price drifts to the edge of the loaded tick words are re-snapshotted
+"""
+
+
+class PoolStateMirror:
+    def __init__(self, uniutility, pool_addresses: List[str], word_radius: int = 2, checkpoints: int = 64):
+        self.uni = uniutility
+        self.w3 = uniutility.w3
+        self.word_radius = word_radius
+        self.pool_addresses = [self.w3.to_checksum_address(address) for address in pool_addresses]
+        self.pools: Dict[str, PoolSnapshot] = {}
+        self.block_number: Optional[int] = None
+        self.block_hash = None
+        self.checkpoints = deque(maxlen=checkpoints)
+
+        pool_abi = self.uni.load_pool_contract(self.pool_addresses[0]).abi if self.pool_addresses else []
+        self.events = {
+            event_abi_to_log_topic(event_abi): event_abi["name"]
+            for event_abi in pool_abi
+            if event_abi.get("type") == "event" and event_abi["name"] in ("Swap", "Mint", "Burn")
+        }
+        self._event_decoders = {}
+
+    def load(self) -> None:
+        """Snapshot every pool and start following from the current head."""
+        head = self.w3.eth.get_block("latest")
+        self.pools = {address: self._snapshot(address) for address in self.pool_addresses}
+        self._set_head(head)
+        self.checkpoints.clear()
+        self._checkpoint()
+
+    def _snapshot(self, address: str) -> PoolSnapshot:
+        return self.uni.get_pool_snapshot(address, word_radius=self.word_radius)
+
+    def sync(self) -> int:
+        """Bring the mirror up to the chain head; returns the number of logs applied."""
+        if self.block_number is None:
+            self.load()
+            return 0
+        head = self.w3.eth.get_block("latest")
+        if head["number"] == self.block_number and head["hash"] == self.block_hash:
+            return 0
+        if not (head["number"] == self.block_number + 1 and head["parentHash"] == self.block_hash):
+            if head["number"] <= self.block_number or self.w3.eth.get_block(self.block_number)["hash"] != self.block_hash:
+                self._rollback(head["number"])
+                if head["number"] <= self.block_number:
+                    return 0
+
+        if head["number"] == self.block_number + 1:
+            log_filter = {"blockHash": self.w3.to_hex(head["hash"])}
+        else:
+            log_filter = {"fromBlock": self.block_number + 1, "toBlock": head["number"]}
+        logs = self.w3.eth.get_logs({
+            "address": self.pool_addresses,
+            "topics": [[self.w3.to_hex(topic) for topic in self.events]],
+            **log_filter
+        })
+        self._apply_logs(logs)
+        self._set_head(head)
+        self._checkpoint()
+        return len(logs)
+
+    def _apply_logs(self, logs: List[Any]) -> None:
+        touched = set()
+        for log in sorted(logs, key=lambda log: (log["blockNumber"], log["logIndex"])):
+            address = self.w3.to_checksum_address(log["address"])
+            snapshot = self.pools.get(address)
+            if snapshot is None or log["blockNumber"] <= snapshot.block_number:
+                # Already included in the pool's snapshot
+                continue
+            if address not in touched:
+                snapshot = self.pools[address] = snapshot.copy()
+                touched.add(address)
+            event_name = self.events[bytes(log["topics"][0])]
+            args = self._decode(event_name, log)
+            if event_name == "Swap":
+                snapshot.apply_swap(args["sqrtPriceX96"], args["liquidity"], args["tick"])
+            elif event_name == "Mint":
+                snapshot.apply_liquidity(args["tickLower"], args["tickUpper"], args["amount"])
+            else:
+                snapshot.apply_liquidity(args["tickLower"], args["tickUpper"], -args["amount"])
+
+        for address in touched:
+            snapshot = self.pools[address]
+            current_word = (snapshot.tick // snapshot.tick_spacing) >> 8
+            if current_word <= snapshot.min_word or current_word >= snapshot.max_word:
+                self.pools[address] = self._snapshot(address)
+
+    def _decode(self, event_name: str, log: Any) -> Dict[str, Any]:
+        decoder = self._event_decoders.get(event_name)
+        if decoder is None:
+            pool = self.uni.load_pool_contract(self.pool_addresses[0])
+            decoder = self._event_decoders[event_name] = getattr(pool.events, event_name)()
+        return decoder.process_log(log)["args"]
+
+    def _rollback(self, head_number: int) -> None:
+        while self.checkpoints:
+            block_number, block_hash, pools = self.checkpoints[-1]
+            # Checkpoints above a head that went backwards are gone from the chain
+            if block_number <= head_number and self.w3.eth.get_block(block_number)["hash"] == block_hash:
+                self.block_number, self.block_hash = block_number, block_hash
+                self.pools = dict(pools)
+                print(f"PoolStateMirror: reorg detected, rolled back to block {block_number}")
+                return
+            self.checkpoints.pop()
+        print("PoolStateMirror: reorg deeper than the kept checkpoints, reloading snapshots")
+        self.load()
+
+    def _set_head(self, head: Any) -> None:
+        self.block_number = head["number"]
+        self.block_hash = head["hash"]
+
+    def _checkpoint(self) -> None:
+        self.checkpoints.append((self.block_number, self.block_hash, dict(self.pools)))
+
+    def snapshot(self, pool_address: str) -> PoolSnapshot:
+        """Current local state of a pool, usable as ``snapshot=`` for the tick-math quotes."""
+        return self.pools[self.w3.to_checksum_address(pool_address)]
+
+    def simple_slippage(self,
+                        pool_address: str,
+                        path: bool = True,
+                        amount_in: int = 0,
+                        slippage_percent: float = 0.5) -> dict:
+        """Same result as Web3Utility.simple_slippage, read from the mirrored slot0 without RPC calls."""
+        snapshot = self.snapshot(pool_address)
+        pool_metadata = {
+            "token0": snapshot.token0,
+            "token1": snapshot.token1,
+            "decimals0": snapshot.decimals0,
+            "decimals1": snapshot.decimals1,
+        }
+        return self.uni._calc_slippage(
+            [snapshot.sqrt_price_x96, snapshot.tick], pool_metadata, path, amount_in, slippage_percent
+        )
+
+    def quote_exact_input(self, pool_address: str, amount_in: int, zero_for_one: bool) -> int:
+        return self.snapshot(pool_address).quote_exact_input(amount_in, zero_for_one)
+
+    def quote_exact_output(self, pool_address: str, amount_out: int, zero_for_one: bool) -> int:
+        return self.snapshot(pool_address).quote_exact_output(amount_out, zero_for_one)
@@ -0,0 +1,187 @@
+from collections import namedtuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from eth_utils import function_abi_to_4byte_selector
+
+"""
+Quiet, high-throughput calldata decoder for router contracts.
+
+A decoder is compiled once per ABI function and stored in a 4-byte selector table. Calldata is
+read through a memoryview, so words are parsed in place instead of going through hex strings
+and eth_abi's stream decoder. Results are compact records: DecodedCall (``__slots__``) with the
+arguments as a namedtuple, and struct parameters as namedtuples named after the Solidity struct.
+Addresses are returned lowercase, as decode_multicall_path does.
+
+Every offset, array count and byte length is checked against the calldata size before it is used,
+so truncated or hostile calldata is rejected (decode returns None) instead of being read as zeros.
+"""
+
+Decoder = Callable[[memoryview, int, int], Any]
+
+
+class DecodedCall:
+    __slots__ = ("selector", "fn_name", "args", "calls")
+
+    def __init__(self, selector: bytes, fn_name: str, args: tuple, calls: tuple = ()):
+        self.selector = selector
+        self.fn_name = fn_name
+        self.args = args
+        self.calls = calls
+
+    def __repr__(self) -> str:
+        return f"DecodedCall({self.fn_name}, args={self.args!r}, calls={self.calls!r})"
+
+
+def _word(buf: memoryview, pos: int) -> int:
+    return int.from_bytes(buf[pos:pos + 32], "big")
+
+
+def _check(buf: memoryview, end: int) -> None:
+    """Reject a region ending past the calldata (memoryview slices would silently come back short)."""
+    if end > len(buf):
+        raise ValueError("Calldata is shorter than its offsets and lengths require")
+
+
+def _compile(abi_input: Dict[str, Any]) -> Tuple[Decoder, int, bool]:
+    """Return (decoder, head size, is_dynamic) for one ABI type.
+
+    Decoders take (buf, head position, base) where dynamic offsets are relative to ``base``.
+    """
+    abi_type = abi_input["type"]
+
+    if abi_type.endswith("]"):
+        element_type, _, length = abi_type[:-1].rpartition("[")
+        element, element_size, element_dynamic = _compile({**abi_input, "type": element_type})
+        if length:
+            count = int(length)
+            if element_dynamic:
+                def decode_fixed_array(buf, pos, base):
+                    start = base + _word(buf, pos)
+                    _check(buf, start + 32 * count)
+                    return tuple(element(buf, start + 32 * index, start) for index in range(count))
+                return decode_fixed_array, 32, True
+
+            def decode_static_array(buf, pos, base):
+                return tuple(element(buf, pos + element_size * index, base) for index in range(count))
+            return decode_static_array, element_size * count, False
+
+        step = 32 if element_dynamic else element_size
+
+        def decode_array(buf, pos, base):
+            start = base + _word(buf, pos)
+            _check(buf, start + 32)
+            count = _word(buf, start)
+            start += 32
+            _check(buf, start + step * count)
+            return tuple(element(buf, start + step * index, start) for index in range(count))
+        return decode_array, 32, True
+
+    if abi_type == "tuple":
+        components = abi_input["components"]
+        fields = [_compile(component) for component in components]
+        struct_name = (abi_input.get("internalType") or "tuple").split(".")[-1].replace("struct ", "")
+        record = namedtuple(struct_name, [component["name"] for component in components], rename=True)
+        dynamic = any(field_dynamic for _, _, field_dynamic in fields)
+        decode_fields = _sequence(fields)
+        head_size = sum(size for _, size, _ in fields)
+        if dynamic:
+            def decode_dynamic_tuple(buf, pos, base):
+                start = base + _word(buf, pos)
+                _check(buf, start + head_size)
+                return record._make(decode_fields(buf, start))
+            return decode_dynamic_tuple, 32, True
+
+        def decode_static_tuple(buf, pos, base):
+            return record._make(decode_fields(buf, pos))
+        return decode_static_tuple, head_size, False
+
+    if abi_type == "address":
+        return (lambda buf, pos, base: "0x" + buf[pos + 12:pos + 32].hex()), 32, False
+    if abi_type == "bool":
+        return (lambda buf, pos, base: buf[pos + 31] != 0), 32, False
+    if abi_type.startswith("uint"):
+        return (lambda buf, pos, base: int.from_bytes(buf[pos:pos + 32], "big")), 32, False
+    if abi_type.startswith("int"):
+        return (lambda buf, pos, base: int.from_bytes(buf[pos:pos + 32], "big", signed=True)), 32, False
+    if abi_type in ("bytes", "string"):
+        text = abi_type == "string"
+
+        def decode_bytes(buf, pos, base):
+            start = base + _word(buf, pos)
+            _check(buf, start + 32)
+            end = start + 32 + _word(buf, start)
+            _check(buf, end)
+            value = bytes(buf[start + 32:end])
+            return value.decode("utf-8") if text else value
+        return decode_bytes, 32, True
+    if abi_type.startswith("bytes"):
+        size = int(abi_type[5:])
+        return (lambda buf, pos, base: bytes(buf[pos:pos + size])), 32, False
+    raise ValueError(f"Unsupported ABI type: {abi_type}")
+
+
+def _sequence(fields: List[Tuple[Decoder, int, bool]]) -> Callable[[memoryview, int], tuple]:
+    """Decode consecutive head slots starting at ``start``, which is also the base for their offsets."""
+    offsets = []
+    position = 0
+    for decoder, size, _ in fields:
+        offsets.append((decoder, position))
+        position += size
+
+    def decode_fields(buf, start):
+        return tuple(decoder(buf, start + offset, start) for decoder, offset in offsets)
+    return decode_fields
+
+
+def decode_path(path: Union[bytes, memoryview]) -> Tuple[Tuple[str, ...], Tuple[int, ...]]:
+    """Split a packed V3 path into (tokens, fees) without building per-hop dicts."""
+    buf = memoryview(path)
+    if len(buf) < 43 or (len(buf) - 20) % 23:
+        raise ValueError("Invalid path length")
+    tokens = tuple("0x" + buf[position:position + 20].hex() for position in range(0, len(buf), 23))
+    fees = tuple(int.from_bytes(buf[position:position + 3], "big") for position in range(20, len(buf), 23))
+    return tokens, fees
+
+
+class RouterDecoder:
+    """Selector-dispatched decoder compiled from a router ABI."""
+
+    def __init__(self, abi: List[Dict[str, Any]]):
+        self.functions: Dict[bytes, Tuple[str, Callable[[memoryview, int], tuple], Any, Optional[int], int]] = {}
+        for item in abi:
+            if item.get("type") != "function":
+                continue
+            inputs = item["inputs"]
+            fields = [_compile(abi_input) for abi_input in inputs]
+            decode_fields = _sequence(fields)
+            args = namedtuple(item["name"], [abi_input["name"] for abi_input in inputs], rename=True)
+            # multicall(...bytes[] data): decode the inner calls as well
+            nested = next(
+                (index for index, abi_input in enumerate(inputs) if abi_input["type"] == "bytes[]"),
+                None
+            ) if item["name"] == "multicall" else None
+            head_size = sum(size for _, size, _ in fields)
+            self.functions[function_abi_to_4byte_selector(item)] = (item["name"], decode_fields, args, nested, head_size)
+
+    def decode(self, calldata: Union[str, bytes, memoryview]) -> Optional[DecodedCall]:
+        """Decode one call; returns None for unknown selectors or malformed calldata."""
+        if isinstance(calldata, str):
+            calldata = bytes.fromhex(calldata[2:] if calldata.startswith("0x") else calldata)
+        buf = memoryview(calldata)
+        function = self.functions.get(bytes(buf[:4]))
+        if function is None:
+            return None
+        fn_name, decode_fields, args, nested, head_size = function
+        if len(buf) < 4 + head_size:
+            return None
+        try:
+            values = args._make(decode_fields(buf, 4))
+        except (IndexError, ValueError):
+            return None
+        calls = tuple(self.decode(data) for data in values[nested]) if nested is not None else ()
+        return DecodedCall(bytes(buf[:4]), fn_name, values, calls)
+
+    def decode_many(self, calldatas: Iterable[Union[str, bytes, memoryview]]) -> List[Optional[DecodedCall]]:
+        """Decode a batch of calldata blobs (e.g. every router transaction in a block)."""
+        decode = self.decode
+        return [decode(calldata) for calldata in calldatas]
@@ -0,0 +1,195 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from eth_abi import decode as abi_decode
+from eth_utils import function_abi_to_4byte_selector
+
+"""
+RemoteSwapSimulator class
+
+Block-pinned, batched pre-flight checks for router calldata (exactInput, exactInputSingle, multicall, ...).
+
+- Execution happens on the node, not in-process: there is no embedded EVM and no local copy of contract
+  code or storage (py-evm is not a dependency). What is local is the per-block result cache, so a candidate
+  costs one batched round trip the first time and nothing afterwards
+
+- Every candidate is sent as an eth_call plus an eth_estimateGas at the pinned block number, and all
+  candidates that are not cached yet go out in a single JSON-RPC batch
+- Results are cached per (block, sender, router, calldata, value), so repeated simulations against the
+  same block make no RPC calls; pin() moves to a new block
+- Return data is decoded with the router ABI (multicall results are decoded per inner call) and
+  reverts are decoded to Error(string), Panic(uint256) or a custom error name
+- The raw responses can be saved with save() and replayed offline with load(); an offline utility
+  needs a loaded snapshot (or an explicit block number) because it cannot look up the head block
+- Newly fetched gas estimates are also written to the utility's gas estimate cache
+"""
+
+ERROR_SELECTOR = bytes.fromhex("08c379a0")
+PANIC_SELECTOR = bytes.fromhex("4e487b71")
+
+
+class SimulationResult:
+    __slots__ = ("success", "gas_used", "outputs", "revert_reason", "return_data", "block_number")
+
+    def __init__(self, success: bool, gas_used: Optional[int], outputs: Any, revert_reason: Optional[str],
+                 return_data: bytes, block_number: int):
+        self.success = success
+        self.gas_used = gas_used
+        self.outputs = outputs
+        self.revert_reason = revert_reason
+        self.return_data = return_data
+        self.block_number = block_number
+
+    def __repr__(self) -> str:
+        if self.success:
+            return f"SimulationResult(ok, gas_used={self.gas_used}, outputs={self.outputs}, block={self.block_number})"
+        return f"SimulationResult(reverted: {self.revert_reason}, block={self.block_number})"
+
+
+def _to_bytes(data: Union[str, bytes, None]) -> bytes:
+    if data is None:
+        return b""
+    if isinstance(data, str):
+        return bytes.fromhex(data[2:] if data.startswith("0x") else data)
+    return bytes(data)
+
+
+class RemoteSwapSimulator:
+    def __init__(self, uniutility, block_number: Optional[int] = None):
+        self.uni = uniutility
+        self.w3 = uniutility.w3
+        self.block_number = block_number
+        self.responses: Dict[Tuple, Tuple[dict, dict]] = {}
+        self.functions: Dict[bytes, Tuple[str, List[str], List[str]]] = {}
+        self.errors: Dict[bytes, Tuple[str, List[str]]] = {}
+        for item in uniutility.abi:
+            if item.get("type") == "function":
+                self.functions[function_abi_to_4byte_selector(item)] = (
+                    item["name"],
+                    uniutility._abi_types(item.get("outputs", [])),
+                    [output["name"] for output in item.get("outputs", [])],
+                )
+            elif item.get("type") == "error":
+                types = uniutility._abi_types(item["inputs"])
+                signature = f"{item['name']}({','.join(types)})"
+                self.errors[self.w3.keccak(text=signature)[:4]] = (item["name"], types)
+
+    def pin(self, block_identifier: Union[str, int] = "latest") -> int:
+        """Pin simulations to a block (the current head by default) and return its number.
+
+        Raises:
+            ValueError: The utility is offline and ``block_identifier`` is not a block number
+        """
+        if isinstance(block_identifier, int):
+            self.block_number = block_identifier
+        elif self.uni.offline:
+            raise ValueError(
+                f"Cannot resolve block {block_identifier!r} offline; load a snapshot or pin a block number"
+            )
+        else:
+            self.block_number = self.w3.eth.get_block(block_identifier)["number"]
+        return self.block_number
+
+    def simulate(self, calldata: Union[str, bytes], value: int = 0, to: Optional[str] = None) -> Optional[SimulationResult]:
+        return self.simulate_many([calldata], value, to)[0]
+
+    def simulate_many(
+        self,
+        calldatas: List[Union[str, bytes]],
+        value: int = 0,
+        to: Optional[str] = None
+    ) -> List[Optional[SimulationResult]]:
+        """Simulate many calldatas at the pinned block; uncached ones are fetched in one batch.
+
+        Returns:
+            One SimulationResult per calldata (None if it is missing from an offline snapshot)
+        """
+        if self.block_number is None:
+            self.pin()
+        to = to or self.uni.target_contract
+        keys = [
+            (self.block_number, self.uni.user_address, to, "0x" + _to_bytes(calldata).hex(), value)
+            for calldata in calldatas
+        ]
+        missing = list(dict.fromkeys(key for key in keys if key not in self.responses))
+        if missing:
+            if self.uni.offline:
+                print(f"RemoteSwapSimulator: {len(missing)} calls are not in the loaded snapshot")
+            else:
+                self._fetch(missing)
+        return [self._result(key) if key in self.responses else None for key in keys]
+
+    def _fetch(self, keys: List[Tuple]) -> None:
+        batch = []
+        for block_number, sender, to, calldata, value in keys:
+            tx = {"from": sender, "to": to, "data": calldata, "value": hex(value)}
+            batch += [("eth_call", [tx, hex(block_number)]), ("eth_estimateGas", [tx, hex(block_number)])]
+        responses = self.uni.rpc_batch_responses(batch)
+        for index, key in enumerate(keys):
+            call_response, gas_response = responses[2 * index], responses[2 * index + 1]
+            self.responses[key] = (call_response, gas_response)
+            if "error" not in call_response and "result" in gas_response:
+                # Builds with gaslimit=True reuse the simulated gas instead of estimating again
+                _, _, to, calldata, value = key
+                self.uni.gas_estimates.set(self.uni.gas_key(to, calldata, value), int(gas_response["result"], 16))
+
+    def _result(self, key: Tuple) -> SimulationResult:
+        block_number, _, _, calldata, _ = key
+        call_response, gas_response = self.responses[key]
+        if "error" in call_response:
+            error = call_response["error"]
+            revert_data = _to_bytes(error.get("data") if isinstance(error.get("data"), str) else None)
+            reason = self.decode_revert(revert_data) if revert_data else error.get("message")
+            return SimulationResult(False, None, None, reason, revert_data, block_number)
+
+        return_data = _to_bytes(call_response.get("result"))
+        gas_used = int(gas_response["result"], 16) if "result" in gas_response else None
+        outputs = self.decode_outputs(_to_bytes(calldata), return_data)
+        return SimulationResult(True, gas_used, outputs, None, return_data, block_number)
+
+    def decode_outputs(self, calldata: bytes, return_data: bytes) -> Any:
+        """Decode return data by the called function's outputs; multicall gives a list per inner call."""
+        function = self.functions.get(calldata[:4])
+        if function is None:
+            return return_data
+        fn_name, types, names = function
+        values = abi_decode(types, return_data)
+        if fn_name == "multicall":
+            decoded = self.uni.router_decoder.decode(calldata)
+            inner_calls = decoded.args[-1] if decoded is not None else []
+            return [self.decode_outputs(inner, result) for inner, result in zip(inner_calls, values[0])]
+        return {name or str(index): value for index, (name, value) in enumerate(zip(names, values))}
+
+    def decode_revert(self, revert_data: bytes) -> str:
+        selector = revert_data[:4]
+        try:
+            if selector == ERROR_SELECTOR:
+                return abi_decode(["string"], revert_data[4:])[0]
+            if selector == PANIC_SELECTOR:
+                return f"Panic(0x{abi_decode(['uint256'], revert_data[4:])[0]:02x})"
+            if selector in self.errors:
+                name, types = self.errors[selector]
+                return f"{name}{tuple(abi_decode(types, revert_data[4:]))}"
+        except Exception:
+            pass
+        return "0x" + revert_data.hex()
+
+    def save(self, path: str) -> int:
+        """Write the cached raw responses as a JSON snapshot; returns the number of entries."""
+        with open(path, "w") as f:
+            json.dump([[list(key), call, gas] for key, (call, gas) in self.responses.items()], f)
+        return len(self.responses)
+
+    def load(self, path: str) -> int:
+        """Load a snapshot written by save(); pins to its block when nothing is pinned yet."""
+        with open(path) as f:
+            entries = json.load(f)
+        for key, call, gas in entries:
+            self.responses[tuple(key)] = (call, gas)
+        if self.block_number is None and entries:
+            self.block_number = max(key[0] for key, _, _ in entries)
+        return len(entries)
+
+
+# Former name, kept for existing imports
+SwapSimulator = RemoteSwapSimulator
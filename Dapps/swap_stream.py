@@ -0,0 +1,363 @@
+import json
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from router_decoder import DecodedCall, RouterDecoder, decode_path
+
+"""
+Streaming pipeline that turns chain data into decoded Uniswap swap records.
+
+source (blocks / pending txs) -> router_transactions -> swap_records -> bounded queue -> consumer
+
+Sources are plain iterables of block dicts ({"number", "transactions": [{"hash", "from", "to", "input"}]}),
+so the RPC pollers below can be swapped for ReplaySource to run the pipeline offline.
+Each source runs in its own producer thread; the queue is bounded, so a slow consumer makes the
+producers wait instead of letting memory grow.
+
+A transaction that fails to decode is skipped and counted (SwapStream.stats), and the RPC sources retry
+failed requests with exponential backoff, so one bad transaction or a transient node error does not end
+a source.
+"""
+
+SWAP_FUNCTIONS = (
+    "exactInputSingle",
+    "exactInput",
+    "exactOutputSingle",
+    "exactOutput",
+    "swapExactTokensForTokens",
+    "swapTokensForExactTokens",
+)
+
+_END = object()
+# Seconds between retries of a failed RPC poll; doubles on each consecutive failure up to the maximum
+RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 30.0
+
+
+class SwapRecord:
+    """One swap leg from a router transaction.
+
+    For exact-input swaps ``amount_in`` is exact and ``amount_out`` is the minimum;
+    for exact-output swaps ``amount_out`` is exact and ``amount_in`` is the maximum.
+    ``tokens`` are in swap order; ``fees`` is None for V2 style paths.
+    """
+
+    __slots__ = (
+        "block_number", "tx_hash", "sender", "fn_name", "tokens", "fees",
+        "amount_in", "amount_out", "exact_input", "recipient", "pending",
+    )
+
+    def __init__(self, block_number, tx_hash, sender, fn_name, tokens, fees,
+                 amount_in, amount_out, exact_input, recipient, pending=False):
+        self.block_number = block_number
+        self.tx_hash = tx_hash
+        self.sender = sender
+        self.fn_name = fn_name
+        self.tokens = tokens
+        self.fees = fees
+        self.amount_in = amount_in
+        self.amount_out = amount_out
+        self.exact_input = exact_input
+        self.recipient = recipient
+        self.pending = pending
+
+    def __repr__(self) -> str:
+        return (f"SwapRecord({self.fn_name}, block={self.block_number}, tokens={self.tokens}, fees={self.fees}, "
+                f"amount_in={self.amount_in}, amount_out={self.amount_out})")
+
+
+def _hex(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return "0x" + bytes(value).hex()
+
+
+def router_transactions(blocks: Iterable[dict], router_address: str) -> Iterator[tuple]:
+    """Yield (block_number, tx, pending) for every transaction sent to ``router_address``."""
+    router_address = router_address.lower()
+    for block in blocks:
+        pending = block.get("pending", False)
+        for tx in block["transactions"]:
+            to = tx.get("to")
+            if to is not None and to.lower() == router_address:
+                yield block.get("number"), tx, pending
+
+
+def swap_records(transactions: Iterable[tuple], decoder: RouterDecoder,
+                 stats: Optional[Dict[str, int]] = None) -> Iterator[SwapRecord]:
+    """Decode router transactions and yield one SwapRecord per swap call (multicalls are flattened).
+
+    A transaction whose calls cannot be turned into records (e.g. a malformed path) is skipped and
+    counted in ``stats["decode_errors"]``; ``stats["records"]`` counts the records yielded.
+    """
+    if stats is None:
+        stats = {}
+    for block_number, tx, pending in transactions:
+        try:
+            decoded = decoder.decode(tx["input"])
+            if decoded is None:
+                continue
+            tx_hash = _hex(tx.get("hash"))
+            records = [
+                record for record in (
+                    _swap_record(call, block_number, tx_hash, tx.get("from"), pending) for call in _flatten(decoded)
+                )
+                if record is not None
+            ]
+        except (KeyError, AttributeError, TypeError, ValueError):
+            stats["decode_errors"] = stats.get("decode_errors", 0) + 1
+            continue
+        stats["records"] = stats.get("records", 0) + len(records)
+        yield from records
+
+
+def _flatten(decoded: DecodedCall) -> Iterator[DecodedCall]:
+    if decoded.calls:
+        for call in decoded.calls:
+            if call is not None:
+                yield from _flatten(call)
+    else:
+        yield decoded
+
+
+def _swap_record(call: DecodedCall, block_number, tx_hash, sender, pending) -> Optional[SwapRecord]:
+    fn_name = call.fn_name
+    if fn_name not in SWAP_FUNCTIONS:
+        return None
+    args = call.args
+    if fn_name == "exactInputSingle":
+        params = args.params
+        return SwapRecord(block_number, tx_hash, sender, fn_name, (params.tokenIn, params.tokenOut), (params.fee,),
+                          params.amountIn, params.amountOutMinimum, True, params.recipient, pending)
+    if fn_name == "exactOutputSingle":
+        params = args.params
+        return SwapRecord(block_number, tx_hash, sender, fn_name, (params.tokenIn, params.tokenOut), (params.fee,),
+                          params.amountInMaximum, params.amountOut, False, params.recipient, pending)
+    if fn_name == "exactInput":
+        params = args.params
+        tokens, fees = decode_path(params.path)
+        return SwapRecord(block_number, tx_hash, sender, fn_name, tokens, fees,
+                          params.amountIn, params.amountOutMinimum, True, params.recipient, pending)
+    if fn_name == "exactOutput":
+        params = args.params
+        # exactOutput paths are encoded from tokenOut back to tokenIn
+        tokens, fees = decode_path(params.path)
+        return SwapRecord(block_number, tx_hash, sender, fn_name, tokens[::-1], fees[::-1],
+                          params.amountInMaximum, params.amountOut, False, params.recipient, pending)
+    if fn_name == "swapExactTokensForTokens":
+        return SwapRecord(block_number, tx_hash, sender, fn_name, args.path, None,
+                          args.amountIn, args.amountOutMin, True, args.to, pending)
+    return SwapRecord(block_number, tx_hash, sender, fn_name, args.path, None,
+                      args.amountInMax, args.amountOut, False, args.to, pending)
+
+
+class _RetryingSource:
+    """Shared stop event and backoff for the RPC pollers; ``errors`` counts failed polls."""
+
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self.stopped = threading.Event()
+        self.errors = 0
+        self._delay = RETRY_DELAY
+
+    def _failed(self, error: Exception) -> None:
+        self.errors += 1
+        print(f"Error in {type(self).__name__} (retrying in {self._delay:g}s): {error}")
+        self.stopped.wait(self._delay)
+        self._delay = min(self._delay * 2, MAX_RETRY_DELAY)
+
+    def _succeeded(self) -> None:
+        self._delay = RETRY_DELAY
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+
+class RpcBlockSource(_RetryingSource):
+    """Poll a node for new blocks (with full transactions) starting after ``start_block``.
+
+    A failed request is retried with backoff; the block is not skipped.
+    """
+
+    def __init__(self, w3, start_block: Optional[int] = None, poll_interval: float = 1.0):
+        super().__init__(poll_interval)
+        self.w3 = w3
+        self.next_block = start_block
+
+    def __iter__(self) -> Iterator[dict]:
+        while not self.stopped.is_set():
+            try:
+                head = self.w3.eth.block_number
+                if self.next_block is None:
+                    self.next_block = head
+                while self.next_block <= head and not self.stopped.is_set():
+                    block = self.w3.eth.get_block(self.next_block, full_transactions=True)
+                    self._succeeded()
+                    yield block
+                    self.next_block += 1
+            except Exception as e:
+                self._failed(e)
+                continue
+            self.stopped.wait(self.poll_interval)
+
+
+class RpcPendingSource(_RetryingSource):
+    """Poll a pending-transaction filter; stops quietly on nodes that do not support it.
+
+    The new hashes of each poll are fetched with one eth_getTransactionByHash JSON-RPC batch through
+    ``utility.rpc_batch_responses`` (the pooled provider), so a busy poll is still one round trip.
+    A failed poll or fetch is retried with backoff on a new filter (nodes drop filters that are not polled).
+    """
+
+    def __init__(self, utility, poll_interval: float = 0.5):
+        super().__init__(poll_interval)
+        self.utility = utility
+        self.w3 = utility.w3
+
+    def __iter__(self) -> Iterator[dict]:
+        try:
+            pending_filter = self.w3.eth.filter("pending")
+        except Exception as e:
+            print(f"Pending transactions are not available: {e}")
+            return
+        while not self.stopped.is_set():
+            try:
+                if pending_filter is None:
+                    pending_filter = self.w3.eth.filter("pending")
+                tx_hashes = pending_filter.get_new_entries()
+                transactions = self._fetch(tx_hashes)
+                self._succeeded()
+            except Exception as e:
+                pending_filter = None
+                self._failed(e)
+                continue
+            if transactions:
+                yield {"number": None, "transactions": transactions, "pending": True}
+            self.stopped.wait(self.poll_interval)
+
+    def _fetch(self, tx_hashes: List[Any]) -> List[dict]:
+        if not tx_hashes:
+            return []
+        responses = self.utility.rpc_batch_responses(
+            [("eth_getTransactionByHash", [_hex(tx_hash)]) for tx_hash in tx_hashes]
+        )
+        # Hashes that were already mined or dropped come back as null (or an error) and are skipped
+        return [response["result"] for response in responses if response.get("result")]
+
+
+class ReplaySource:
+    """Replay blocks from a JSON-lines file (one block per line) or an in-memory list."""
+
+    def __init__(self, blocks: Any, delay: float = 0.0):
+        self.blocks = blocks
+        self.delay = delay
+
+    def __iter__(self) -> Iterator[dict]:
+        if isinstance(self.blocks, str):
+            with open(self.blocks) as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+                        if self.delay:
+                            time.sleep(self.delay)
+        else:
+            yield from self.blocks
+
+    @staticmethod
+    def record(blocks: Iterable[dict], path: str) -> int:
+        """Write blocks (e.g. from RpcBlockSource) as a replay fixture; returns the number written."""
+        count = 0
+        with open(path, "w") as f:
+            for block in blocks:
+                transactions = [
+                    {
+                        "hash": _hex(tx.get("hash")),
+                        "from": tx.get("from"),
+                        "to": tx.get("to"),
+                        "input": _hex(tx.get("input")),
+                    }
+                    for tx in block["transactions"] if not isinstance(tx, (bytes, str))
+                ]
+                f.write(json.dumps({"number": block.get("number"), "transactions": transactions}) + "\n")
+                count += 1
+        return count
+
+
+class SwapStream:
+    """Run sources through the decode pipeline in producer threads and iterate the swap records.
+
+    The queue holds at most ``max_queue`` records; producers block while it is full.
+    Iteration ends once every source is exhausted or close() is called.
+    ``stats`` counts records, skipped transactions (decode_errors) and sources that ended with an error.
+    """
+
+    def __init__(self, sources: List[Iterable[dict]], decoder: RouterDecoder, router_address: str,
+                 max_queue: int = 1000):
+        self.sources = sources
+        self.decoder = decoder
+        self.router_address = router_address
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.stopped = threading.Event()
+        self._threads: List[threading.Thread] = []
+        # One counter dict per producer thread, summed by the stats property
+        self._source_stats: List[Dict[str, int]] = []
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        totals = {"records": 0, "decode_errors": 0, "source_errors": 0}
+        for source_stats in self._source_stats:
+            for name, count in source_stats.items():
+                totals[name] += count
+        return totals
+
+    def start(self) -> "SwapStream":
+        for source in self.sources:
+            source_stats: Dict[str, int] = {}
+            self._source_stats.append(source_stats)
+            thread = threading.Thread(target=self._produce, args=(source, source_stats), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def _produce(self, source: Iterable[dict], stats: Dict[str, int]) -> None:
+        try:
+            for record in swap_records(router_transactions(source, self.router_address), self.decoder, stats):
+                if not self._put(record):
+                    return
+        except Exception as e:
+            stats["source_errors"] = 1
+            print(f"Error in swap stream source: {e}")
+        finally:
+            self._put(_END)
+
+    def _put(self, item: Any) -> bool:
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self) -> Iterator[SwapRecord]:
+        if not self._threads:
+            self.start()
+        remaining = len(self.sources)
+        while remaining and not self.stopped.is_set():
+            try:
+                item = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _END:
+                remaining -= 1
+                continue
+            yield item
+
+    def close(self) -> None:
+        self.stopped.set()
+        for source in self.sources:
+            stop = getattr(source, "stop", None)
+            if stop is not None:
+                stop()
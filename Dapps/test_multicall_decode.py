@@ -16,12 +16,13 @@ def main():
    """
    Uniswap V3のmulticallデコード機能をサンプルデータを使用してデモンストレーションします。
    """
-   # Uniswap utilityの初期化
+   # Uniswap utilityの初期化（デコードのみのため RPC を使わない offline モード）
    uni_bot = Uniutility(
        rpc_url=RPC_URL,
        rpc_key=RPC_KEY,
        chain=CHAIN,
-       user_address=USER_ADDRESS
+       user_address=USER_ADDRESS,
+       offline=True
    )
 
    # サンプル1: exactInputSingleを使用したシンプルなマルチコール
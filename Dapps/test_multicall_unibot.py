@@ -56,21 +56,13 @@ encoded_unwrapWETH9 = uni_bot.contract.encodeABI(fn_name="unwrapWETH9", args=[pa
 multicall_data = [encoded_exactInput, encoded_unwrapWETH9]
 print(multicall_data)
 
-# ガスリミットとガス料金の取得
+# ガスリミットの取得
 gaslimit = uni_bot.estimate_gas_limit(multicall_data, function_name="multicall")
-gasFees = uni_bot.get_block_gas_fees()
-
-# トランザクションの構築
-tx = uni_bot.contract.functions.multicall(multicall_data).build_transaction({
-   'from': uni_bot.user_address,
-   'gas': gaslimit,
-   'maxFeePerGas': gasFees['maxFeePerGas'],
-   'maxPriorityFeePerGas': gasFees['priorityFeePerGasMedian'],
-   'nonce': uni_bot.w3.eth.get_transaction_count(uni_bot.user_address),
-   'value': 0,
-   'type': '0x2',
-   'chainId': uni_bot.w3.eth.chain_id
-})
+
+# トランザクションの構築（from/type/chainId はテンプレートを再利用し、nonce とガス料金はローカルで払い出す）
+tx = uni_bot.contract.functions.multicall(multicall_data).build_transaction(
+   uni_bot.build_tx_params(gas_limit=gaslimit)
+)
 
 # # トランザクションの署名と送信
 # signed_tx = uni_bot.w3.eth.account.sign_transaction(tx, os.getenv("KEY"))
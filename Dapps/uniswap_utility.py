@@ -1,20 +1,267 @@
 import sys
 import os
+from decimal import Decimal
+from itertools import combinations
 from pathlib import Path
-from typing import Optional, List, Dict, Any
-import json
+from typing import Optional, List, Dict, Any, Tuple, Sequence, Union
+import numpy as np
+from eth_utils import to_bytes
 
-# Add parent directory to path for imports
+# Add parent directory (and this directory, for the sibling modules) to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from web3utility import Web3Utility
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from web3utility import Web3Utility, load_abi, cached_contract
+from rpc_metrics import report_error
+from uniswap_v3_math import PoolSnapshot, compute_swap_step, MIN_SQRT_RATIO, MAX_SQRT_RATIO
+from pool_index import PoolIndex, pool_key
+from router_decoder import RouterDecoder, DecodedCall, decode_path
+from abi_encoder import ContractEncoder
+from swap_stream import SwapStream, RpcBlockSource, RpcPendingSource
+from pool_state_mirror import PoolStateMirror
+from swap_simulator import RemoteSwapSimulator
+from v2_dex import V2DexQuoter
 
 # Constants
 UNISWAP_V3_ROUTER2_ADDRESS = '0x68b3465833fb72A70ecDF485E0e4C7bD8665Fc45'
 UNISWAP_V3_BASE_FACTORY = '0x33128a8fC17869897dcE68Ed026d694621f6FDfD'
+UNI_V3_ROUTER2_ABI_PATH = 'Dapps/UniswapAbi/UniswapV3Router2.json'
+UNI_V3_FACTORY_ABI_PATH = 'Dapps/UniswapAbi/UniswapV3_factroy_abi.json'
+UNI_V3_FEE_TIERS = (100, 500, 3000, 10000)
+POOL_CREATED_SIGNATURE = 'PoolCreated(address,address,uint24,int24,address)'
 
-# Load ABI
-with open('Dapps/UniswapAbi/UniswapV3Router2.json', mode='r') as file:
-    UNI_V3_ROUTER2_ABI = json.load(file)
+
+
+def __getattr__(name: str) -> Any:
+    # The router ABI is parsed on first use instead of at import time
+    if name == "UNI_V3_ROUTER2_ABI":
+        return load_abi(UNI_V3_ROUTER2_ABI_PATH)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def encode_packed_path(tokens: Sequence[str], fees: Sequence[int]) -> bytes:
+    """Pack token(20) + fee(3) + token(20) + ... as read by exactInput/exactOutput.
+
+    Token addresses may be given with or without the 0x prefix.
+    """
+    if len(tokens) != len(fees) + 1:
+        raise ValueError("A path needs exactly one fee between each pair of tokens")
+    encoded = _address_bytes(tokens[0])
+    for fee, token in zip(fees, tokens[1:]):
+        encoded += fee.to_bytes(3, "big") + _address_bytes(token)
+    return encoded
+
+
+def _address_bytes(token: str) -> bytes:
+    address = to_bytes(hexstr=token)
+    if len(address) != 20:
+        raise ValueError(f"Invalid token address in path: {token!r}")
+    return address
+
+
+def _gas_shape(call: Optional[DecodedCall]) -> tuple:
+    """(function, hops, (token_in, token_out)) of a router call; multicall gives the shapes of its calls."""
+    if call is None:
+        return (None,)
+    if call.calls:
+        return (call.fn_name, tuple(_gas_shape(inner) for inner in call.calls))
+    args = call.args
+    if call.fn_name in ("exactInputSingle", "exactOutputSingle"):
+        return (call.fn_name, 1, (args.params.tokenIn, args.params.tokenOut))
+    if call.fn_name in ("exactInput", "exactOutput"):
+        tokens, fees = decode_path(args.params.path)
+        return (call.fn_name, len(fees), (tokens[0], tokens[-1]))
+    path = getattr(args, "path", None)
+    if isinstance(path, tuple) and len(path) > 1:
+        # V2 style swaps
+        return (call.fn_name, len(path) - 1, (path[0], path[-1]))
+    return (call.fn_name,)
+
+
+class RouteGraph:
+    """Token graph over Uniswap V3 pools for local multi-hop routing.
+
+    Each pool adds two directed edges priced from its current in-range liquidity, i.e. the
+    constant-product virtual reserves ``L / sqrtP`` and ``L * sqrtP``. Route search relaxes every
+    edge once per hop with NumPy, and the chosen routes are re-quoted with the exact integer
+    swap step. Tick crossings are not modelled; confirm large trades with tick_math_slippage.
+    """
+
+    def __init__(
+        self,
+        pools: Dict[Tuple[str, str, int], str],
+        states: Dict[str, Tuple[int, int]],
+        block_number: Optional[int] = None
+    ) -> None:
+        """Build the graph.
+
+        Args:
+            pools: Pools keyed by (token0, token1, fee), as returned by PoolIndex.pools
+            states: (sqrt_price_x96, liquidity) per pool address
+            block_number: Block the states were read at
+        """
+        self.block_number = block_number
+        self.tokens: List[str] = []
+        self.token_ids: Dict[str, int] = {}
+        self.edges: List[Tuple[int, int, int, str, int, int, bool]] = []
+        self._pair_edges: Dict[Tuple[int, int], List[int]] = {}
+        for (token0, token1, fee), pool in pools.items():
+            sqrt_price_x96, liquidity = states.get(pool, (0, 0))
+            if not sqrt_price_x96 or not liquidity:
+                continue
+            id0, id1 = self._token_id(token0), self._token_id(token1)
+            for src, dst, zero_for_one in ((id0, id1, True), (id1, id0, False)):
+                self._pair_edges.setdefault((src, dst), []).append(len(self.edges))
+                self.edges.append((src, dst, fee, pool, sqrt_price_x96, liquidity, zero_for_one))
+
+        self.src = np.array([edge[0] for edge in self.edges], dtype=np.int64)
+        self.dst = np.array([edge[1] for edge in self.edges], dtype=np.int64)
+        self.fee_factor = 1 - np.array([edge[2] for edge in self.edges], dtype=np.float64) / 1e6
+        sqrt_price = np.array([float(edge[4]) for edge in self.edges], dtype=np.float64) / 2 ** 96
+        liquidity = np.array([float(edge[5]) for edge in self.edges], dtype=np.float64)
+        zero_for_one = np.array([edge[6] for edge in self.edges], dtype=bool)
+        reserve0 = liquidity / sqrt_price if self.edges else liquidity
+        reserve1 = liquidity * sqrt_price
+        self.reserve_in = np.where(zero_for_one, reserve0, reserve1)
+        self.reserve_out = np.where(zero_for_one, reserve1, reserve0)
+
+    def _token_id(self, token: str) -> int:
+        token_id = self.token_ids.get(token)
+        if token_id is None:
+            token_id = self.token_ids[token] = len(self.tokens)
+            self.tokens.append(token)
+        return token_id
+
+    def best_route(
+        self,
+        token_in: str,
+        token_out: str,
+        amount_in: int,
+        max_hops: int = 3
+    ) -> Optional[Dict[str, Any]]:
+        """Return the 1..max_hops route with the highest output, or None if the tokens are not connected."""
+        candidates = self._search(token_in, token_out, amount_in, max_hops)
+        if not candidates:
+            return None
+        routes = [self._route(edges, amount_in) for _, edges in candidates]
+        return max(routes, key=lambda route: route["amount_out"])
+
+    def split_route(
+        self,
+        token_in: str,
+        token_out: str,
+        amount_in: int,
+        max_hops: int = 3,
+        parts: int = 20
+    ) -> Optional[Dict[str, Any]]:
+        """Split ``amount_in`` across the direct fee-tier pools and the best pool-disjoint multi-hop routes.
+
+        The amount is allocated greedily in ``parts`` chunks, each going to the route with the
+        highest marginal output.
+
+        Returns:
+            Dict with the per-route ``routes`` (only those that received an amount) and the totals
+        """
+        source = self.token_ids.get(token_in)
+        target = self.token_ids.get(token_out)
+        if source is None or target is None:
+            return None
+        candidates = [[edge] for edge in self._pair_edges.get((source, target), [])]
+        used_pools = {self.edges[edge][3] for edge in self._pair_edges.get((source, target), [])}
+        for _, edges in sorted(self._search(token_in, token_out, amount_in, max_hops), reverse=True):
+            pools = {self.edges[edge][3] for edge in edges}
+            if len(edges) > 1 and not pools & used_pools:
+                candidates.append(edges)
+                used_pools |= pools
+        if not candidates:
+            return None
+
+        allocation = [0] * len(candidates)
+        outputs = [0.0] * len(candidates)
+        chunk = amount_in // parts
+        for part in range(parts):
+            size = chunk if part < parts - 1 else amount_in - chunk * (parts - 1)
+            quotes = [self._quote_float(edges, allocated + size) for edges, allocated in zip(candidates, allocation)]
+            best = max(range(len(candidates)), key=lambda index: quotes[index] - outputs[index])
+            allocation[best] += size
+            outputs[best] = quotes[best]
+
+        routes = [self._route(edges, allocated) for edges, allocated in zip(candidates, allocation) if allocated]
+        return {
+            "routes": routes,
+            "amount_in": amount_in,
+            "amount_out": sum(route["amount_out"] for route in routes),
+            "block_number": self.block_number,
+        }
+
+    def _search(self, token_in: str, token_out: str, amount_in: int, max_hops: int) -> List[Tuple[float, List[int]]]:
+        """Relax all edges once per hop, keeping the best amount per token; returns one route per hop count."""
+        source = self.token_ids.get(token_in)
+        target = self.token_ids.get(token_out)
+        if source is None or target is None or source == target or not self.edges:
+            return []
+        best = np.zeros(len(self.tokens))
+        best[source] = float(amount_in)
+        parents = []
+        candidates = []
+        for _ in range(max_hops):
+            amounts = best[self.src] * self.fee_factor
+            out = self.reserve_out * amounts / (self.reserve_in + amounts)
+            # Highest output edge into each destination token
+            order = np.lexsort((out, self.dst))
+            dst_sorted = self.dst[order]
+            winners = order[np.flatnonzero(np.append(dst_sorted[1:] != dst_sorted[:-1], True))]
+            best = np.zeros(len(self.tokens))
+            parent = np.full(len(self.tokens), -1, dtype=np.int64)
+            best[self.dst[winners]] = out[winners]
+            parent[self.dst[winners]] = winners
+            parents.append(parent)
+            if best[target] > 0:
+                edges = self._walk(parents, target)
+                if edges is not None:
+                    candidates.append((float(best[target]), edges))
+            best[source] = 0.0
+            best[target] = 0.0
+        return candidates
+
+    def _walk(self, parents: List[np.ndarray], target: int) -> Optional[List[int]]:
+        edges = []
+        token = target
+        for parent in reversed(parents):
+            edge = int(parent[token])
+            edges.append(edge)
+            token = self.edges[edge][0]
+        edges.reverse()
+        pools = [self.edges[edge][3] for edge in edges]
+        return edges if len(set(pools)) == len(pools) else None
+
+    def _quote_float(self, edges: List[int], amount_in: float) -> float:
+        amount = float(amount_in)
+        for edge in edges:
+            amount *= self.fee_factor[edge]
+            amount = self.reserve_out[edge] * amount / (self.reserve_in[edge] + amount)
+        return amount
+
+    def quote_exact(self, edges: List[int], amount_in: int) -> int:
+        """Quote a route with the integer V3 swap step, staying within each pool's current range."""
+        amount = amount_in
+        for edge in edges:
+            _, _, fee, _, sqrt_price_x96, liquidity, zero_for_one = self.edges[edge]
+            sqrt_ratio_target = MIN_SQRT_RATIO + 1 if zero_for_one else MAX_SQRT_RATIO - 1
+            amount = compute_swap_step(sqrt_price_x96, sqrt_ratio_target, liquidity, amount, fee)[2]
+        return amount
+
+    def _route(self, edges: List[int], amount_in: int) -> Dict[str, Any]:
+        tokens = [self.tokens[self.edges[edges[0]][0]]] + [self.tokens[self.edges[edge][1]] for edge in edges]
+        fees = [self.edges[edge][2] for edge in edges]
+        return {
+            "tokens": tokens,
+            "fees": fees,
+            "pools": [self.edges[edge][3] for edge in edges],
+            "amount_in": amount_in,
+            "amount_out": self.quote_exact(edges, amount_in),
+            "encoded_path": encode_packed_path(tokens, fees),
+            "block_number": self.block_number,
+        }
 
 
 class Uniutility(Web3Utility):
@@ -23,14 +270,32 @@ class Uniutility(Web3Utility):
     Provides methods for decoding multicall data and path encoding/decoding.
     """
 
+    INSTRUMENTED_METHODS = Web3Utility.INSTRUMENTED_METHODS + (
+        "get_pool_address",
+        "index_pools",
+        "get_pool_snapshot",
+        "find_route",
+        "tick_math_slippage",
+        "tick_math_slippage_batch",
+        "exact_input",
+        "exactInputSingle",
+        "exact_output",
+        "exactOutputSingle",
+        "multicall",
+    )
+
     def __init__(
         self,
         rpc_url: Optional[str] = None,
         rpc_key: Optional[str] = None,
         chain: Optional[str] = None,
         contract_address: str = UNISWAP_V3_ROUTER2_ADDRESS,
-        abi: List[Dict[str, Any]] = UNI_V3_ROUTER2_ABI,
-        user_address: Optional[str] = None
+        abi: Optional[List[Dict[str, Any]]] = None,
+        user_address: Optional[str] = None,
+        metadata_db: Optional[str] = None,
+        lazy: bool = False,
+        offline: bool = False,
+        provider_config: Optional[Dict[str, Any]] = None
     ) -> None:
         """Initialize the Uniswap utility.
         
@@ -39,18 +304,126 @@ class Uniutility(Web3Utility):
             rpc_key: RPC API key
             chain: Blockchain network name
             contract_address: Uniswap V3 Router contract address
-            abi: Contract ABI
+            abi: Contract ABI (defaults to the Uniswap V3 Router02 ABI)
             user_address: User's wallet address
+            metadata_db: Optional sqlite path for the persistent token/pool metadata cache and pool index
+            lazy: Defer gas fees, chain id and the connection check until first use
+            offline: Skip RPC entirely; only encoding/decoding is available
+            provider_config: HTTP session settings (pool size, timeout, batch size) for the pooled provider
         """
         super().__init__(
             rpc_url=rpc_url,
             rpc_key=rpc_key,
             chain=chain,
             contract_address=contract_address,
-            abi=abi,
-            user_address=user_address
+            abi=abi if abi is not None else load_abi(UNI_V3_ROUTER2_ABI_PATH),
+            user_address=user_address,
+            metadata_db=metadata_db,
+            lazy=lazy,
+            offline=offline,
+            provider_config=provider_config
         )
         self.base_factory = self.w3.to_checksum_address(UNISWAP_V3_BASE_FACTORY)
+        self.pool_index = PoolIndex(metadata_db)
+        self._router_decoder = None
+        self._router_encoder = None
+
+    @classmethod
+    def from_session(
+        cls,
+        session: Any,
+        contract_address: str = UNISWAP_V3_ROUTER2_ADDRESS,
+        abi: Optional[List[Dict[str, Any]]] = None,
+        user_address: Optional[str] = None
+    ) -> "Uniutility":
+        """Lightweight view bound to a ChainSession from session_manager.
+
+        The connection, gas oracle, metadata cache, pool index, router contract and decoder are
+        shared with every other view of the same chain; creating a view makes no RPC calls.
+        """
+        return super().from_session(
+            session,
+            contract_address=contract_address,
+            abi=abi if abi is not None else load_abi(UNI_V3_ROUTER2_ABI_PATH),
+            user_address=user_address
+        )
+
+    def _bind_session(self, session: Any, contract_address: str, abi: List[Dict[str, Any]], user_address: str) -> None:
+        super()._bind_session(session, contract_address, abi, user_address)
+        self.base_factory = session.to_checksum_address(UNISWAP_V3_BASE_FACTORY)
+        self.pool_index = session.shared("pool_index", lambda: PoolIndex(session.metadata_db))
+        self._router_decoder = session.shared(("router_decoder", id(abi)), lambda: RouterDecoder(abi))
+        self._router_encoder = session.shared(("router_encoder", id(abi)), lambda: ContractEncoder(abi))
+
+    @property
+    def router_decoder(self) -> RouterDecoder:
+        """Selector-table decoder for the router ABI, compiled on first use."""
+        if self._router_decoder is None:
+            self._router_decoder = RouterDecoder(self.abi)
+        return self._router_decoder
+
+    @property
+    def router_encoder(self) -> ContractEncoder:
+        """Precompiled encoders (selector plus type-specialized packers) for the router ABI."""
+        if self._router_encoder is None:
+            self._router_encoder = ContractEncoder(self.abi)
+        return self._router_encoder
+
+    def encode_call(self, fn_name: str, args: List[Any]) -> str:
+        """Same calldata as ``contract.encodeABI(fn_name=..., args=...)``, from the precompiled encoder.
+
+        Overloads are picked by argument count, or pass a full signature such as
+        ``"multicall(uint256,bytes[])"``. Repeated argument sets are served from a memo.
+        """
+        return "0x" + self.router_encoder.encode(fn_name, args).hex()
+
+    def encode_calls(self, fn_name: str, args_list: List[List[Any]]) -> List[str]:
+        """Encode many argument sets for one router function in a single pass.
+
+        Example:
+            calls = uni.encode_calls("exactInputSingle", [[params] for params in candidates])
+            uni.multicall(calls, gaslimit=False)
+        """
+        return ["0x" + calldata.hex() for calldata in self.router_encoder.encode_many(fn_name, args_list)]
+
+    def gas_key(self, to: str, calldata: str, value: Union[int, str] = None) -> tuple:
+        """Gas cache key from the sender, value and call shape: function, hop count and token pair (nested for multicall)."""
+        decoded = self.router_decoder.decode(calldata)
+        if decoded is None:
+            return Web3Utility.gas_key(self, to, calldata, value)
+        return (self.user_address, self._gas_value(value), to, _gas_shape(decoded))
+
+    def decode_calls(self, calldatas: List[Any]) -> List[Optional[DecodedCall]]:
+        """Quietly decode many router calldata blobs (hex or bytes); unknown selectors give None.
+
+        Unlike decode_multicall nothing is printed, and multicall payloads come back with their
+        inner calls decoded in ``calls``.
+        """
+        return self.router_decoder.decode_many(calldatas)
+
+    def stream_swaps(
+        self,
+        sources: Optional[List[Any]] = None,
+        pending: bool = False,
+        start_block: Optional[int] = None,
+        max_queue: int = 1000
+    ) -> SwapStream:
+        """Stream decoded swaps sent to the router.
+
+        Args:
+            sources: Block sources (e.g. ReplaySource for offline runs); defaults to polling new blocks
+            pending: Also poll pending transactions when using the default sources
+            start_block: First block for the default block poller (defaults to the head)
+            max_queue: Maximum buffered swap records before producers wait
+
+        Returns:
+            SwapStream; iterate it for SwapRecord objects and call close() to stop
+        """
+        if sources is None:
+            sources = [RpcBlockSource(self.w3, start_block=start_block)]
+            if pending:
+                sources.append(RpcPendingSource(self))
+        return SwapStream(sources, self.router_decoder, self.target_contract, max_queue).start()
 
     def decode_multicall(self, input_data: str) -> Dict[str, Any]:
         """Decode Uniswap V3 multicall transaction input data.
@@ -109,32 +482,436 @@ class Uniutility(Web3Utility):
 
         return decoded_path
 
+    def encode_path(self, path: List[str], fee: Union[int, Sequence[int]]) -> bytes:
+        """Pack a path as token(20) + fee(3) + token(20) ...; ``fee`` is one fee per hop (or an int for one hop)."""
+        return encode_packed_path(path, [fee] if isinstance(fee, int) else list(fee))
+
     def get_pool_address(self, 
                         tokenA: str = None,
                         tokenB: str = None,
                         poolFees: Dict[int, Any] = None) -> List[str]:
-        """Get pool addresses for token pairs with specified fees."""
-        with open("Dapps/UniswapAbi/UniswapV3_factroy_abi.json", mode="r") as file:
-            uniswapV3_factroy_abi = json.load(file)
-            
-        uniV3_factory = self.w3.eth.contract(
-            address=self.base_factory,
-            abi=uniswapV3_factroy_abi
-        )
-        
-        pools = []
-        for poolFee in poolFees:
-            pool = uniV3_factory.functions.getPool(
-                tokenA,
-                tokenB,
-                poolFee
-            ).call()
-            pools.append(pool)
-        return pools
+        """Get pool addresses for token pairs with specified fees.
+
+        Indexed pairs are answered from the pool index; unknown fee tiers are fetched in one batch.
+        """
+        tokenA = self.w3.to_checksum_address(tokenA)
+        tokenB = self.w3.to_checksum_address(tokenB)
+        self.index_pools([tokenA, tokenB], poolFees)
+        chain_id = self.get_chain_id()
+        return [self.pool_index.get(chain_id, tokenA, tokenB, poolFee) for poolFee in poolFees]
+
+    def index_pools(
+        self,
+        tokens: List[str],
+        fees: Sequence[int] = UNI_V3_FEE_TIERS,
+        chunk_size: int = 500
+    ) -> Dict[Tuple[str, str, int], str]:
+        """Fill the pool index for every pair of ``tokens`` across ``fees``.
+
+        Only pairs missing from the index are queried, with ``getPool`` batched through
+        Multicall3 in chunks of ``chunk_size`` calls.
+
+        Args:
+            tokens: Token addresses to pair with each other
+            fees: Fee tiers to look up
+            chunk_size: Maximum getPool calls per aggregate3 request
+
+        Returns:
+            Existing pools among ``tokens`` keyed by (token0, token1, fee)
+        """
+        chain_id = self.get_chain_id()
+        tokens, missing = self._missing_pool_keys(chain_id, tokens, fees)
+        factory = cached_contract(self.w3, self.base_factory, UNI_V3_FACTORY_ABI_PATH)
+        for start in range(0, len(missing), chunk_size):
+            chunk = missing[start:start + chunk_size]
+            pools = self.batch_call([factory.functions.getPool(*key) for key in chunk])
+            self.pool_index.set_many(chain_id, {key: pool for key, pool in zip(chunk, pools) if pool is not None})
+        return self.pool_index.pools(chain_id, tokens)
+
+    def _missing_pool_keys(
+        self,
+        chain_id: int,
+        tokens: List[str],
+        fees: Sequence[int]
+    ) -> Tuple[List[str], List[Tuple[str, str, int]]]:
+        tokens = list(dict.fromkeys(self.w3.to_checksum_address(token) for token in tokens))
+        missing = [
+            key for key in (pool_key(token_a, token_b, fee) for token_a, token_b in combinations(tokens, 2) for fee in fees)
+            if self.pool_index.get(chain_id, *key) is None
+        ]
+        return tokens, missing
+
+    def backfill_pools(
+        self,
+        from_block: Optional[int] = None,
+        to_block: Optional[int] = None,
+        block_range: int = 10000
+    ) -> int:
+        """Index pools from the factory's PoolCreated logs.
+
+        Resumes from the block after the last one indexed, so repeated calls only scan new blocks.
+        Also corrects pairs previously recorded as missing.
+
+        Args:
+            from_block: First block to scan (defaults to the last indexed block + 1, or 0)
+            to_block: Last block to scan (defaults to the current head)
+            block_range: Blocks per eth_getLogs request
+
+        Returns:
+            Number of PoolCreated events indexed
+        """
+        chain_id = self.get_chain_id()
+        if from_block is None:
+            last_block = self.pool_index.last_block(chain_id, self.base_factory)
+            from_block = 0 if last_block is None else last_block + 1
+        if to_block is None:
+            to_block = self.w3.eth.block_number
+
+        event = cached_contract(self.w3, self.base_factory, UNI_V3_FACTORY_ABI_PATH).events.PoolCreated()
+        topic = self.w3.keccak(text=POOL_CREATED_SIGNATURE).hex()
+        indexed = 0
+        for start in range(from_block, to_block + 1, block_range):
+            end = min(start + block_range - 1, to_block)
+            logs = self.w3.eth.get_logs({
+                "address": self.base_factory,
+                "topics": [topic],
+                "fromBlock": start,
+                "toBlock": end,
+            })
+            entries = {}
+            for log in logs:
+                args = event.process_log(log)["args"]
+                entries[pool_key(args["token0"], args["token1"], args["fee"])] = args["pool"]
+            self.pool_index.set_many(chain_id, entries)
+            self.pool_index.set_last_block(chain_id, self.base_factory, end)
+            indexed += len(entries)
+        return indexed
     
+    def load_route_graph(
+        self,
+        tokens: Optional[List[str]] = None,
+        block_identifier: Union[str, int] = "latest",
+        chunk_size: int = 250
+    ) -> RouteGraph:
+        """Build a RouteGraph from the indexed pools with slot0 and liquidity pinned to one block.
+
+        Args:
+            tokens: Limit the graph to pools between these tokens (defaults to every indexed pool)
+            block_identifier: Block to read pool state at
+            chunk_size: Pools per aggregate3 request
+
+        Returns:
+            RouteGraph ready for best_route / split_route
+        """
+        pools = self.pool_index.pools(self.get_chain_id(), tokens)
+        addresses = list(dict.fromkeys(pools.values()))
+        block_number = self.w3.eth.block_number if block_identifier == "latest" else block_identifier
+        states = {}
+        for start in range(0, len(addresses), chunk_size):
+            chunk = addresses[start:start + chunk_size]
+            calls = []
+            for address in chunk:
+                pool = self.load_pool_contract(address)
+                calls += [pool.functions.slot0(), pool.functions.liquidity()]
+            results = self.batch_call(calls, block_identifier=block_number)
+            for index, address in enumerate(chunk):
+                slot0, liquidity = results[2 * index], results[2 * index + 1]
+                if slot0 is not None and liquidity is not None:
+                    states[address] = (slot0[0], liquidity)
+        return RouteGraph(pools, states, block_number)
+
+    def find_route(
+        self,
+        token_in: str,
+        token_out: str,
+        amount_in: int,
+        max_hops: int = 3,
+        split: bool = False,
+        graph: Optional[RouteGraph] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Find the best route (or split route) from ``token_in`` to ``token_out``.
+
+        Pass a ``graph`` from load_route_graph to reuse one block's state across many searches.
+        The returned ``encoded_path`` can be passed to exact_input through its ``route`` argument.
+        """
+        if graph is None:
+            graph = self.load_route_graph()
+        token_in = self.w3.to_checksum_address(token_in)
+        token_out = self.w3.to_checksum_address(token_out)
+        if split:
+            return graph.split_route(token_in, token_out, amount_in, max_hops)
+        return graph.best_route(token_in, token_out, amount_in, max_hops)
+
+    def get_pool_snapshot(self, pool_address: str, word_radius: int = 2) -> PoolSnapshot:
+        """Load a pool's swap state for local tick-math quoting.
+
+        Reads slot0, liquidity and tickSpacing, then the tickBitmap words within ``word_radius``
+        of the current tick, then every initialized tick in those words. All three multicalls are
+        pinned to the same block.
+
+        Args:
+            pool_address: Uniswap V3 pool address
+            word_radius: Number of 256-tick bitmap words to load on each side of the current price
+
+        Returns:
+            PoolSnapshot that can quote any number of swap sizes without further RPC calls
+        """
+        pool_address = self.w3.to_checksum_address(pool_address)
+        pool = self.load_pool_contract(pool_address)
+        metadata = self.get_pool_metadata(pool_address)
+        slot0_info, liquidity, tick_spacing, block_number = self.batch_call([
+            pool.functions.slot0(),
+            pool.functions.liquidity(),
+            pool.functions.tickSpacing(),
+            self.load_multicall_contract().functions.getBlockNumber(),
+        ], allow_failure=False)
+
+        current_word = (slot0_info[1] // tick_spacing) >> 8
+        words = list(range(current_word - word_radius, current_word + word_radius + 1))
+        bitmaps = self.batch_call(
+            [pool.functions.tickBitmap(word) for word in words],
+            allow_failure=False,
+            block_identifier=block_number
+        )
+
+        initialized_ticks = []
+        for word, bitmap in zip(words, bitmaps):
+            while bitmap:
+                bit = (bitmap & -bitmap).bit_length() - 1
+                initialized_ticks.append(((word << 8) + bit) * tick_spacing)
+                bitmap &= bitmap - 1
+        tick_infos = self.batch_call(
+            [pool.functions.ticks(tick) for tick in initialized_ticks],
+            allow_failure=False,
+            block_identifier=block_number
+        )
+
+        return PoolSnapshot(
+            pool_address=pool_address,
+            token0=metadata["token0"],
+            token1=metadata["token1"],
+            decimals0=metadata["decimals0"],
+            decimals1=metadata["decimals1"],
+            fee=metadata["fee"],
+            tick_spacing=tick_spacing,
+            sqrt_price_x96=slot0_info[0],
+            tick=slot0_info[1],
+            liquidity=liquidity,
+            ticks={tick: tick_info[1] for tick, tick_info in zip(initialized_ticks, tick_infos)},
+            min_word=words[0],
+            max_word=words[-1],
+            block_number=block_number
+        )
+
+    def pool_state_mirror(
+        self,
+        pool_addresses: List[str],
+        word_radius: int = 2,
+        checkpoints: int = 64
+    ) -> PoolStateMirror:
+        """Snapshot ``pool_addresses`` and return a PoolStateMirror kept current by ``sync()``.
+
+        Args:
+            pool_addresses: Pools to mirror
+            word_radius: Tick bitmap words loaded around each pool's price
+            checkpoints: Number of past blocks kept for reorg rollback
+
+        Returns:
+            Loaded PoolStateMirror; call ``sync()`` once per block, then quote from local state
+        """
+        mirror = PoolStateMirror(self, pool_addresses, word_radius, checkpoints)
+        mirror.load()
+        return mirror
+
+    def remote_simulator(self, block_identifier: Union[str, int] = "latest", snapshot: str = None) -> RemoteSwapSimulator:
+        """Return a RemoteSwapSimulator for router calldata pinned to ``block_identifier``.
+
+        The calldata is executed by the node (eth_call / eth_estimateGas at the pinned block); only the
+        results are cached locally, so each new candidate still costs a batched round trip.
+
+        Args:
+            block_identifier: Block to simulate against (resolved to a number once)
+            snapshot: Path of a snapshot written by ``RemoteSwapSimulator.save``; replayed without RPC calls
+
+        Returns:
+            RemoteSwapSimulator; ``simulate_many`` batches eth_call / eth_estimateGas for uncached calldata
+
+        Raises:
+            ValueError: Offline without a snapshot and ``block_identifier`` is not a block number
+        """
+        simulator = RemoteSwapSimulator(self)
+        if snapshot is not None:
+            simulator.load(snapshot)
+        if simulator.block_number is None:
+            simulator.pin(block_identifier)
+        return simulator
+
+    # Former name, kept for existing callers
+    swap_simulator = remote_simulator
+
+    def v2_quoter(self, dexes: Optional[Dict[str, Dict[str, Any]]] = None) -> V2DexQuoter:
+        """Return a V2DexQuoter over this connection for constant-product DEXes.
+
+        Args:
+            dexes: {name: {"factory": ..., "fee_bps": ..., "aerodrome": bool}}; defaults to BASE_V2_DEXES
+
+        Returns:
+            V2DexQuoter; ``quote(token_in, token_out, amounts, v3_fee=500)`` compares with this V3 router's pools
+        """
+        return V2DexQuoter(self, dexes)
+
+    def tick_math_slippage(
+        self,
+        pool_address: str = None,
+        path: bool = True,
+        amount: int = 0,
+        slippage_percent: float = 0.5,
+        exact_output: bool = False,
+        snapshot: Optional[PoolSnapshot] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Quote a swap with exact V3 tick math instead of the slot0 spot price.
+
+        ``path`` has the same meaning as in ``simple_slippage``: ``amount`` is in token0 when True
+        and the result is in the other token. With ``exact_output`` the amount is the desired
+        output and the result is the required input plus ``max_amount_in``.
+
+        Args:
+            pool_address: Pool to snapshot when ``snapshot`` is not given
+            path: Direction flag as in simple_slippage
+            amount: Exact input (or exact output) amount in raw token units
+            slippage_percent: Tolerance applied to the quoted amount
+            exact_output: Quote the input required for an exact output
+            snapshot: Previously loaded PoolSnapshot to reuse
+
+        Returns:
+            Quote dict compatible with simple_slippage (``min_amount_out``, ``sqrt_price_x96``, ...)
+        """
+        try:
+            if snapshot is None:
+                snapshot = self.get_pool_snapshot(pool_address)
+            quote = {
+                "token0": snapshot.token0,
+                "token1": snapshot.token1,
+                "current_tick": snapshot.tick,
+                "sqrt_price_x96": snapshot.sqrt_price_x96,
+                "block_number": snapshot.block_number,
+            }
+            if exact_output:
+                amount_in = snapshot.quote_exact_output(amount, not path)
+                decimals_in = snapshot.decimals1 if path else snapshot.decimals0
+                quote.update({
+                    "amount_in": amount_in,
+                    "max_amount_in": int(Decimal(amount_in) * Decimal(100 + slippage_percent) / 100),
+                    "actual_amount_in": float(Decimal(amount_in) / Decimal(10 ** decimals_in)),
+                    "decimals_in": decimals_in,
+                })
+            else:
+                amount_out = snapshot.quote_exact_input(amount, path)
+                decimals_out = snapshot.decimals1 if path else snapshot.decimals0
+                min_amount_out = int(Decimal(amount_out) * Decimal(100 - slippage_percent) / 100)
+                quote.update({
+                    "min_amount_out": min_amount_out,
+                    "amount_out": float(Decimal(amount_out) / Decimal(10 ** decimals_out)),
+                    "min_actual_amount": float(Decimal(min_amount_out) / Decimal(10 ** decimals_out)),
+                    "amount_out_raw": amount_out,
+                    "decimals_out": decimals_out,
+                })
+            return quote
+        except Exception as e:
+            print(f"Error in tick_math_slippage: {e}")
+            report_error(e)
+            return None
+
+    def tick_math_slippage_batch(
+        self,
+        pool_address: str = None,
+        path: bool = True,
+        amounts_in: Sequence[int] = (),
+        slippage_percent: float = 0.5,
+        snapshot: Optional[PoolSnapshot] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Quote a ladder of exact-input sizes against one pool snapshot.
+
+        Each size is simulated with exact integer tick math (price impact included);
+        the results are returned as NumPy arrays for sizing sweeps.
+
+        Args:
+            pool_address: Pool to snapshot when ``snapshot`` is not given
+            path: Direction flag as in simple_slippage
+            amounts_in: Exact input amounts in raw token units
+            slippage_percent: Tolerance applied to each quoted amount
+            snapshot: Previously loaded PoolSnapshot to reuse
+
+        Returns:
+            Dict with ``amount_out`` / ``min_amount_out`` (raw ints, object arrays),
+            ``amount_out_float`` and the execution ``price`` per size
+        """
+        try:
+            if snapshot is None:
+                snapshot = self.get_pool_snapshot(pool_address)
+            decimals_in, decimals_out = (
+                (snapshot.decimals0, snapshot.decimals1) if path else (snapshot.decimals1, snapshot.decimals0)
+            )
+            tolerance = Decimal(100 - slippage_percent) / 100
+            amount_out = np.array(
+                [snapshot.quote_exact_input(int(amount), path) if amount else 0 for amount in amounts_in],
+                dtype=object
+            )
+            min_amount_out = np.array([int(Decimal(amount) * tolerance) for amount in amount_out], dtype=object)
+            amount_in_float = np.asarray(amounts_in, dtype=np.float64) / 10.0 ** decimals_in
+            amount_out_float = amount_out.astype(np.float64) / 10.0 ** decimals_out
+            with np.errstate(divide="ignore", invalid="ignore"):
+                price = np.where(amount_in_float > 0, amount_out_float / amount_in_float, np.nan)
+            return {
+                "amount_in": np.asarray(amounts_in, dtype=object),
+                "amount_out": amount_out,
+                "min_amount_out": min_amount_out,
+                "amount_out_float": amount_out_float,
+                "price": price,
+                "token0": snapshot.token0,
+                "token1": snapshot.token1,
+                "current_tick": snapshot.tick,
+                "sqrt_price_x96": snapshot.sqrt_price_x96,
+                "decimals_out": decimals_out,
+                "block_number": snapshot.block_number,
+            }
+        except Exception as e:
+            print(f"Error in tick_math_slippage_batch: {e}")
+            report_error(e)
+            return None
+
+    def _swap_quote(
+        self,
+        pool_address: str,
+        path_forward: bool,
+        amount: int,
+        slippage: float,
+        exact_output: bool,
+        tick_math: bool,
+        snapshot: Optional[PoolSnapshot]
+    ) -> Tuple[Dict[str, Any], int]:
+        """Return (pool_info, amount limit) from either simple_slippage or tick math."""
+        if tick_math:
+            pool_info = self.tick_math_slippage(
+                pool_address=pool_address,
+                path=path_forward,
+                amount=amount,
+                slippage_percent=slippage,
+                exact_output=exact_output,
+                snapshot=snapshot
+            )
+            return pool_info, pool_info["max_amount_in" if exact_output else "min_amount_out"]
+        pool_info = self.simple_slippage(
+            pool_address=pool_address,
+            path=path_forward,
+            amount_in=amount,
+            slippage_percent=slippage
+        )
+        return pool_info, pool_info["min_amount_out"]
+
     def exact_input(
         self,
-        path: List[str],
+        path: Optional[List[str]] = None,
         fee: int = 500,
         pool_address: str = None,
         path_forward: bool = True,
@@ -142,22 +919,34 @@ class Uniutility(Web3Utility):
         amount_in: int = 0,
         slippage: float = 0.05,
         value: int = None,
-        gaslimit: bool = False
+        gaslimit: bool = False,
+        tick_math: bool = False,
+        snapshot: Optional[PoolSnapshot] = None,
+        route: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        """Execute exact input swap."""
-        # Create path data
-        byte_token_a = self.w3.to_bytes(hexstr=path[0])
-        byte_fee = fee.to_bytes(3, "big")
-        byte_token_b = self.w3.to_bytes(hexstr=path[1])
-        encoded_path = byte_token_a + byte_fee + byte_token_b
+        """Execute exact input swap.
 
-        # Calculate minimum output amount
-        amount_out_minimum = self.simple_slippage(
-            path=path_forward,
-            pool_address=pool_address,
-            amount_in=amount_in,
-            slippage_percent=slippage
-        )["min_amount_out"]
+        With ``tick_math=True`` the minimum output comes from a local V3 swap simulation
+        (optionally over a reused ``snapshot``) instead of the slot0 spot price.
+        A ``route`` from find_route supplies the (multi-hop) path, amount_in and quoted output instead.
+
+        Raises:
+            ValueError: Neither ``path`` nor ``route`` is given
+        """
+        if path is None and route is None:
+            raise ValueError("exact_input needs a token path or a route from find_route")
+        if route is not None:
+            encoded_path = route["encoded_path"]
+            amount_in = route["amount_in"]
+            amount_out_minimum = int(Decimal(route["amount_out"]) * Decimal(100 - slippage) / 100)
+        else:
+            # Create path data
+            encoded_path = self.encode_path(path, fee)
+
+            # Calculate minimum output amount
+            _, amount_out_minimum = self._swap_quote(
+                pool_address, path_forward, amount_in, slippage, False, tick_math, snapshot
+            )
 
         params = {
             'path': encoded_path,
@@ -166,14 +955,10 @@ class Uniutility(Web3Utility):
             'amountOutMinimum': amount_out_minimum
         }
         
-        encoded_data = self.contract.encodeABI(fn_name="exactInput", args=[params])
+        encoded_data = self.encode_call("exactInput", [params])
         
         if gaslimit:
-            gas_limit = self.estimate_gas_limit(
-                params,
-                function_name="exactInput",
-                value=value
-            )
+            gas_limit = self.estimate_calldata_gas(encoded_data, value=value)
             return {
                 "encoded_exactInput": encoded_data,
                 "gaslimit": gas_limit
@@ -192,14 +977,13 @@ class Uniutility(Web3Utility):
         sllipage: float = None,
         sqrtPriceLimitX96: float = None,
         value: int = None,
-        gaslimit: bool = False
+        gaslimit: bool = False,
+        tick_math: bool = False,
+        snapshot: Optional[PoolSnapshot] = None
     ) -> Dict[str, Any]:
         """Execute exact input single swap."""
-        pool_info = self.simple_slippage(
-            pool_address=poolAddres,
-            path=path_forward,
-            amount_in=amountIn,
-            slippage_percent=sllipage
+        pool_info, amount_out_minimum = self._swap_quote(
+            poolAddres, path_forward, amountIn, sllipage, False, tick_math, snapshot
         )
         
         params = {
@@ -208,18 +992,14 @@ class Uniutility(Web3Utility):
             'fee': fee,
             'recipient': recipient,
             'amountIn': amountIn,
-            'amountOutMinimum': pool_info["min_amount_out"],
+            'amountOutMinimum': amount_out_minimum,
             'sqrtPriceLimitX96': int(pool_info["sqrt_price_x96"] * (100 + sqrtPriceLimitX96) / 100)
         }
         
-        encoded_data = self.contract.encodeABI(fn_name="exactInputSingle", args=[params])
+        encoded_data = self.encode_call("exactInputSingle", [params])
         
         if gaslimit:
-            gas_limit = self.estimate_gas_limit(
-                params,
-                function_name="exactInputSingle",
-                value=value
-            )
+            gas_limit = self.estimate_calldata_gas(encoded_data, value=value)
             return {
                 "encoded_exactInputsingle": encoded_data,
                 "gaslimit": gas_limit
@@ -236,37 +1016,33 @@ class Uniutility(Web3Utility):
         amount_out: int = 0,
         amountInMaximum: float = 1.05,
         value: int = None,
-        gaslimit: bool = False
+        gaslimit: bool = False,
+        tick_math: bool = False,
+        snapshot: Optional[PoolSnapshot] = None
     ) -> Dict[str, Any]:
-        """Execute exact output swap."""
+        """Execute exact output swap.
+
+        With ``tick_math=True`` the maximum input is the simulated required input plus
+        ``amountInMaximum`` percent.
+        """
         # Create path data
-        byte_token_a = self.w3.to_bytes(hexstr=path[0])
-        byte_fee = fee.to_bytes(3, "big")
-        byte_token_b = self.w3.to_bytes(hexstr=path[1])
-        encoded_path = byte_token_a + byte_fee + byte_token_b
+        encoded_path = self.encode_path(path, fee)
         
-        amount_out_minimum = self.simple_slippage(
-            path=path_forward,
-            pool_address=pool_address,
-            amount_in=amount_out,
-            slippage_percent=amountInMaximum
-        )["min_amount_out"]
+        _, amount_in_maximum = self._swap_quote(
+            pool_address, path_forward, amount_out, amountInMaximum, True, tick_math, snapshot
+        )
 
         params = {
             "path": encoded_path,
             "recipient": recipient,
             "amountOut": amount_out,
-            "amountInMaximum": amount_out_minimum
+            "amountInMaximum": amount_in_maximum
         }
 
-        encoded_data = self.contract.encodeABI(fn_name="exactOutput", args=[params])
+        encoded_data = self.encode_call("exactOutput", [params])
         
         if gaslimit:
-            gas_limit = self.estimate_gas_limit(
-                params,
-                function_name="exactOutput",
-                value=value
-            )
+            gas_limit = self.estimate_calldata_gas(encoded_data, value=value)
             return {
                 "encoded_exactOutput": encoded_data,
                 "gaslimit": gas_limit
@@ -285,14 +1061,13 @@ class Uniutility(Web3Utility):
         amountInMaximum: float = None,
         sqrtPriceLimitX96: float = None,
         value: int = None,
-        gaslimit: bool = False
+        gaslimit: bool = False,
+        tick_math: bool = False,
+        snapshot: Optional[PoolSnapshot] = None
     ) -> Dict[str, Any]:
         """Execute exact output single swap."""
-        pool_info = self.simple_slippage(
-            pool_address=poolAddres,
-            path=path_forward,
-            amount_in=amountOut,
-            slippage_percent=amountInMaximum
+        pool_info, amount_in_maximum = self._swap_quote(
+            poolAddres, path_forward, amountOut, amountInMaximum, True, tick_math, snapshot
         )
         
         params = {
@@ -301,18 +1076,14 @@ class Uniutility(Web3Utility):
             'fee': fee,
             'recipient': recipient,
             'amountOut': amountOut,
-            'amountInMaximum': pool_info["min_amount_out"],
+            'amountInMaximum': amount_in_maximum,
             'sqrtPriceLimitX96': int(pool_info["sqrt_price_x96"] * (100 + sqrtPriceLimitX96) / 100)
         }
         
-        encoded_data = self.contract.encodeABI(fn_name="exactOutputSingle", args=[params])
+        encoded_data = self.encode_call("exactOutputSingle", [params])
         
         if gaslimit:
-            gas_limit = self.estimate_gas_limit(
-                params,
-                function_name="exactOutputSingle",
-                value=value
-            )
+            gas_limit = self.estimate_calldata_gas(encoded_data, value=value)
             return {
                 "encoded_exactOutputsingle": encoded_data,
                 "gaslimit": gas_limit
@@ -326,14 +1097,10 @@ class Uniutility(Web3Utility):
         gaslimit: bool = True
     ) -> Dict[str, Any]:
         """Execute multiple calls in a single transaction."""
-        encoded_data = self.contract.encodeABI(fn_name="multicall", args=[data_list])
+        encoded_data = self.encode_call("multicall", [data_list])
        
         if gaslimit:
-            gas_limit = self.estimate_gas_limit(
-                [encoded_data],
-                function_name="multicall",
-                value=value
-            )
+            gas_limit = self.estimate_calldata_gas(encoded_data, value=value)
             return {
                 "encoded_multicall": encoded_data,
                 "gaslimit": gas_limit
@@ -0,0 +1,359 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Optional, Tuple
+
+"""
+Integer ports of the Uniswap V3 core libraries (TickMath, SqrtPriceMath, SwapMath, FullMath)
+and an in-memory pool snapshot that replays UniswapV3Pool.swap locally.
+
+All math is done on Python ints with the same rounding as the Solidity code, so a snapshot
+of slot0, liquidity and the initialized ticks gives the same amountIn/amountOut as the pool
+would for any swap that stays inside the loaded tickBitmap words.
+"""
+
+MIN_TICK = -887272
+MAX_TICK = 887272
+MIN_SQRT_RATIO = 4295128739
+MAX_SQRT_RATIO = 1461446703485210103287273052203988822378723970342
+Q96 = 1 << 96
+MAX_UINT160 = (1 << 160) - 1
+MAX_UINT256 = (1 << 256) - 1
+FEE_DENOMINATOR = 1_000_000
+
+_TICK_RATIO_FACTORS = (
+    (0x2, 0xfff97272373d413259a46990580e213a),
+    (0x4, 0xfff2e50f5f656932ef12357cf3c7fdcc),
+    (0x8, 0xffe5caca7e10e4e61c3624eaa0941cd0),
+    (0x10, 0xffcb9843d60f6159c9db58835c926644),
+    (0x20, 0xff973b41fa98c081472e6896dfb254c0),
+    (0x40, 0xff2ea16466c96a3843ec78b326b52861),
+    (0x80, 0xfe5dee046a99a2a811c461f1969c3053),
+    (0x100, 0xfcbe86c7900a88aedcffc83b479aa3a4),
+    (0x200, 0xf987a7253ac413176f2b074cf7815e54),
+    (0x400, 0xf3392b0822b70005940c7a398e4b70f3),
+    (0x800, 0xe7159475a2c29b7443b29c7fa6e889d9),
+    (0x1000, 0xd097f3bdfd2022b8845ad8f792aa5825),
+    (0x2000, 0xa9f746462d870fdf8a65dc1f90e061e5),
+    (0x4000, 0x70d869a156d2a1b890bb3df62baf32f7),
+    (0x8000, 0x31be135f97d08fd981231505542fcfa6),
+    (0x10000, 0x9aa508b5b7a84e1c677de54f3e99bc9),
+    (0x20000, 0x5d6af8dedb81196699c329225ee604),
+    (0x40000, 0x2216e584f5fa1ea926041bedfe98),
+    (0x80000, 0x48a170391f7dc42444e8fa2),
+)
+
+
+def mul_div(a: int, b: int, denominator: int) -> int:
+    return a * b // denominator
+
+
+def mul_div_rounding_up(a: int, b: int, denominator: int) -> int:
+    return -(-(a * b) // denominator)
+
+
+def div_rounding_up(a: int, b: int) -> int:
+    return -(-a // b)
+
+
+def get_sqrt_ratio_at_tick(tick: int) -> int:
+    """TickMath.getSqrtRatioAtTick: sqrt(1.0001^tick) * 2^96 as a Q64.96."""
+    abs_tick = abs(tick)
+    if abs_tick > MAX_TICK:
+        raise ValueError(f"tick {tick} out of range")
+    ratio = 0xfffcb933bd6fad37aa2d162d1a594001 if abs_tick & 0x1 else 1 << 128
+    for mask, factor in _TICK_RATIO_FACTORS:
+        if abs_tick & mask:
+            ratio = (ratio * factor) >> 128
+    if tick > 0:
+        ratio = MAX_UINT256 // ratio
+    return (ratio >> 32) + (0 if ratio & 0xffffffff == 0 else 1)
+
+
+def get_tick_at_sqrt_ratio(sqrt_price_x96: int) -> int:
+    """TickMath.getTickAtSqrtRatio: the greatest tick whose sqrt ratio is <= sqrt_price_x96."""
+    if not MIN_SQRT_RATIO <= sqrt_price_x96 < MAX_SQRT_RATIO:
+        raise ValueError("sqrt price out of range")
+    low, high = MIN_TICK, MAX_TICK
+    while low < high:
+        middle = (low + high + 1) // 2
+        if get_sqrt_ratio_at_tick(middle) <= sqrt_price_x96:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def get_next_sqrt_price_from_amount0_rounding_up(sqrt_price_x96: int, liquidity: int, amount: int, add: bool) -> int:
+    if amount == 0:
+        return sqrt_price_x96
+    numerator1 = liquidity << 96
+    product = amount * sqrt_price_x96
+    if add:
+        if product <= MAX_UINT256 and numerator1 + product <= MAX_UINT256:
+            return mul_div_rounding_up(numerator1, sqrt_price_x96, numerator1 + product)
+        return div_rounding_up(numerator1, numerator1 // sqrt_price_x96 + amount)
+    if product > MAX_UINT256 or numerator1 <= product:
+        raise ValueError("insufficient liquidity for output amount")
+    return mul_div_rounding_up(numerator1, sqrt_price_x96, numerator1 - product)
+
+
+def get_next_sqrt_price_from_amount1_rounding_down(sqrt_price_x96: int, liquidity: int, amount: int, add: bool) -> int:
+    if add:
+        return sqrt_price_x96 + (amount << 96) // liquidity
+    quotient = div_rounding_up(amount << 96, liquidity)
+    if sqrt_price_x96 <= quotient:
+        raise ValueError("insufficient liquidity for output amount")
+    return sqrt_price_x96 - quotient
+
+
+def get_next_sqrt_price_from_input(sqrt_price_x96: int, liquidity: int, amount_in: int, zero_for_one: bool) -> int:
+    if zero_for_one:
+        return get_next_sqrt_price_from_amount0_rounding_up(sqrt_price_x96, liquidity, amount_in, True)
+    return get_next_sqrt_price_from_amount1_rounding_down(sqrt_price_x96, liquidity, amount_in, True)
+
+
+def get_next_sqrt_price_from_output(sqrt_price_x96: int, liquidity: int, amount_out: int, zero_for_one: bool) -> int:
+    if zero_for_one:
+        return get_next_sqrt_price_from_amount1_rounding_down(sqrt_price_x96, liquidity, amount_out, False)
+    return get_next_sqrt_price_from_amount0_rounding_up(sqrt_price_x96, liquidity, amount_out, False)
+
+
+def get_amount0_delta(sqrt_ratio_a: int, sqrt_ratio_b: int, liquidity: int, round_up: bool) -> int:
+    if sqrt_ratio_a > sqrt_ratio_b:
+        sqrt_ratio_a, sqrt_ratio_b = sqrt_ratio_b, sqrt_ratio_a
+    numerator1 = liquidity << 96
+    numerator2 = sqrt_ratio_b - sqrt_ratio_a
+    if round_up:
+        return div_rounding_up(mul_div_rounding_up(numerator1, numerator2, sqrt_ratio_b), sqrt_ratio_a)
+    return mul_div(numerator1, numerator2, sqrt_ratio_b) // sqrt_ratio_a
+
+
+def get_amount1_delta(sqrt_ratio_a: int, sqrt_ratio_b: int, liquidity: int, round_up: bool) -> int:
+    if sqrt_ratio_a > sqrt_ratio_b:
+        sqrt_ratio_a, sqrt_ratio_b = sqrt_ratio_b, sqrt_ratio_a
+    if round_up:
+        return mul_div_rounding_up(liquidity, sqrt_ratio_b - sqrt_ratio_a, Q96)
+    return mul_div(liquidity, sqrt_ratio_b - sqrt_ratio_a, Q96)
+
+
+def compute_swap_step(sqrt_ratio_current: int,
+                      sqrt_ratio_target: int,
+                      liquidity: int,
+                      amount_remaining: int,
+                      fee_pips: int) -> Tuple[int, int, int, int]:
+    """SwapMath.computeSwapStep: returns (sqrt_ratio_next, amount_in, amount_out, fee_amount)."""
+    zero_for_one = sqrt_ratio_current >= sqrt_ratio_target
+    exact_in = amount_remaining >= 0
+
+    if exact_in:
+        amount_remaining_less_fee = mul_div(amount_remaining, FEE_DENOMINATOR - fee_pips, FEE_DENOMINATOR)
+        if zero_for_one:
+            amount_in = get_amount0_delta(sqrt_ratio_target, sqrt_ratio_current, liquidity, True)
+        else:
+            amount_in = get_amount1_delta(sqrt_ratio_current, sqrt_ratio_target, liquidity, True)
+        if amount_remaining_less_fee >= amount_in:
+            sqrt_ratio_next = sqrt_ratio_target
+        else:
+            sqrt_ratio_next = get_next_sqrt_price_from_input(
+                sqrt_ratio_current, liquidity, amount_remaining_less_fee, zero_for_one
+            )
+    else:
+        if zero_for_one:
+            amount_out = get_amount1_delta(sqrt_ratio_target, sqrt_ratio_current, liquidity, False)
+        else:
+            amount_out = get_amount0_delta(sqrt_ratio_current, sqrt_ratio_target, liquidity, False)
+        if -amount_remaining >= amount_out:
+            sqrt_ratio_next = sqrt_ratio_target
+        else:
+            sqrt_ratio_next = get_next_sqrt_price_from_output(
+                sqrt_ratio_current, liquidity, -amount_remaining, zero_for_one
+            )
+
+    reached_target = sqrt_ratio_target == sqrt_ratio_next
+    if zero_for_one:
+        if not (reached_target and exact_in):
+            amount_in = get_amount0_delta(sqrt_ratio_next, sqrt_ratio_current, liquidity, True)
+        if not (reached_target and not exact_in):
+            amount_out = get_amount1_delta(sqrt_ratio_next, sqrt_ratio_current, liquidity, False)
+    else:
+        if not (reached_target and exact_in):
+            amount_in = get_amount1_delta(sqrt_ratio_current, sqrt_ratio_next, liquidity, True)
+        if not (reached_target and not exact_in):
+            amount_out = get_amount0_delta(sqrt_ratio_current, sqrt_ratio_next, liquidity, False)
+
+    if not exact_in and amount_out > -amount_remaining:
+        amount_out = -amount_remaining
+
+    if exact_in and sqrt_ratio_next != sqrt_ratio_target:
+        fee_amount = amount_remaining - amount_in
+    else:
+        fee_amount = mul_div_rounding_up(amount_in, fee_pips, FEE_DENOMINATOR - fee_pips)
+    return sqrt_ratio_next, amount_in, amount_out, fee_amount
+
+
+class PoolSnapshot:
+    """
+    Local copy of a Uniswap V3 pool's swap state.
+
+    ``ticks`` maps each initialized tick to its liquidityNet. ``min_word`` / ``max_word`` are the
+    tickBitmap word positions that were loaded; a swap that needs a word outside that range raises
+    ``ValueError`` instead of silently quoting against missing liquidity.
+    """
+
+    __slots__ = (
+        "pool_address", "token0", "token1", "decimals0", "decimals1", "fee", "tick_spacing",
+        "sqrt_price_x96", "tick", "liquidity", "ticks", "min_word", "max_word", "block_number",
+        "_compressed_ticks",
+    )
+
+    def __init__(self,
+                 pool_address: str,
+                 token0: str,
+                 token1: str,
+                 decimals0: int,
+                 decimals1: int,
+                 fee: int,
+                 tick_spacing: int,
+                 sqrt_price_x96: int,
+                 tick: int,
+                 liquidity: int,
+                 ticks: Dict[int, int],
+                 min_word: int,
+                 max_word: int,
+                 block_number: Optional[int] = None):
+        self.pool_address = pool_address
+        self.token0 = token0
+        self.token1 = token1
+        self.decimals0 = decimals0
+        self.decimals1 = decimals1
+        self.fee = fee
+        self.tick_spacing = tick_spacing
+        self.sqrt_price_x96 = sqrt_price_x96
+        self.tick = tick
+        self.liquidity = liquidity
+        self.ticks = dict(ticks)
+        self.min_word = min_word
+        self.max_word = max_word
+        self.block_number = block_number
+        self._compressed_ticks = sorted(t // tick_spacing for t in self.ticks)
+
+    def copy(self) -> "PoolSnapshot":
+        return PoolSnapshot(
+            self.pool_address, self.token0, self.token1, self.decimals0, self.decimals1, self.fee,
+            self.tick_spacing, self.sqrt_price_x96, self.tick, self.liquidity, self.ticks,
+            self.min_word, self.max_word, self.block_number
+        )
+
+    def apply_swap(self, sqrt_price_x96: int, liquidity: int, tick: int) -> None:
+        """Apply a Swap event: the pool emits its post-swap state, so it is copied as-is."""
+        self.sqrt_price_x96 = sqrt_price_x96
+        self.liquidity = liquidity
+        self.tick = tick
+
+    def apply_liquidity(self, tick_lower: int, tick_upper: int, amount: int) -> None:
+        """Apply a Mint (amount > 0) or Burn (amount < 0) event to the tick map and active liquidity."""
+        if amount == 0:
+            return
+        self._add_liquidity_net(tick_lower, amount)
+        self._add_liquidity_net(tick_upper, -amount)
+        if tick_lower <= self.tick < tick_upper:
+            self.liquidity += amount
+
+    def _add_liquidity_net(self, tick: int, delta: int) -> None:
+        liquidity_net = self.ticks.get(tick, 0) + delta
+        compressed = tick // self.tick_spacing
+        if tick not in self.ticks:
+            insort(self._compressed_ticks, compressed)
+        if liquidity_net:
+            self.ticks[tick] = liquidity_net
+        else:
+            # A zero liquidityNet tick does not change a swap, so it is dropped like an uninitialized one
+            del self.ticks[tick]
+            del self._compressed_ticks[bisect_left(self._compressed_ticks, compressed)]
+
+    def next_initialized_tick_within_one_word(self, tick: int, lte: bool) -> Tuple[int, bool]:
+        """TickBitmap.nextInitializedTickWithinOneWord over the loaded ticks."""
+        compressed = tick // self.tick_spacing
+        if lte:
+            word_start = (compressed >> 8) << 8
+            self._check_word(compressed >> 8)
+            index = bisect_right(self._compressed_ticks, compressed) - 1
+            if index >= 0 and self._compressed_ticks[index] >= word_start:
+                return self._compressed_ticks[index] * self.tick_spacing, True
+            return word_start * self.tick_spacing, False
+
+        compressed += 1
+        word_end = ((compressed >> 8) << 8) + 255
+        self._check_word(compressed >> 8)
+        index = bisect_left(self._compressed_ticks, compressed)
+        if index < len(self._compressed_ticks) and self._compressed_ticks[index] <= word_end:
+            return self._compressed_ticks[index] * self.tick_spacing, True
+        return word_end * self.tick_spacing, False
+
+    def _check_word(self, word: int) -> None:
+        if not self.min_word <= word <= self.max_word:
+            raise ValueError(f"swap leaves the loaded tick range (word {word} not in {self.min_word}..{self.max_word})")
+
+    def swap(self,
+             zero_for_one: bool,
+             amount_specified: int,
+             sqrt_price_limit_x96: Optional[int] = None) -> Tuple[int, int, int, int, int]:
+        """
+        Replay UniswapV3Pool.swap without changing the snapshot.
+
+        amount_specified > 0 is an exact input, < 0 an exact output.
+        Returns (amount0, amount1, sqrt_price_x96_after, tick_after, liquidity_after) with the pool's sign convention.
+        """
+        if amount_specified == 0:
+            raise ValueError("amount_specified must be non-zero")
+        if sqrt_price_limit_x96 is None:
+            sqrt_price_limit_x96 = MIN_SQRT_RATIO + 1 if zero_for_one else MAX_SQRT_RATIO - 1
+
+        exact_input = amount_specified > 0
+        amount_remaining = amount_specified
+        amount_calculated = 0
+        sqrt_price_x96 = self.sqrt_price_x96
+        tick = self.tick
+        liquidity = self.liquidity
+
+        while amount_remaining != 0 and sqrt_price_x96 != sqrt_price_limit_x96:
+            sqrt_price_start = sqrt_price_x96
+            tick_next, initialized = self.next_initialized_tick_within_one_word(tick, zero_for_one)
+            tick_next = max(MIN_TICK, min(MAX_TICK, tick_next))
+            sqrt_price_next = get_sqrt_ratio_at_tick(tick_next)
+
+            if (sqrt_price_next < sqrt_price_limit_x96) if zero_for_one else (sqrt_price_next > sqrt_price_limit_x96):
+                sqrt_price_target = sqrt_price_limit_x96
+            else:
+                sqrt_price_target = sqrt_price_next
+            sqrt_price_x96, amount_in, amount_out, fee_amount = compute_swap_step(
+                sqrt_price_x96, sqrt_price_target, liquidity, amount_remaining, self.fee
+            )
+
+            if exact_input:
+                amount_remaining -= amount_in + fee_amount
+                amount_calculated -= amount_out
+            else:
+                amount_remaining += amount_out
+                amount_calculated += amount_in + fee_amount
+
+            if sqrt_price_x96 == sqrt_price_next:
+                if initialized:
+                    liquidity_net = self.ticks[tick_next]
+                    liquidity += -liquidity_net if zero_for_one else liquidity_net
+                tick = tick_next - 1 if zero_for_one else tick_next
+            elif sqrt_price_x96 != sqrt_price_start:
+                tick = get_tick_at_sqrt_ratio(sqrt_price_x96)
+
+        if zero_for_one == exact_input:
+            amount0, amount1 = amount_specified - amount_remaining, amount_calculated
+        else:
+            amount0, amount1 = amount_calculated, amount_specified - amount_remaining
+        return amount0, amount1, sqrt_price_x96, tick, liquidity
+
+    def quote_exact_input(self, amount_in: int, zero_for_one: bool) -> int:
+        amount0, amount1, *_ = self.swap(zero_for_one, amount_in)
+        return -(amount1 if zero_for_one else amount0)
+
+    def quote_exact_output(self, amount_out: int, zero_for_one: bool) -> int:
+        amount0, amount1, *_ = self.swap(zero_for_one, -amount_out)
+        return amount0 if zero_for_one else amount1
@@ -0,0 +1,351 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from eth_utils import function_signature_to_4byte_selector
+
+from abi_encoder import compile_types
+from pool_index import ZERO_ADDRESS
+from web3utility import MULTICALL3_ADDRESS
+
+"""
+V2Dex / V2DexQuoter classes
+
+Quotes constant-product (Uniswap V2 style) pools across several DEXes at once.
+
+- Pair addresses come from each factory (getPair, or getPool(a, b, false) for Aerodrome) and are
+  cached per (dex, token0, token1); missing pairs are remembered too
+- Every read goes out as Multicall3 aggregate3 eth_calls sent in one JSON-RPC batch, so a scan of
+  any number of known pairs is a single round trip (the first scan also resolves pair addresses)
+- Outputs are computed with NumPy for all pairs x DEXes x amounts:
+  out = reserve_out * a * (10000 - fee) / (reserve_in * 10000 + a * (10000 - fee)), fee in bps
+- The raw integer reserves are kept next to the float64 arrays (which round reserves above 2**53), and
+  quote(exact=True) computes settlement values from them
+- quote() compares the best V2 output with the V3 spot quote from simple_slippage_batch
+
+Only volatile (x * y = k) Aerodrome pools are read; stable pools use a different curve.
+"""
+
+GET_RESERVES_SELECTOR = function_signature_to_4byte_selector("getReserves()")
+GET_PAIR_SELECTOR = function_signature_to_4byte_selector("getPair(address,address)")
+GET_POOL_SELECTOR = function_signature_to_4byte_selector("getPool(address,address,bool)")
+GET_FEE_SELECTOR = function_signature_to_4byte_selector("getFee(address,bool)")
+AGGREGATE3_SELECTOR = function_signature_to_4byte_selector("aggregate3((address,bool,bytes)[])")
+FEE_DENOMINATOR = 10000
+# getReserves costs a few thousand gas per pair; nodes cap eth_call gas, so large scans are split
+DEFAULT_CHUNK_SIZE = 1000
+ZERO_WORD = bytes(32)
+
+# V2-style DEXes on Base. "fee_bps" is the swap fee; Aerodrome reads each pool's fee from its factory.
+BASE_V2_DEXES = {
+    "uniswap_v2": {"factory": "0x8909Dc15e40173Ff4699343b6eB8132c65e18eC6", "fee_bps": 30},
+    "sushiswap": {"factory": "0x71524B4f93c58fcbF659783284E38825f0622859", "fee_bps": 30},
+    "baseswap": {"factory": "0xFDa619b6d20975be80A10332cD39b9a4b0FAa8BB", "fee_bps": 25},
+    "aerodrome": {"factory": "0x420DD381b31aEf6683db6B902084cB0FFECe40Da", "fee_bps": 30, "aerodrome": True},
+}
+
+_encode_aggregate3 = compile_types(("(address,bool,bytes)[]",))
+_encode_pair_args = compile_types(("address", "address"))
+_encode_pool_args = compile_types(("address", "address", "bool"))
+_encode_fee_args = compile_types(("address", "bool"))
+
+
+def _word(data: bytes, index: int) -> int:
+    return int.from_bytes(data[32 * index:32 * (index + 1)], "big")
+
+
+def _decode_aggregate3(data: bytes) -> List[Tuple[bool, bytes]]:
+    """Decode aggregate3's (bool success, bytes returnData)[] without building ABI decoders."""
+    start = _word(data, 0) + 32
+    count = _word(data[start - 32:], 0)
+    results = []
+    for index in range(count):
+        element = start + int.from_bytes(data[start + 32 * index:start + 32 * (index + 1)], "big")
+        success = data[element + 31] == 1
+        offset = element + int.from_bytes(data[element + 32:element + 64], "big")
+        length = int.from_bytes(data[offset:offset + 32], "big")
+        results.append((success, data[offset + 32:offset + 32 + length]))
+    return results
+
+
+class V2Dex:
+    def __init__(self, name: str, factory: str, fee_bps: int = 30, aerodrome: bool = False):
+        """One V2-style DEX.
+
+        Args:
+            name: Label used in quotes
+            factory: Factory address (pair lookup)
+            fee_bps: Swap fee in basis points (30 = 0.3%)
+            aerodrome: Aerodrome-style factory: getPool(a, b, stable) and a per-pool getFee
+        """
+        self.name = name
+        self.factory = factory
+        self.fee_bps = fee_bps
+        self.aerodrome = aerodrome
+
+    def pair_call(self, token0: str, token1: str) -> Tuple[str, bool, bytes]:
+        if self.aerodrome:
+            return (self.factory, True, GET_POOL_SELECTOR + _encode_pool_args((token0, token1, False)))
+        return (self.factory, True, GET_PAIR_SELECTOR + _encode_pair_args((token0, token1)))
+
+    def fee_call(self, pair: str) -> Optional[Tuple[str, bool, bytes]]:
+        if not self.aerodrome:
+            return None
+        return (self.factory, True, GET_FEE_SELECTOR + _encode_fee_args((pair, False)))
+
+    def __repr__(self) -> str:
+        return f"V2Dex({self.name}, fee_bps={self.fee_bps})"
+
+
+class V2DexQuoter:
+    def __init__(self, utility, dexes: Dict[str, Dict[str, Any]] = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """Quote V2-style pools of several DEXes through one Web3Utility connection.
+
+        Args:
+            utility: Web3Utility (or Uniutility for the V3 comparison in quote())
+            dexes: {name: {"factory": ..., "fee_bps": ..., "aerodrome": bool}}; defaults to BASE_V2_DEXES
+            chunk_size: Calls per aggregate3; chunks are still sent in one JSON-RPC batch
+        """
+        self.utility = utility
+        self.w3 = utility.w3
+        self.chunk_size = chunk_size
+        self.dexes = [
+            V2Dex(name, self.w3.to_checksum_address(config["factory"]), config.get("fee_bps", 30),
+                  config.get("aerodrome", False))
+            for name, config in (dexes if dexes is not None else BASE_V2_DEXES).items()
+        ]
+        # (dex name, token0, token1) -> pair address, or None when the factory has no pair
+        self.pairs: Dict[Tuple[str, str, str], Optional[str]] = {}
+        self._checksums: Dict[str, str] = {}
+
+    def _checksum(self, address: str) -> str:
+        checksum = self._checksums.get(address)
+        if checksum is None:
+            checksum = self._checksums[address] = self.w3.to_checksum_address(address)
+        return checksum
+
+    def _sorted(self, token_a: str, token_b: str) -> Tuple[str, str]:
+        token_a, token_b = self._checksum(token_a), self._checksum(token_b)
+        return (token_a, token_b) if int(token_a, 16) < int(token_b, 16) else (token_b, token_a)
+
+    def aggregate(self, calls: List[Tuple[str, bool, bytes]], block_identifier: Union[str, int] = "latest") -> List[Tuple[bool, bytes]]:
+        """Run calls through aggregate3 in chunks of chunk_size, all chunks in one JSON-RPC batch."""
+        if not calls:
+            return []
+        block = hex(block_identifier) if isinstance(block_identifier, int) else block_identifier
+        chunks = [calls[start:start + self.chunk_size] for start in range(0, len(calls), self.chunk_size)]
+        batch = [
+            ("eth_call", [{
+                "to": MULTICALL3_ADDRESS,
+                "data": "0x" + (AGGREGATE3_SELECTOR + _encode_aggregate3((chunk,))).hex()
+            }, block])
+            for chunk in chunks
+        ]
+        results = []
+        for chunk, response in zip(chunks, self.utility.rpc_batch(batch)):
+            if response is None:
+                # A failed chunk counts as failed calls so the other chunks stay usable
+                results += [(False, b"")] * len(chunk)
+                continue
+            results += _decode_aggregate3(bytes.fromhex(response[2:]))
+        return results
+
+    def resolve_pairs(self, token_pairs: Sequence[Tuple[str, str]]) -> Dict[Tuple[str, str, str], Optional[str]]:
+        """Look up unknown pair addresses on every DEX with one aggregate3 round trip.
+
+        Returns:
+            {(dex, token0, token1): pair address or None} for the requested pairs
+        """
+        keys = [
+            (dex.name, *self._sorted(token_a, token_b))
+            for token_a, token_b in dict.fromkeys(token_pairs)
+            for dex in self.dexes
+        ]
+        missing = [key for key in dict.fromkeys(keys) if key not in self.pairs]
+        if missing:
+            dexes = {dex.name: dex for dex in self.dexes}
+            results = self.aggregate([dexes[name].pair_call(token0, token1) for name, token0, token1 in missing])
+            for key, (success, data) in zip(missing, results):
+                found = success and len(data) >= 32 and data[:32] != ZERO_WORD
+                self.pairs[key] = self._checksum("0x" + data[12:32].hex()) if found else None
+        return {key: self.pairs[key] for key in keys}
+
+    def fetch_reserves(
+        self,
+        token_pairs: Sequence[Tuple[str, str]],
+        block_identifier: Union[str, int] = "latest"
+    ) -> Dict[str, np.ndarray]:
+        """Read reserves (and Aerodrome pool fees) of every DEX for token_pairs in one round trip.
+
+        Returns:
+            Arrays of shape (pairs, dexes): reserve0 / reserve1 (NaN where no pair exists), fee_bps,
+            reserve0_int / reserve1_int (exact Python ints, None where no pair exists), plus token0 /
+            token1 per pair
+        """
+        self.resolve_pairs(token_pairs)
+        sorted_pairs = [self._sorted(token_a, token_b) for token_a, token_b in token_pairs]
+        shape = (len(sorted_pairs), len(self.dexes))
+        reserve0 = np.full(shape, np.nan)
+        reserve1 = np.full(shape, np.nan)
+        reserve0_int = np.full(shape, None, dtype=object)
+        reserve1_int = np.full(shape, None, dtype=object)
+        fee_bps = np.tile(np.array([dex.fee_bps for dex in self.dexes], dtype=np.float64), (shape[0], 1))
+
+        calls = []
+        slots = []
+        for row, (token0, token1) in enumerate(sorted_pairs):
+            for column, dex in enumerate(self.dexes):
+                pair = self.pairs[(dex.name, token0, token1)]
+                if pair is None:
+                    continue
+                calls.append((pair, True, GET_RESERVES_SELECTOR))
+                slots.append((row, column, "reserves"))
+                fee_call = dex.fee_call(pair)
+                if fee_call is not None:
+                    calls.append(fee_call)
+                    slots.append((row, column, "fee"))
+
+        for (row, column, kind), (success, data) in zip(slots, self.aggregate(calls, block_identifier)):
+            if not success:
+                continue
+            if kind == "reserves" and len(data) >= 64:
+                reserve0_int[row, column] = _word(data, 0)
+                reserve1_int[row, column] = _word(data, 1)
+                reserve0[row, column] = reserve0_int[row, column]
+                reserve1[row, column] = reserve1_int[row, column]
+            elif kind == "fee" and len(data) >= 32:
+                fee_bps[row, column] = _word(data, 0)
+        return {
+            "token0": [token0 for token0, _ in sorted_pairs],
+            "token1": [token1 for _, token1 in sorted_pairs],
+            "reserve0": reserve0,
+            "reserve1": reserve1,
+            "reserve0_int": reserve0_int,
+            "reserve1_int": reserve1_int,
+            "fee_bps": fee_bps,
+        }
+
+    @staticmethod
+    def amounts_out(reserve_in: np.ndarray, reserve_out: np.ndarray, fee_bps: np.ndarray, amounts: np.ndarray) -> np.ndarray:
+        """Constant-product output for every reserve pair and amount; the result has shape reserve_in.shape + (amounts,)."""
+        amounts_with_fee = amounts * (FEE_DENOMINATOR - fee_bps[..., None])
+        return reserve_out[..., None] * amounts_with_fee / (reserve_in[..., None] * FEE_DENOMINATOR + amounts_with_fee)
+
+    @staticmethod
+    def exact_amount_out(reserve_in: int, reserve_out: int, fee_bps: int, amount_in: int) -> int:
+        """Integer getAmountOut as the pair computes it (for settlement values)."""
+        amount_with_fee = amount_in * (FEE_DENOMINATOR - fee_bps)
+        return reserve_out * amount_with_fee // (reserve_in * FEE_DENOMINATOR + amount_with_fee)
+
+    def scan(
+        self,
+        token_pairs: Sequence[Tuple[str, str]],
+        amounts: Sequence[int],
+        block_identifier: Union[str, int] = "latest"
+    ) -> Dict[str, Any]:
+        """Quote token_in -> token_out for every (token_in, token_out) pair on every DEX and amount.
+
+        Returns:
+            amount_out with shape (pairs, dexes, amounts) (NaN where a DEX has no pair), the best DEX
+            index and output per pair and amount, the DEX names, and the reserves oriented to token_in
+            (reserve_in_int / reserve_out_int hold the exact integers)
+        """
+        reserves = self.fetch_reserves(token_pairs, block_identifier)
+        amounts = np.asarray(amounts, dtype=np.float64)
+        token_in_is_0 = np.array(
+            [self._checksum(token_in) == token0 for (token_in, _), token0 in zip(token_pairs, reserves["token0"])]
+        )[:, None]
+        reserve_in = np.where(token_in_is_0, reserves["reserve0"], reserves["reserve1"])
+        reserve_out = np.where(token_in_is_0, reserves["reserve1"], reserves["reserve0"])
+        reserve_in_int = np.where(token_in_is_0, reserves["reserve0_int"], reserves["reserve1_int"])
+        reserve_out_int = np.where(token_in_is_0, reserves["reserve1_int"], reserves["reserve0_int"])
+        amount_out = self.amounts_out(reserve_in, reserve_out, reserves["fee_bps"], amounts)
+
+        has_pool = ~np.isnan(amount_out).all(axis=1)
+        best_dex = np.where(has_pool, np.nanargmax(np.where(np.isnan(amount_out), -1.0, amount_out), axis=1), -1)
+        best_amount_out = np.where(has_pool, np.nanmax(np.where(np.isnan(amount_out), -1.0, amount_out), axis=1), np.nan)
+        return {
+            "dexes": [dex.name for dex in self.dexes],
+            "amount_in": amounts,
+            "amount_out": amount_out,
+            "best_dex": best_dex,
+            "best_amount_out": best_amount_out,
+            "reserve_in": reserve_in,
+            "reserve_out": reserve_out,
+            "reserve_in_int": reserve_in_int,
+            "reserve_out_int": reserve_out_int,
+            "fee_bps": reserves["fee_bps"],
+        }
+
+    def quote(
+        self,
+        token_in: str,
+        token_out: str,
+        amounts: Sequence[int],
+        v3_pool: Optional[str] = None,
+        v3_fee: Optional[int] = None,
+        exact: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Quote one token pair on every DEX and compare the best V2 output with Uniswap V3.
+
+        Args:
+            token_in: Token sold
+            token_out: Token bought
+            amounts: Input amounts in token_in's smallest unit
+            v3_pool: V3 pool to compare with (or v3_fee to look it up with Uniutility.get_pool_address)
+            v3_fee: V3 fee tier used when v3_pool is not given
+            exact: Also return integer outputs of the best DEX (as the pair computes them, from the
+                integer reserves)
+
+        Returns:
+            Per-DEX outputs in token_out's smallest unit, the best DEX per amount and, when a V3 pool is
+            given, the V3 spot quote from simple_slippage_batch (no price impact, so an upper bound) and
+            the ratio best V2 / V3. ``v3_available`` is False (and both V3 values None) when the V3 pool
+            does not exist or could not be quoted
+        """
+        try:
+            scanned = self.scan([(token_in, token_out)], amounts)
+            dexes = scanned["dexes"]
+            amount_out = scanned["amount_out"][0]
+            best_dex = scanned["best_dex"][0]
+            result = {
+                "token_in": self._checksum(token_in),
+                "token_out": self._checksum(token_out),
+                "amount_in": scanned["amount_in"],
+                "amount_out": {name: amount_out[index] for index, name in enumerate(dexes) if not np.isnan(amount_out[index]).all()},
+                "best_dex": [dexes[index] if index >= 0 else None for index in best_dex],
+                "best_amount_out": scanned["best_amount_out"][0],
+            }
+            if exact:
+                reserve_in, reserve_out = scanned["reserve_in_int"][0], scanned["reserve_out_int"][0]
+                fee_bps = scanned["fee_bps"][0]
+                result["best_amount_out_exact"] = np.array([
+                    self.exact_amount_out(reserve_in[index], reserve_out[index], int(fee_bps[index]), int(amount))
+                    if index >= 0 else None
+                    for index, amount in zip(best_dex, amounts)
+                ], dtype=object)
+
+            if v3_pool is None and v3_fee is not None:
+                v3_pool = self.utility.get_pool_address(token_in, token_out, [v3_fee])[0]
+            if v3_pool is not None:
+                v3 = self._v3_quote(v3_pool, result["token_in"], amounts) if v3_pool != ZERO_ADDRESS else None
+                result["v3_available"] = v3 is not None
+                result["v3_amount_out"] = v3
+                result["v2_vs_v3"] = result["best_amount_out"] / v3 if v3 is not None else None
+            return result
+        except Exception as e:
+            print(f"Error in V2DexQuoter.quote: {e}")
+            return None
+
+    def _v3_quote(self, pool_address: str, token_in: str, amounts: Sequence[int]) -> Optional[np.ndarray]:
+        try:
+            pool_metadata = self.utility.get_pool_metadata(pool_address)
+        except Exception as e:
+            # The V2 quotes stay usable; the V3 side is reported as unavailable
+            print(f"V3 pool {pool_address} unavailable: {e}")
+            return None
+        path = pool_metadata["token0"] == token_in
+        v3 = self.utility.simple_slippage_batch(pool_address, path, amounts, 0)
+        if v3 is None:
+            return None
+        # simple_slippage_batch returns whole tokens
+        return v3["amount_out"] * 10.0 ** v3["decimals_out"]
@@ -0,0 +1,252 @@
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from eth_utils import function_abi_to_4byte_selector
+
+"""
+ContractEncoder クラス / compile_types 関数
+
+ABI エンコードを型ごとに特化した関数へ事前にコンパイルし、呼び出し時は値を詰めるだけにします。
+
+- コントラクトの関数ごとにセレクタと引数のエンコーダを1回だけ組み立てる（contract.encodeABI のような
+  関数 ABI の検索・型の解決・バリデータの構築を毎回行わない）
+- アドレスの 32 バイトワードはキャッシュし、同じトークン・受取人を何度も変換しない
+- 同じ引数の組み合わせの結果は max_cache 件までメモ化する（メモはスレッド間で共有するためロックで守る）
+- encode_many で同じ関数の多数の引数をまとめてエンコードする（multicall に入れる候補の一括生成用）
+- 構造体の引数は dict（名前で指定）でもタプル（順番で指定）でもよい。bytes は bytes でも 0x 付き hex でもよい
+"""
+
+DEFAULT_CACHE_SIZE = 4096
+
+# encoder(value) -> bytes, 動的型かどうか, ヘッド部のサイズ（静的型のみ意味を持つ）
+Encoder = Tuple[Callable[[Any], bytes], bool, int]
+
+
+def _to_bytes(value: Any) -> bytes:
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+    return bytes(value)
+
+
+@lru_cache(maxsize=DEFAULT_CACHE_SIZE)
+def _address_word(value: Any) -> bytes:
+    raw = _to_bytes(value)
+    if len(raw) != 20:
+        raise ValueError(f"Invalid address: {value!r}")
+    return bytes(12) + raw
+
+
+def _pad(data: bytes) -> bytes:
+    return data + bytes(-len(data) % 32)
+
+
+def _compile(abi_type: str, components: List[Dict[str, Any]] = None) -> Encoder:
+    if abi_type.endswith("]"):
+        element_type, _, length = abi_type[:-1].rpartition("[")
+        element, element_dynamic, element_size = _compile(element_type, components)
+        if length:
+            count = int(length)
+            encode_elements = _sequence([(element, element_dynamic, element_size)] * count)
+
+            def encode_fixed_array(value):
+                if len(value) != count:
+                    raise ValueError(f"Expected {count} elements for {abi_type}, got {len(value)}")
+                return encode_elements(value)
+            return encode_fixed_array, element_dynamic, element_size * count
+
+        if not element_dynamic:
+            def encode_static_elements(value):
+                return len(value).to_bytes(32, "big") + b"".join(element(item) for item in value)
+            return encode_static_elements, True, 32
+
+        def encode_dynamic_elements(value):
+            heads = []
+            tails = []
+            offset = 32 * len(value)
+            for item in value:
+                data = element(item)
+                heads.append(offset.to_bytes(32, "big"))
+                tails.append(data)
+                offset += len(data)
+            return len(value).to_bytes(32, "big") + b"".join(heads + tails)
+        return encode_dynamic_elements, True, 32
+
+    if abi_type.startswith("("):
+        # w3.codec 形式のタプル型 "(uint8,bytes)"
+        return _compile("tuple", [{"name": None, "type": component} for component in _split_tuple(abi_type[1:-1])])
+
+    if abi_type == "tuple":
+        names = [component["name"] for component in components]
+        fields = [_compile(component["type"], component.get("components")) for component in components]
+        encode_fields = _sequence(fields)
+
+        def encode_tuple(value):
+            if isinstance(value, dict):
+                value = [value[name] for name in names]
+            return encode_fields(value)
+        return encode_tuple, any(dynamic for _, dynamic, _ in fields), sum(size for _, _, size in fields)
+
+    if abi_type == "address":
+        return _address_word, False, 32
+    if abi_type == "bool":
+        return (lambda value: (1 if value else 0).to_bytes(32, "big")), False, 32
+    if abi_type.startswith("uint"):
+        limit = 1 << int(abi_type[4:] or 256)
+
+        def encode_uint(value):
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise TypeError(f"Expected int for {abi_type}, got {type(value).__name__}")
+            if not 0 <= value < limit:
+                raise ValueError(f"Value {value} out of range for {abi_type}")
+            return value.to_bytes(32, "big")
+        return encode_uint, False, 32
+    if abi_type.startswith("int"):
+        bound = 1 << (int(abi_type[3:] or 256) - 1)
+
+        def encode_int(value):
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise TypeError(f"Expected int for {abi_type}, got {type(value).__name__}")
+            if not -bound <= value < bound:
+                raise ValueError(f"Value {value} out of range for {abi_type}")
+            return value.to_bytes(32, "big", signed=True)
+        return encode_int, False, 32
+    if abi_type in ("bytes", "string"):
+        text = abi_type == "string"
+
+        def encode_bytes(value):
+            data = value.encode("utf-8") if text else _to_bytes(value)
+            return len(data).to_bytes(32, "big") + _pad(data)
+        return encode_bytes, True, 32
+    if abi_type.startswith("bytes"):
+        size = int(abi_type[5:])
+
+        def encode_fixed_bytes(value):
+            data = _to_bytes(value)
+            if len(data) > size:
+                raise ValueError(f"Value too long for {abi_type}")
+            return _pad(data)
+        return encode_fixed_bytes, False, 32
+    raise ValueError(f"Unsupported ABI type: {abi_type}")
+
+
+def _split_tuple(inner: str) -> List[str]:
+    components = []
+    depth = 0
+    start = 0
+    for index, char in enumerate(inner):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            components.append(inner[start:index])
+            start = index + 1
+    if inner:
+        components.append(inner[start:])
+    return components
+
+
+def _sequence(fields: List[Encoder]) -> Callable[[Sequence[Any]], bytes]:
+    """ヘッド部（静的型の値・動的型のオフセット）の後にテール部（動的型の値）を並べます"""
+    head_size = sum(32 if dynamic else size for _, dynamic, size in fields)
+
+    def encode_fields(values):
+        if len(values) != len(fields):
+            raise ValueError(f"Expected {len(fields)} values, got {len(values)}")
+        heads = []
+        tails = []
+        offset = head_size
+        for (encoder, dynamic, _), value in zip(fields, values):
+            data = encoder(value)
+            if dynamic:
+                heads.append(offset.to_bytes(32, "big"))
+                tails.append(data)
+                offset += len(data)
+            else:
+                heads.append(data)
+        return b"".join(heads + tails)
+    return encode_fields
+
+
+@lru_cache(maxsize=256)
+def compile_types(types: Tuple[str, ...]) -> Callable[[Sequence[Any]], bytes]:
+    """w3.codec.encode(types, values) と同じ結果を返すエンコーダを、型の組み合わせごとに1回だけ作ります"""
+    return _sequence([_compile(abi_type) for abi_type in types])
+
+
+def _abi_type(abi_input: Dict[str, Any]) -> str:
+    if not abi_input["type"].startswith("tuple"):
+        return abi_input["type"]
+    return "(" + ",".join(_abi_type(component) for component in abi_input["components"]) + ")" + abi_input["type"][5:]
+
+
+def _freeze(value: Any) -> Any:
+    """メモ化のキー。1 == 1.0 == True のように等しい値でも型が違えば別のキーにする（検証を飛ばさないため）"""
+    if isinstance(value, dict):
+        return tuple((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, bytearray):
+        return bytes, bytes(value)
+    return type(value), value
+
+
+class ContractEncoder:
+    def __init__(self, abi: List[Dict[str, Any]], max_cache: int = DEFAULT_CACHE_SIZE):
+        self.max_cache = max_cache
+        self.functions: Dict[str, Tuple[bytes, Callable[[Sequence[Any]], bytes]]] = {}
+        self._overloads: Dict[str, Dict[int, List[str]]] = {}
+        self._cache: Dict[tuple, bytes] = {}
+        self._cache_lock = threading.Lock()
+        for item in abi:
+            if item.get("type") != "function":
+                continue
+            inputs = item["inputs"]
+            fields = [_compile(abi_input["type"], abi_input.get("components")) for abi_input in inputs]
+            signature = f"{item['name']}({','.join(_abi_type(abi_input) for abi_input in inputs)})"
+            self.functions[signature] = (function_abi_to_4byte_selector(item), _sequence(fields))
+            self._overloads.setdefault(item["name"], {}).setdefault(len(inputs), []).append(signature)
+
+    def _function(self, fn_name: str, arg_count: int) -> Tuple[bytes, Callable[[Sequence[Any]], bytes]]:
+        """関数名（オーバーロードは引数の数で選ぶ）または "name(type,...)" 形式のシグネチャで関数を選びます"""
+        function = self.functions.get(fn_name)
+        if function is not None:
+            return function
+        candidates = self._overloads.get(fn_name, {}).get(arg_count, [])
+        if len(candidates) != 1:
+            raise ValueError(
+                f"Cannot select function {fn_name} with {arg_count} arguments; candidates: {candidates or 'none'}"
+            )
+        return self.functions[candidates[0]]
+
+    def encode(self, fn_name: str, args: Sequence[Any]) -> bytes:
+        """セレクタ + 引数の calldata を返します（同じ引数の結果はメモ化）"""
+        try:
+            key = (fn_name, _freeze(args))
+            with self._cache_lock:
+                cached = self._cache.get(key)
+        except TypeError:
+            key, cached = None, None
+        if cached is not None:
+            return cached
+        selector, encode_args = self._function(fn_name, len(args))
+        calldata = selector + encode_args(args)
+        if key is not None:
+            with self._cache_lock:
+                if key not in self._cache and len(self._cache) >= self.max_cache:
+                    # 古いものから捨てる（dict は挿入順）
+                    del self._cache[next(iter(self._cache))]
+                self._cache[key] = calldata
+        return calldata
+
+    def encode_many(self, fn_name: str, args_list: Sequence[Sequence[Any]]) -> List[bytes]:
+        """同じ関数の引数のリストをまとめてエンコードします（一度きりの値が多いためメモ化は使わない）"""
+        if not args_list:
+            return []
+        selector, encode_args = self._function(fn_name, len(args_list[0]))
+        return [selector + encode_args(args) for args in args_list]
+
+    def clear_cache(self) -> None:
+        with self._cache_lock:
+            self._cache.clear()
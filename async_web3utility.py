@@ -0,0 +1,495 @@
+import asyncio
+from typing import List, Dict, Union, Any, Sequence
+from web3 import AsyncWeb3
+from web3.middleware import async_construct_simple_cache_middleware
+from web3utility import Web3Utility, STATIC_RPC_METHODS, endpoint_urls
+from metadata_cache import MetadataCache
+from nonce_manager import NonceManager
+from gas_oracle import GasOracle, GAS_STRATEGIES
+from rpc_provider import AsyncPooledHTTPProvider
+from rpc_router import AsyncRoutingHTTPProvider
+from tx_signer import SignedPayload
+from gas_estimator import GasEstimateCache
+from rpc_metrics import report_error
+
+"""
+AsyncWeb3Utility クラス
+
+Web3Utility と同じメソッド構成を AsyncWeb3 (AsyncHTTPProvider) 上で提供する非同期版です。
+1つのメソッド内で独立している読み取りは asyncio.gather で並行実行し、
+quote_pools で複数プールの見積もりを同時実行数を制限しながら並行処理します。
+
+RPC を伴うメソッドはすべてコルーチンです（Web3Utility の RPC を伴うメソッドはすべて async 版で上書きする）。
+価格計算・デコードなどの純粋な処理は Web3Utility を再利用します。
+
+使用例:
+    bot = await AsyncWeb3Utility.create(rpc_url=..., rpc_key=..., chain="base", ...)
+    quotes = await bot.quote_pools([{"pool_address": pool, "amount_in": 10 ** 18}], concurrency=100)
+"""
+
+
+class AsyncWeb3Utility(Web3Utility):
+    INSTRUMENTED_METHODS = Web3Utility.INSTRUMENTED_METHODS + ("quote_pools",)
+
+    def __init__(self,
+                 rpc_url: str = None,
+                 rpc_key: str = None,
+                 chain: str = None,
+                 contract_address: str = None,
+                 abi: list[dict] = None,
+                 user_address: str = None,
+                 metadata_db: str = None,
+                 provider_config: dict = None):
+        # コンストラクタでは RPC を呼ばない。接続確認とガス料金の取得は connect() で行う
+        try:
+            full_rpc_urls = endpoint_urls(rpc_url, rpc_key, chain)
+            if len(full_rpc_urls) > 1:
+                self.w3 = AsyncWeb3(AsyncRoutingHTTPProvider(full_rpc_urls, provider_config))
+            else:
+                self.w3 = AsyncWeb3(AsyncPooledHTTPProvider(full_rpc_urls[0], provider_config))
+            self.session = None
+            self.chain = chain
+            self.target_contract = self.w3.to_checksum_address(contract_address)
+            self.abi = abi
+            self.user_address = self.w3.to_checksum_address(user_address)
+            self.contract = self.w3.eth.contract(address=self.target_contract, abi=abi)
+            self.gas_oracle = GasOracle()
+            self.gas_estimates = GasEstimateCache()
+            self._init_state()
+            self.metadata_cache = MetadataCache(metadata_db)
+            self.nonce_manager = NonceManager()
+            self.offline = False
+            self.lazy = True
+            self._static_cache_installed = False
+        except Exception as e:
+            print(f"Input argument error for AsyncWeb3Utility: {e}")
+
+    @classmethod
+    async def create(cls, **kwargs) -> "AsyncWeb3Utility":
+        return await cls(**kwargs).connect()
+
+    @classmethod
+    def from_session(cls, *args, **kwargs):
+        """
+        ChainSession の接続は同期の Web3 のため、非同期版のビューは作れません（create() を使う）
+        """
+        raise NotImplementedError(f"{cls.__name__} cannot be bound to a ChainSession (it holds a sync Web3); use create()")
+
+    async def connect(self) -> "AsyncWeb3Utility":
+        try:
+            self.gas_fees, connected, _ = await asyncio.gather(
+                self.get_block_gas_fees(), self.is_connected(), self.get_chain_id()
+            )
+            if connected:
+                print("AsyncWeb3Utility initialized successfully.")
+            else:
+                raise ConnectionError("Initialization failed. Check your parameters.")
+        except Exception as e:
+            print(f"Connection error for AsyncWeb3Utility: {e}")
+        return self
+
+    @property
+    def gas_fees(self) -> dict:
+        # 非同期版はプロパティ内で await できないため、未取得なら get_gas_fees() を使う
+        return self._gas_fees
+
+    @gas_fees.setter
+    def gas_fees(self, value: dict) -> None:
+        self._gas_fees = value
+
+    async def get_gas_fees(self) -> dict:
+        if self._gas_fees is None:
+            self._gas_fees = await self.get_block_gas_fees()
+        return self._gas_fees
+
+    async def is_connected(self) -> bool:
+        if self._connected is None:
+            self._connected = await self.w3.is_connected()
+        return self._connected
+
+    async def estimate_gas_limit(self, *args, function_name: str = None, value: int = None, contract: bool = True) -> int:
+        if contract:
+            contract_function = getattr(self.contract.functions, function_name)
+        else:
+            contract_function = getattr(self.token_contract.functions, function_name)
+        try:
+            bound_function = contract_function(*args)
+            return await self.estimate_calldata_gas(
+                bound_function._encode_transaction_data(), bound_function.address, value
+            )
+        except Exception as e:
+            print(f"Function error in estimate_gas_limit: {e}")
+            report_error(e)
+
+    async def estimate_calldata_gas(self, calldata: str, to: str = None, value: int = None) -> int:
+        to = to or self.target_contract
+        key = self.gas_key(to, calldata, value)
+        gas_limit = self.gas_estimates.get(key)
+        if gas_limit is not None:
+            return gas_limit
+        tx = {"from": self.user_address, "to": to, "data": calldata}
+        if value is not None:
+            tx["value"] = value
+        try:
+            return self.gas_estimates.set(key, int(await self.w3.eth.estimate_gas(tx)))
+        except Exception as e:
+            print(f"Function error in estimate_calldata_gas: {e}")
+            report_error(e)
+
+    async def estimate_gas_batch(self, calldatas: List[str], to: str = None, value: int = None) -> List[int]:
+        to = to or self.target_contract
+        keys = [self.gas_key(to, calldata, value) for calldata in calldatas]
+        limits = []
+        missing = {}
+        for calldata, key in zip(calldatas, keys):
+            gas_limit = self.gas_estimates.get(key)
+            limits.append(gas_limit)
+            if gas_limit is None and key not in missing:
+                missing[key] = calldata
+        if missing:
+            batch = [("eth_estimateGas", [self._estimate_params(to, calldata, value)]) for calldata in missing.values()]
+            estimated = dict(zip(missing, await self.rpc_batch(batch)))
+            for key, result in estimated.items():
+                if result is not None:
+                    estimated[key] = self.gas_estimates.set(key, int(result, 16))
+            limits = [
+                gas_limit if gas_limit is not None else estimated.get(key)
+                for gas_limit, key in zip(limits, keys)
+            ]
+        return limits
+
+    async def get_block_gas_fees(self,
+                                 blocks: int = 50,
+                                 newest: str = "latest",
+                                 percentiles: List[int] = [25, 50, 75],
+                                 reward_percentile: int = 50,
+                                 max_fee_multiplier: float = 2,
+                                 reward_multiplier: float = 1,
+                                 strategy: str = None) -> dict:
+        if strategy is not None:
+            reward_percentile = GAS_STRATEGIES[strategy]["reward_percentile"]
+            max_fee_multiplier = GAS_STRATEGIES[strategy]["max_fee_multiplier"]
+            reward_multiplier = GAS_STRATEGIES[strategy]["reward_multiplier"]
+        if newest != "latest" or blocks != self.gas_oracle.blocks or percentiles != self.gas_oracle.percentiles:
+            block_fee_data = await self.w3.eth.fee_history(block_count=blocks, newest_block=newest, reward_percentiles=percentiles)
+            return self._calc_gas_fees(block_fee_data, percentiles, reward_percentile, max_fee_multiplier, reward_multiplier)
+
+        head_block = await self.w3.eth.block_number
+        missing_blocks = self.gas_oracle.blocks_to_fetch(head_block)
+        if missing_blocks:
+            self.gas_oracle.update(await self.w3.eth.fee_history(
+                block_count=missing_blocks, newest_block=head_block, reward_percentiles=percentiles
+            ))
+        return self.gas_oracle.fees(reward_percentile, max_fee_multiplier, reward_multiplier)
+
+    async def token_approve(self,
+                            target_contract: str = None,
+                            value: int = 0):
+        self.approve_gaslimit = await self.estimate_gas_limit(target_contract, value, function_name="approve", contract=False)
+        self.approve_tx = await self.token_contract.functions.approve(target_contract, value).build_transaction(
+            await self.build_tx_params(gas_limit=self.approve_gaslimit)
+        )
+        return self.approve_tx
+
+    async def execute_calls(self, block_identifier: Union[str, int] = "latest") -> List[Any]:
+        queue, self.call_queue = self.call_queue, []
+        return await self._aggregate(queue, block_identifier)
+
+    async def batch_call(self,
+                         contract_functions: list,
+                         allow_failure: bool = True,
+                         block_identifier: Union[str, int] = "latest") -> List[Any]:
+        queue = [self._call_entry(contract_function, allow_failure) for contract_function in contract_functions]
+        return await self._aggregate(queue, block_identifier)
+
+    async def _aggregate(self, queue: List[dict], block_identifier: Union[str, int] = "latest") -> List[Any]:
+        if not queue:
+            return []
+        calls = [(call["target"], call["allowFailure"], call["callData"]) for call in queue]
+        results = await self.load_multicall_contract().functions.aggregate3(calls).call(
+            block_identifier=block_identifier
+        )
+        return self._decode_call_results(queue, results)
+
+    async def get_chain_id(self) -> int:
+        if self.chain_id is None:
+            chain_id = self._verify_chain_id(await self.w3.eth.chain_id)
+            if self.chain_id is None:
+                self.chain_id = chain_id
+                await self._cache_static_rpc()
+        return self.chain_id
+
+    async def _cache_static_rpc(self) -> None:
+        # get_chain_id と prefetch_tx_context が並行して呼ぶため、await の前にフラグを立てて1回だけ追加する
+        if self._static_cache_installed:
+            return
+        self._static_cache_installed = True
+        self.w3.middleware_onion.add(
+            await async_construct_simple_cache_middleware(rpc_whitelist=STATIC_RPC_METHODS),
+            name="static_rpc_cache"
+        )
+
+    async def rpc_batch(self, batch: List[tuple]) -> List[Any]:
+        return self._batch_results(batch, await self.rpc_batch_responses(batch))
+
+    async def rpc_batch_responses(self, batch: List[tuple]) -> List[dict]:
+        provider = self.w3.provider
+        if hasattr(provider, "make_batch_request"):
+            return await provider.make_batch_request(batch)
+        return list(await asyncio.gather(*(provider.make_request(method, params) for method, params in batch)))
+
+    async def batch_eth_calls(self,
+                              contract_functions: list,
+                              block_identifier: Union[str, int] = "latest") -> List[Any]:
+        queue, batch = self._eth_call_batch(contract_functions, block_identifier)
+        return self._decode_eth_call_results(queue, await self.rpc_batch(batch))
+
+    async def prefetch_tx_context(self, blocks: int = 50) -> dict:
+        had_chain_id = self.chain_id is not None
+        batch = self._tx_context_batch(blocks)
+        context = self._apply_tx_context(batch, await self.rpc_batch(batch))
+        if not had_chain_id and self.chain_id is not None:
+            await self._cache_static_rpc()
+        return context
+
+    async def tx_template(self) -> dict:
+        if self._tx_template is None:
+            self._tx_template = {
+                'from': self.user_address,
+                'type': '0x2',
+                'chainId': await self.get_chain_id(),
+            }
+        return self._tx_template
+
+    async def get_tokens_metadata(self, token_addresses: List[str]) -> Dict[str, dict]:
+        chain_id = await self.get_chain_id()
+        tokens = [self.w3.to_checksum_address(token) for token in token_addresses]
+        metadata = {token: self.metadata_cache.get(chain_id, token) for token in tokens}
+
+        missing = [token for token, data in metadata.items() if data is None]
+        if missing:
+            results = await self.batch_call(self._token_metadata_calls(missing))
+            fetched = self._parse_token_metadata(missing, results)
+            self.metadata_cache.set_many(chain_id, fetched)
+            metadata.update(fetched)
+        return metadata
+
+    async def get_token_metadata(self, token_address: str) -> dict:
+        return next(iter((await self.get_tokens_metadata([token_address])).values()))
+
+    async def get_pool_metadata(self, pool_address: str) -> dict:
+        chain_id = await self.get_chain_id()
+        pool_address = self.w3.to_checksum_address(pool_address)
+        metadata = self.metadata_cache.get(chain_id, pool_address)
+        if metadata is None:
+            pool = self.load_pool_contract(pool_address)
+            token0, token1, fee = await self.batch_call([
+                pool.functions.token0(),
+                pool.functions.token1(),
+                pool.functions.fee(),
+            ], allow_failure=False)
+            tokens = await self.get_tokens_metadata([token0, token1])
+            metadata = self._build_pool_metadata(token0, token1, fee, tokens)
+            self.metadata_cache.set(chain_id, pool_address, metadata)
+        return metadata
+
+    async def simple_slippage(self,
+                              pool_address: str = None,
+                              path: bool = True,
+                              amount_in: int = 0,
+                              slippage_percent: float = 0.5) -> dict:
+        try:
+            pool = self.load_pool_contract(pool_address)
+            pool_metadata, slot0_info = await asyncio.gather(
+                self.get_pool_metadata(pool_address),
+                pool.functions.slot0().call(),
+            )
+            return self._calc_slippage(slot0_info, pool_metadata, path, amount_in, slippage_percent)
+        except Exception as e:
+            print(f"Error in simple_slippage: {e}")
+            report_error(e)
+            return None
+
+    async def simple_slippage_batch(self,
+                                    pool_address: str = None,
+                                    path: bool = True,
+                                    amounts_in: Sequence[int] = (),
+                                    slippage_percent: float = 0.5,
+                                    exact: bool = False) -> dict:
+        try:
+            pool = self.load_pool_contract(pool_address)
+            pool_metadata, slot0_info = await asyncio.gather(
+                self.get_pool_metadata(pool_address),
+                pool.functions.slot0().call(),
+            )
+            return self._calc_slippage_batch(slot0_info, pool_metadata, path, amounts_in, slippage_percent, exact)
+        except Exception as e:
+            print(f"Error in simple_slippage_batch: {e}")
+            report_error(e)
+            return None
+
+    async def quote_pools(self, quotes: List[dict], concurrency: int = 50) -> List[dict]:
+        """
+        simple_slippage の引数 dict のリストを受け取り、同時実行数を concurrency に制限して並行に見積もります
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def quote(params: dict) -> dict:
+            async with semaphore:
+                return await self.simple_slippage(**params)
+
+        return await asyncio.gather(*(quote(params) for params in quotes))
+
+    async def build_tx_params(self,
+                              gas_limit: int = 21000,
+                              value: int = 0,
+                              extra_params: dict = None) -> dict:
+        nonce, tx_template, gas_fees = await asyncio.gather(
+            self.get_nonce(),
+            self.tx_template(),
+            self.get_gas_fees(),
+        )
+        tx_data = dict(tx_template)
+        tx_data.update({
+            'gas': gas_limit,
+            'maxFeePerGas': gas_fees['maxFeePerGas'],
+            'maxPriorityFeePerGas': gas_fees['priorityFeePerGasMedian'],
+            'nonce': nonce,
+            'value': value,
+        })
+        if extra_params:
+            tx_data.update(extra_params)
+        return tx_data
+
+    async def get_nonce(self) -> int:
+        return await self.nonce_manager.async_next_nonce(
+            lambda: self.w3.eth.get_transaction_count(self.user_address, "pending")
+        )
+
+    async def sign_transactions(self, txs: list, private_key: str, basicGas: bool = True, workers: int = None) -> List[SignedPayload]:
+        # 署名はワーカープールで行い、その間イベントループを塞がない
+        gasfees = await self.get_block_gas_fees() if basicGas else None
+        for tx in txs:
+            if "nonce" not in tx:
+                tx["nonce"] = await self.get_nonce()
+            if gasfees:
+                tx["maxFeePerGas"] = gasfees["maxFeePerGas"]
+                tx["maxPriorityFeePerGas"] = gasfees["priorityFeePerGasMedian"]
+        signer = self.get_tx_signer(private_key, workers)
+        return await asyncio.get_running_loop().run_in_executor(None, signer.sign_many, txs)
+
+    async def send_multiple_tx(self, txs: list, private_key: str = None, basicGas: bool = True, pipeline: bool = False):
+        if pipeline:
+            return await self._send_pipelined_tx(txs, private_key, basicGas)
+        for i, tx in enumerate(txs):
+            try:
+                print(f"\nExecuting transaction {i+1}/{len(txs)}")
+                if isinstance(tx, SignedPayload):
+                    tx_hash = await self._send_signed(tx)
+                else:
+                    if "nonce" not in tx:
+                        tx["nonce"] = await self.get_nonce()
+                    if basicGas:
+                        gasfees = await self.get_block_gas_fees()
+                        tx["maxFeePerGas"] = gasfees["maxFeePerGas"]
+                        tx["maxPriorityFeePerGas"] = gasfees["priorityFeePerGasMedian"]
+                    tx_hash = await self._sign_and_send(tx, private_key)
+                print(f"Transaction Hash: {tx_hash.hex()}")
+
+                tx_receipt = await self.w3.eth.wait_for_transaction_receipt(tx_hash)
+
+                if tx_receipt['status'] == 1:
+                    print(f"Transaction {i+1} successful!")
+                    self._learn_gas_used([tx], [tx_receipt])
+                    continue
+                else:
+                    print(f"Transaction {i+1} failed!")
+                    # 残りのトランザクションに払い出し済みの nonce は欠番になるため、次回はノードの値から払い出す
+                    self.nonce_manager.resync()
+                    return False
+
+            except Exception as e:
+                print(f"Transaction {i+1} Error: {e}")
+                report_error(e)
+                self.nonce_manager.resync()
+                return False
+        print("All transactions completed successfully!")
+        return True
+
+    async def _sign_and_send(self, tx: dict, private_key: str):
+        try:
+            signed_tx = self.w3.eth.account.sign_transaction(tx, private_key)
+            return await self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
+        except Exception as e:
+            if not NonceManager.is_nonce_error(e):
+                raise
+            print(f"Nonce error ({e}), resyncing nonce and retrying")
+            self.nonce_manager.resync()
+            tx["nonce"] = await self.get_nonce()
+            signed_tx = self.w3.eth.account.sign_transaction(tx, private_key)
+            return await self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
+
+    async def _send_signed(self, payload: SignedPayload):
+        try:
+            return await self.w3.eth.send_raw_transaction(payload.raw_transaction)
+        except Exception as e:
+            if NonceManager.is_nonce_error(e):
+                self.nonce_manager.resync()
+            raise
+
+    async def _send_pipelined_tx(self, txs: list, private_key: str, basicGas: bool = True) -> bool:
+        has_unsigned = any(not isinstance(tx, SignedPayload) for tx in txs)
+        gasfees = await self.get_block_gas_fees() if basicGas and has_unsigned else None
+        tx_hashes = []
+        for i, tx in enumerate(txs):
+            try:
+                if isinstance(tx, SignedPayload):
+                    tx_hash = await self._send_signed(tx)
+                else:
+                    if "nonce" not in tx:
+                        tx["nonce"] = await self.get_nonce()
+                    if gasfees:
+                        tx["maxFeePerGas"] = gasfees["maxFeePerGas"]
+                        tx["maxPriorityFeePerGas"] = gasfees["priorityFeePerGasMedian"]
+                    tx_hash = await self._sign_and_send(tx, private_key)
+                print(f"Transaction {i+1}/{len(txs)} Hash: {tx_hash.hex()}")
+                tx_hashes.append(tx_hash)
+            except Exception as e:
+                print(f"Transaction {i+1} Error: {e}")
+                report_error(e)
+                self.nonce_manager.resync()
+                break
+
+        if not tx_hashes:
+            return False
+        try:
+            tx_receipts = await asyncio.gather(*(
+                self.w3.eth.wait_for_transaction_receipt(tx_hash) for tx_hash in tx_hashes
+            ))
+        except Exception as e:
+            print(f"Error waiting for receipts: {e}")
+            report_error(e)
+            return False
+        return self._report_receipts(tx_receipts, txs)
+
+    async def get_token_info(self, token_address: str) -> dict:
+        token = self.load_erc20_contract(token_address)
+        try:
+            metadata, (total_supply, balance) = await asyncio.gather(
+                self.get_token_metadata(token_address),
+                self.batch_call([
+                    token.functions.totalSupply(),
+                    token.functions.balanceOf(self.user_address),
+                ], allow_failure=False),
+            )
+            return {
+                'name': metadata['name'],
+                'symbol': metadata['symbol'],
+                'decimals': metadata['decimals'],
+                'total_supply': total_supply,
+                'balance': balance
+            }
+        except Exception as e:
+            print(f"Error getting token info: {e}")
+            report_error(e)
+            return None
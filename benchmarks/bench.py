@@ -0,0 +1,259 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [REPO_ROOT, os.path.join(REPO_ROOT, "Dapps"), os.path.dirname(os.path.abspath(__file__))]
+
+import web3  # noqa: E402
+from eth_account import Account  # noqa: E402
+from stub_node import StubNode  # noqa: E402
+from web3utility import Web3Utility, load_abi  # noqa: E402
+from uniswap_utility import Uniutility, UNI_V3_ROUTER2_ABI_PATH  # noqa: E402
+
+"""
+ホットパスのベンチマーク
+
+StubNode（記録済みの応答を返すローカル JSON-RPC ノード）に対して Web3Utility / Uniutility の主要な処理を計測します。
+実ノード・API キー・実際の送金は不要です。
+
+計測項目: ops/sec、p50 / p99 レイテンシ、1回あたりの JSON-RPC 呼び出し数と HTTP 往復数、ピークメモリ（tracemalloc）
+
+使い方（リポジトリのルートで実行）:
+    python benchmarks/bench.py --latency 0.002 --output bench.json
+    python benchmarks/bench.py --compare bench.json            # 前回の結果と比較し、劣化があれば終了コード 1
+    python benchmarks/bench.py --record https://...           # 実ノードの応答でフィクスチャを作り直す
+"""
+
+DEFAULT_FIXTURE = os.path.join(REPO_ROOT, "benchmarks", "fixtures", "base.json")
+RESULT_FORMAT_VERSION = 1
+# 比較時に劣化とみなす p50 の増加率
+DEFAULT_THRESHOLD = 0.10
+
+CHAIN = "base"
+ROUTER = "0x2626664c2603336E57B271c5C0b26F421741e481"
+POOL = "0xd0b53D9277642d899DF5C87A3966A349A798F224"
+WETH = "0x4200000000000000000000000000000000000006"
+USDC = "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913"
+# ベンチマーク専用の鍵（送信はスタブノードで完結し、ネットワークには出ない）
+BENCH_PRIVATE_KEY = "0x" + "4c" * 32
+BENCH_ADDRESS = Account.from_key(BENCH_PRIVATE_KEY).address
+
+# Dapps/test_multicall_decode.py のサンプル（exactInputSingle の multicall と exactInput + unwrapWETH9）
+SAMPLE_CALLDATA = [
+    "0x5ae401dc00000000000000000000000000000000000000000000000000000000671d2a2200000000000000000000000000000000000000000000000000000000000000400000000000000000000000000000000000000000000000000000000000000001000000000000000000000000000000000000000000000000000000000000002000000000000000000000000000000000000000000000000000000000000000e404e45aaf00000000000000000000000082af49447d8a07e3bd95bd0d56f35241523fbab1000000000000000000000000af88d065e77c8cc2239327c5edb3a432268e583100000000000000000000000000000000000000000000000000000000000001f4000000000000000000000000dc333239245ebbc6b656ace7c08099aa415585d10000000000000000000000000000000000000000000000004563918244f4000000000000000000000000000000000000000000000000000000000002dd20955e000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000",
+    "0xac9650d800000000000000000000000000000000000000000000000000000000000000200000000000000000000000000000000000000000000000000000000000000002000000000000000000000000000000000000000000000000000000000000004000000000000000000000000000000000000000000000000000000000000001800000000000000000000000000000000000000000000000000000000000000104b858183f0000000000000000000000000000000000000000000000000000000000000020000000000000000000000000000000000000000000000000000000000000008000000000000000000000000000000000000000000000000000000000000000020000000000000000000000000000000000000000000000000000000007a5d18300000000000000000000000000000000000000000000000000b48d14f95e39d8000000000000000000000000000000000000000000000000000000000000002baf88d065e77c8cc2239327c5edb3a432268e58310001f482af49447d8a07e3bd95bd0d56f35241523fbab100000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000004449404b7c00000000000000000000000000000000000000000000000000b48d14f95e39d80000000000000000000000004c2ed46a52e58f25017638b340e62aeb68458cb800000000000000000000000000000000000000000000000000000000",
+]
+SEND_BATCH_SIZE = 5
+
+
+class Benchmark:
+    def __init__(self, name: str, op: Callable[[], object], iterations: int = None):
+        """iterations: 1回が重い処理の回数（None なら --iterations）"""
+        self.name = name
+        self.op = op
+        self.iterations = iterations
+
+
+def new_utility(url: str, lazy: bool = True) -> Uniutility:
+    return Uniutility(rpc_url=url, chain=CHAIN, contract_address=ROUTER, user_address=BENCH_ADDRESS, lazy=lazy)
+
+
+def swap_tx(uni: Uniutility, amount_in: int) -> dict:
+    calldata = uni.encode_call("exactInputSingle", [{
+        "tokenIn": WETH,
+        "tokenOut": USDC,
+        "fee": 500,
+        "recipient": BENCH_ADDRESS,
+        "amountIn": amount_in,
+        "amountOutMinimum": 0,
+        "sqrtPriceLimitX96": 0,
+    }])
+    return {"to": uni.target_contract, "data": calldata, "value": 0, "gas": 200000, "type": 2, "chainId": 8453}
+
+
+def benchmarks(url: str, iterations: int) -> List[Benchmark]:
+    uni = new_utility(url)
+    uni.get_block_gas_fees()
+    uni.get_pool_address(WETH, USDC, [500])
+    router_abi = load_abi(UNI_V3_ROUTER2_ABI_PATH)
+    amounts = iter(range(10 ** 15, 10 ** 18))
+
+    def construct():
+        return Web3Utility(rpc_url=url, chain=CHAIN, contract_address=ROUTER, abi=router_abi, user_address=BENCH_ADDRESS)
+
+    def simple_slippage():
+        # メタデータのキャッシュを含めない1回分（slot0 + プールのメタデータ）
+        uni.metadata_cache.clear()
+        return uni.simple_slippage(POOL, True, 10 ** 18, 0.5)
+
+    def encode_router_calls():
+        inner = swap_tx(uni, next(amounts))["data"]
+        return uni.encode_call("multicall", [[inner, uni.encode_call("unwrapWETH9", [0])]])
+
+    def send_multiple_tx():
+        txs = [swap_tx(uni, next(amounts)) for _ in range(SEND_BATCH_SIZE)]
+        return uni.send_multiple_tx(txs, BENCH_PRIVATE_KEY, pipeline=True)
+
+    heavy = max(1, iterations // 10)
+    return [
+        Benchmark("construction", construct, heavy),
+        Benchmark("construction_lazy", lambda: new_utility(url), heavy),
+        Benchmark("get_block_gas_fees", uni.get_block_gas_fees),
+        Benchmark("simple_slippage", simple_slippage),
+        Benchmark("simple_slippage_warm", lambda: uni.simple_slippage(POOL, True, 10 ** 18, 0.5)),
+        Benchmark("get_pool_address", lambda: uni.get_pool_address(WETH, USDC, [500])),
+        Benchmark("decode_multicall", lambda: [uni.decode_multicall(data) for data in SAMPLE_CALLDATA]),
+        Benchmark("encode_router_calls", encode_router_calls),
+        Benchmark(f"send_multiple_tx_x{SEND_BATCH_SIZE}", send_multiple_tx, heavy),
+    ]
+
+
+def run_benchmark(benchmark: Benchmark, node: StubNode, iterations: int, warmup: int) -> dict:
+    count = benchmark.iterations or iterations
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(min(warmup, count)):
+            benchmark.op()
+
+        node.reset_stats()
+        timings = np.empty(count)
+        for index in range(count):
+            start = time.perf_counter()
+            benchmark.op()
+            timings[index] = time.perf_counter() - start
+        calls = node.total_calls()
+        round_trips = node.round_trips
+        misses = sum(node.misses.values())
+
+        # tracemalloc は処理を遅くするため、ピークメモリは別の少ない回数で測る
+        tracemalloc.start()
+        for _ in range(min(count, 10)):
+            benchmark.op()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "iterations": count,
+        "ops_per_sec": round(count / timings.sum(), 2),
+        "p50_ms": round(float(np.percentile(timings, 50)) * 1000, 4),
+        "p99_ms": round(float(np.percentile(timings, 99)) * 1000, 4),
+        "mean_ms": round(float(timings.mean()) * 1000, 4),
+        "rpc_calls_per_op": round(calls / count, 3),
+        "round_trips_per_op": round(round_trips / count, 3),
+        "peak_memory_kib": round(peak / 1024, 1),
+        "fixture_misses": misses,
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(results: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """p50 が threshold 以上遅くなったもの・RPC 呼び出し数が増えたものを劣化として返します"""
+    regressions = []
+    for setting in ("latency", "jitter", "fixture"):
+        if results["meta"].get(setting) != baseline["meta"].get(setting):
+            print(f"warning: {setting} differs from the baseline "
+                  f"({baseline['meta'].get(setting)} -> {results['meta'].get(setting)}); timings are not comparable")
+    print(f"\n{'benchmark':28} {'p50 base':>10} {'p50 now':>10} {'change':>8} {'rpc base':>9} {'rpc now':>8}")
+    for name, result in results["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:28} {'-':>10} {result['p50_ms']:>10.4f}")
+            continue
+        change = result["p50_ms"] / base["p50_ms"] - 1 if base["p50_ms"] else 0.0
+        print(f"{name:28} {base['p50_ms']:>10.4f} {result['p50_ms']:>10.4f} {change:>+8.1%} "
+              f"{base['rpc_calls_per_op']:>9} {result['rpc_calls_per_op']:>8}")
+        if change > threshold:
+            regressions.append(f"{name}: p50 {base['p50_ms']}ms -> {result['p50_ms']}ms ({change:+.1%})")
+        if result["rpc_calls_per_op"] > base["rpc_calls_per_op"]:
+            regressions.append(
+                f"{name}: RPC calls per op {base['rpc_calls_per_op']} -> {result['rpc_calls_per_op']}"
+            )
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Web3Utility hot paths against a local stub JSON-RPC node")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE, help="recorded JSON-RPC responses")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every HTTP request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="uniform random extra latency (seconds)")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--only", nargs="*", help="run only these benchmarks")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline results JSON; exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed p50 slowdown ratio")
+    parser.add_argument("--record", metavar="RPC_URL", help="forward unrecorded calls to RPC_URL and save the fixture")
+    args = parser.parse_args(argv)
+
+    # ABI は相対パスで読み込むため、リポジトリのルートで実行する
+    os.chdir(REPO_ROOT)
+    fixture = args.fixture if os.path.exists(args.fixture) or not args.record else None
+    node = StubNode(fixture, latency=args.latency, jitter=args.jitter, upstream=args.record)
+    url = node.start()
+    try:
+        results: Dict[str, dict] = {}
+        for benchmark in benchmarks(url, args.iterations):
+            if args.only and benchmark.name not in args.only:
+                continue
+            results[benchmark.name] = result = run_benchmark(benchmark, node, args.iterations, args.warmup)
+            print(f"{benchmark.name:28} {result['ops_per_sec']:>12.1f} ops/s  p50 {result['p50_ms']:>9.4f}ms  "
+                  f"p99 {result['p99_ms']:>9.4f}ms  rpc/op {result['rpc_calls_per_op']:>6}  "
+                  f"peak {result['peak_memory_kib']:>8.1f}KiB")
+            if result["fixture_misses"]:
+                print(f"  warning: {result['fixture_misses']} calls had no recorded response")
+        if args.record:
+            node.save(args.fixture)
+            print(f"Fixture saved: {args.fixture}")
+    finally:
+        node.stop()
+
+    report = {
+        "format": RESULT_FORMAT_VERSION,
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "web3": web3.__version__,
+            "platform": platform.platform(),
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "fixture": os.path.relpath(args.fixture, REPO_ROOT),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Results saved: {args.output}")
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(report, json.load(file), args.threshold)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
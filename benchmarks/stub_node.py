@@ -0,0 +1,190 @@
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Union
+
+import requests
+from eth_utils import keccak
+
+"""
+StubNode クラス
+
+記録済みの JSON-RPC 応答を返すローカルのスタブノードです。ベンチマークを実ノード・API キーなしで再現するために使います。
+
+- 応答は (method, params) の組ごとにフィクスチャ（JSON）から返す。params が一致しない場合は method の "*" を返す
+- eth_sendRawTransaction は raw トランザクションの keccak を tx hash として返し（記録モードでも転送しない）、
+  eth_getTransactionReceipt はレシートの雛形の transactionHash を差し替えて返す（署名ごとに値が変わるため）
+- latency / jitter 秒の遅延を HTTP リクエストごとに入れる（バッチは1往復として扱う）
+- upstream を指定すると、フィクスチャにない呼び出しを実ノードに転送して記録する（save() でフィクスチャとして保存）
+- calls（JSON-RPC メソッドごとの呼び出し数）と round_trips（HTTP リクエスト数）を数える
+"""
+
+WILDCARD = "*"
+# 送信したトランザクションは実ノードに転送しないため、レシートはこの雛形（またはフィクスチャの receipt）から作る
+DEFAULT_RECEIPT = {
+    "blockHash": "0x" + "00" * 32,
+    "blockNumber": "0x1",
+    "contractAddress": None,
+    "cumulativeGasUsed": "0x2dc6c",
+    "effectiveGasPrice": "0x3b9aca00",
+    "from": "0x" + "00" * 20,
+    "gasUsed": "0x2dc6c",
+    "logs": [],
+    "logsBloom": "0x" + "00" * 256,
+    "status": "0x1",
+    "to": "0x" + "00" * 20,
+    "transactionIndex": "0x0",
+    "type": "0x2",
+}
+
+
+def load_fixture(path: str) -> dict:
+    with open(path) as file:
+        return json.load(file)
+
+
+def params_key(params: Any) -> str:
+    return json.dumps(params or [], sort_keys=True, separators=(",", ":"))
+
+
+class StubNode:
+    def __init__(self,
+                 fixture: Union[str, dict] = None,
+                 latency: float = 0.0,
+                 jitter: float = 0.0,
+                 upstream: str = None,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 seed: int = 0):
+        """
+        fixture: フィクスチャのパスまたは dict（{"responses": {method: {params_key: result}}, "receipt": {...}}）
+        latency / jitter: HTTP リクエストごとの遅延（秒）。jitter は 0〜jitter の一様乱数を加える
+        upstream: 記録モードの転送先 RPC URL
+        """
+        if isinstance(fixture, str):
+            fixture = load_fixture(fixture)
+        fixture = fixture or {}
+        self.responses: Dict[str, Dict[str, Any]] = fixture.get("responses", {})
+        self.receipt: Optional[dict] = fixture.get("receipt")
+        self.latency = latency
+        self.jitter = jitter
+        self.upstream = upstream
+        self.calls = Counter()
+        self.round_trips = 0
+        self.misses = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._session = requests.Session() if upstream else None
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubNode":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.calls.clear()
+            self.misses.clear()
+            self.round_trips = 0
+
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def save(self, path: str) -> None:
+        """記録した応答をフィクスチャとして保存します"""
+        with open(path, "w") as file:
+            json.dump({"responses": self.responses, "receipt": self.receipt or DEFAULT_RECEIPT}, file, indent=1, sort_keys=True)
+
+    def _handler(self):
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # ヘッダと本文が別々に送られるため、Nagle を切らないと遅延 ACK で 1 往復ごとに約 40ms 待たされる
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_POST(self) -> None:
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                delay = node.latency + (node._random.uniform(0, node.jitter) if node.jitter else 0.0)
+                if delay:
+                    time.sleep(delay)
+                with node._lock:
+                    node.round_trips += 1
+                if isinstance(body, list):
+                    result = [node.handle(request) for request in body]
+                else:
+                    result = node.handle(body)
+                data = json.dumps(result).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def handle(self, request: dict) -> dict:
+        method = request["method"]
+        params = request.get("params") or []
+        with self._lock:
+            self.calls[method] += 1
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        try:
+            response["result"] = self._result(method, params)
+        except LookupError as e:
+            response["error"] = {"code": -32601, "message": str(e)}
+        return response
+
+    def _result(self, method: str, params: list) -> Any:
+        if method == "eth_sendRawTransaction":
+            raw = bytes.fromhex(params[0][2:])
+            return "0x" + keccak(raw).hex()
+        if method == "eth_getTransactionReceipt":
+            return {**(self.receipt or DEFAULT_RECEIPT), "transactionHash": params[0]}
+
+        recorded = self.responses.get(method, {})
+        key = params_key(params)
+        if key in recorded:
+            return recorded[key]
+        if self.upstream:
+            return self._record(method, params, key)
+        if WILDCARD in recorded:
+            return recorded[WILDCARD]
+        with self._lock:
+            self.misses[method] += 1
+        raise LookupError(f"No recorded response for {method} {key}")
+
+    def _record(self, method: str, params: list, key: str) -> Any:
+        response = self._session.post(
+            self.upstream, json={"jsonrpc": "2.0", "method": method, "params": params, "id": 1}
+        ).json()
+        if "error" in response:
+            raise LookupError(response["error"].get("message"))
+        with self._lock:
+            self.responses.setdefault(method, {})[key] = response["result"]
+        return response["result"]
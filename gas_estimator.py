@@ -0,0 +1,63 @@
+import threading
+import time
+from typing import Dict, Hashable, Optional
+
+"""
+GasEstimateCache クラス
+
+eth_estimateGas の結果を呼び出しの「形」ごとにキャッシュし、同じ形のトランザクションでは見積もりを省きます。
+
+- キーは呼び出し側が決める（Uniutility では 関数セレクタ・ホップ数・トークンペア、multicall は中身の呼び出しのキーの並び）
+- 返すガスリミットは max(見積もり値, 実際の gasUsed の最大値) × margin。ttl 秒を過ぎたエントリは使わない
+- observe() で送信済みトランザクションのレシートの gasUsed を取り込み、見積もりなしでもリミットを出せるようにする
+"""
+
+DEFAULT_GAS_TTL = 300.0
+DEFAULT_GAS_MARGIN = 1.2
+
+
+class GasEstimateCache:
+    def __init__(self, ttl: float = DEFAULT_GAS_TTL, margin: float = DEFAULT_GAS_MARGIN):
+        self.ttl = ttl
+        self.margin = margin
+        self._entries: Dict[Hashable, dict] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[int]:
+        """キャッシュ済みのガスリミット（margin 込み）を返します。ないか期限切れなら None"""
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry["updated"] > self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return int(max(entry["estimate"], entry["used"]) * self.margin)
+
+    def set(self, key: Hashable, estimate: int) -> int:
+        """eth_estimateGas の結果を登録し、margin 込みのガスリミットを返します"""
+        with self._lock:
+            entry = self._fresh_entry(key)
+            entry["estimate"] = estimate
+            entry["updated"] = time.monotonic()
+            return int(max(estimate, entry["used"]) * self.margin)
+
+    def observe(self, key: Hashable, gas_used: int) -> None:
+        """レシートの gasUsed を取り込みます（同じ形の呼び出しの実績として最大値を保持）"""
+        with self._lock:
+            entry = self._fresh_entry(key)
+            entry["used"] = max(entry["used"], gas_used)
+            entry["updated"] = time.monotonic()
+
+    def _fresh_entry(self, key: Hashable) -> dict:
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry["updated"] > self.ttl:
+            entry = self._entries[key] = {"estimate": 0, "used": 0, "updated": 0.0}
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
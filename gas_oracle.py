@@ -0,0 +1,104 @@
+import threading
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Dict, List
+
+"""
+GasOracle クラス
+
+fee_history の結果をブロック番号単位でキャッシュし、直近 blocks 件のローリングウィンドウで
+ベースフィー平均とリワード中央値を差分更新します。
+
+- 新しいヘッドでは未取得のブロック分だけ fee_history を取得して update() に渡す
+- ベースフィーは合計値、リワードはパーセンタイルごとのソート済みリストを保持し、追加・削除のみで集計する
+- 同じヘッドの間は fees() が同じ結果を返すため、バッチ内のトランザクションのガス料金が揃う
+"""
+
+GAS_STRATEGIES = {
+    "slow": {"reward_percentile": 25, "max_fee_multiplier": 1.5, "reward_multiplier": 1},
+    "normal": {"reward_percentile": 50, "max_fee_multiplier": 2, "reward_multiplier": 1},
+    "fast": {"reward_percentile": 75, "max_fee_multiplier": 2.5, "reward_multiplier": 1.25},
+}
+
+
+class GasOracle:
+    def __init__(self, blocks: int = 50, percentiles: List[int] = [25, 50, 75]):
+        self.blocks = blocks
+        self.percentiles = list(percentiles)
+        self.newest_block = None
+        self._lock = threading.Lock()
+        self._fees_cache: Dict[tuple, dict] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        self.newest_block = None
+        self._window = deque()
+        self._base_fee_sum = 0
+        self._sorted_rewards = [[] for _ in self.percentiles]
+        self._fees_cache.clear()
+
+    def blocks_to_fetch(self, head_block: int) -> int:
+        """head_block までのうち、まだウィンドウに入っていないブロック数を返します"""
+        if self.newest_block is None or head_block < self.newest_block:
+            return self.blocks
+        return min(head_block - self.newest_block, self.blocks)
+
+    def update(self, fee_history: dict) -> None:
+        oldest_block = int(fee_history["oldestBlock"])
+        base_fees = fee_history["baseFeePerGas"]
+        rewards = fee_history["reward"]
+        with self._lock:
+            if self.newest_block is not None and oldest_block + len(rewards) - 1 < self.newest_block:
+                # ヘッドが巻き戻った（リオーグ・別ノード）場合は作り直す
+                self.reset()
+            for index, reward in enumerate(rewards):
+                block_number = oldest_block + index
+                if self.newest_block is not None and block_number <= self.newest_block:
+                    continue
+                self._push(base_fees[index], reward)
+                self.newest_block = block_number
+            self._fees_cache.clear()
+
+    def _push(self, base_fee: int, reward: List[int]) -> None:
+        self._window.append((base_fee, reward))
+        self._base_fee_sum += base_fee
+        for sorted_reward, value in zip(self._sorted_rewards, reward):
+            insort(sorted_reward, value)
+        if len(self._window) > self.blocks:
+            old_base_fee, old_reward = self._window.popleft()
+            self._base_fee_sum -= old_base_fee
+            for sorted_reward, value in zip(self._sorted_rewards, old_reward):
+                del sorted_reward[bisect_left(sorted_reward, value)]
+
+    def fees(self,
+             reward_percentile: int = 50,
+             max_fee_multiplier: float = 2,
+             reward_multiplier: float = 1) -> dict:
+        key = (self.newest_block, reward_percentile, max_fee_multiplier, reward_multiplier)
+        cached = self._fees_cache.get(key)
+        if cached is not None:
+            return cached
+        with self._lock:
+            if not self._window:
+                raise ValueError("GasOracle has no fee history yet")
+            base_fee_avg = self._base_fee_sum / len(self._window)
+            priority_fee_median = self._median(self._sorted_rewards[self.percentiles.index(reward_percentile)])
+
+        max_fee = (base_fee_avg * max_fee_multiplier) + priority_fee_median * reward_multiplier
+        result = {
+            'maxFeePerGas': int(max_fee),
+            'priorityFeePerGasMedian': int(priority_fee_median),
+            'baseFeeAvg': int(base_fee_avg),
+        }
+        self._fees_cache[key] = result
+        return result
+
+    def strategy_fees(self, strategy: str = "normal") -> dict:
+        return self.fees(**GAS_STRATEGIES[strategy])
+
+    @staticmethod
+    def _median(sorted_values: List[int]) -> float:
+        middle = len(sorted_values) // 2
+        if len(sorted_values) % 2:
+            return sorted_values[middle]
+        return (sorted_values[middle - 1] + sorted_values[middle]) / 2
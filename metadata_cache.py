@@ -0,0 +1,74 @@
+import json
+import sqlite3
+import threading
+from typing import Dict, Optional, Tuple
+
+"""
+MetadataCache クラス
+
+デプロイ後に変化しないコントラクトのメタデータ（トークンの name / symbol / decimals、
+プールの token0 / token1 / fee など）を (chain_id, address) 単位でキャッシュします。
+
+- メモリ層: プロセス内の dict（ヒット時は RPC を一切呼ばない）
+- 永続層: db_path を指定した場合のみ sqlite に書き込み、再起動後も再利用する
+"""
+
+
+class MetadataCache:
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path
+        self._memory: Dict[Tuple[int, str], dict] = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS metadata ("
+                "chain_id INTEGER NOT NULL, "
+                "address TEXT NOT NULL, "
+                "data TEXT NOT NULL, "
+                "PRIMARY KEY (chain_id, address))"
+            )
+            self._db.commit()
+
+    def get(self, chain_id: int, address: str) -> Optional[dict]:
+        key = (chain_id, address)
+        metadata = self._memory.get(key)
+        if metadata is not None or self._db is None:
+            return metadata
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM metadata WHERE chain_id = ? AND address = ?", key
+            ).fetchone()
+        if row is None:
+            return None
+        metadata = json.loads(row[0])
+        self._memory[key] = metadata
+        return metadata
+
+    def set(self, chain_id: int, address: str, metadata: dict) -> None:
+        self.set_many(chain_id, {address: metadata})
+
+    def set_many(self, chain_id: int, entries: Dict[str, dict]) -> None:
+        for address, metadata in entries.items():
+            self._memory[(chain_id, address)] = metadata
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO metadata (chain_id, address, data) VALUES (?, ?, ?)",
+                [(chain_id, address, json.dumps(metadata)) for address, metadata in entries.items()]
+            )
+            self._db.commit()
+
+    def clear(self) -> None:
+        self._memory.clear()
+        if self._db is not None:
+            with self._lock:
+                self._db.execute("DELETE FROM metadata")
+                self._db.commit()
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
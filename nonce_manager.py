@@ -0,0 +1,68 @@
+import asyncio
+import threading
+from typing import Awaitable, Callable, Optional
+
+"""
+NonceManager クラス
+
+送信アドレスごとの nonce をローカルで払い出します。
+
+- 最初の払い出し時だけ pending の nonce をノードから取得し、以降はメモリ上でインクリメントする
+- threading.Lock で払い出しをアトミックにし、非同期版は asyncio.Lock で初回取得の重複を防ぐ
+- "nonce too low" / "replacement transaction underpriced" などのエラーを受けたら resync() でノードの値に合わせ直す
+"""
+
+NONCE_ERROR_MESSAGES = (
+    "nonce too low",
+    "replacement transaction underpriced",
+    "replacement underpriced",
+)
+
+
+class NonceManager:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._async_lock: Optional[asyncio.Lock] = None
+        self._next_nonce: Optional[int] = None
+
+    @staticmethod
+    def is_nonce_error(error: Exception) -> bool:
+        message = str(error).lower()
+        return any(pattern in message for pattern in NONCE_ERROR_MESSAGES)
+
+    def next_nonce(self, fetch_nonce: Callable[[], int]) -> int:
+        with self._lock:
+            if self._next_nonce is None:
+                self._next_nonce = fetch_nonce()
+            nonce = self._next_nonce
+            self._next_nonce += 1
+            return nonce
+
+    async def async_next_nonce(self, fetch_nonce: Callable[[], Awaitable[int]]) -> int:
+        if self._next_nonce is None:
+            if self._async_lock is None:
+                self._async_lock = asyncio.Lock()
+            async with self._async_lock:
+                if self._next_nonce is None:
+                    pending_nonce = await fetch_nonce()
+                    with self._lock:
+                        if self._next_nonce is None:
+                            self._next_nonce = pending_nonce
+        with self._lock:
+            nonce = self._next_nonce
+            self._next_nonce += 1
+            return nonce
+
+    def prime(self, pending_nonce: int) -> None:
+        """バッチなどで取得済みの pending nonce を初期値として設定します（払い出し済みの場合は何もしない）"""
+        with self._lock:
+            if self._next_nonce is None:
+                self._next_nonce = pending_nonce
+
+    def resync(self) -> None:
+        """次の払い出し時にノードから pending nonce を取得し直します"""
+        with self._lock:
+            self._next_nonce = None
+
+    def peek(self) -> Optional[int]:
+        return self._next_nonce
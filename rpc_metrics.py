@@ -0,0 +1,462 @@
+import asyncio
+import contextvars
+import functools
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from web3._utils.encoding import FriendlyJsonSerde, Web3JsonEncoder
+
+"""
+RpcMetrics クラス / instrument_provider・instrument_methods 関数
+
+Web3Utility の実行時コストを計測します。プロバイダと公開メソッドをラップし、次の値を集計します。
+
+- JSON-RPC メソッドごと: 呼び出し数、エラー数（例外クラス名 / JSON-RPC のエラーコード）、レイテンシのヒストグラム、
+  リクエスト・レスポンスのバイト数
+- 公開メソッド（simple_slippage、get_block_gas_fees、send_multiple_tx など）ごと: 呼び出し数、エラー、レイテンシのヒストグラム
+  エラーは外に出た例外に加え、メソッド内で捕捉して表示だけした例外（report_error() で報告されたもの）も数える
+- tracing=True の場合: 各 RPC 呼び出しを、それを起こした一番外側の公開メソッドに帰属させる
+  （「1回の見積もりで RPC を何回呼んでいるか」を operation_rpc_calls で確認できる）
+
+呼び出し数とエラー数は常に正確に数え、レイテンシとバイト数は sample_rate の割合の呼び出しだけで測ります
+（バイト数は JSON を再エンコードして数えるため、呼び出し数の多い環境では sample_rate を下げる）。
+バッチ（make_batch_request）は中身のメソッドごとに数え、往復数・レイテンシ・バイト数はメソッド別とは分けて batch に記録します。
+
+stats() で dict、prometheus_text() で Prometheus のテキスト形式を返し、serve_metrics() で /metrics を公開できます。
+"""
+
+# 秒。Prometheus の既定値に近い境界で、RPC の 1ms 未満〜タイムアウトまでを分ける
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC_PREFIX = "web3utility"
+UNTRACED = "-"
+
+# 実行中の公開メソッドの名前（一番外側のもの）。スレッドプールで待つレシートなど、別スレッドの呼び出しは UNTRACED になる
+_current_operation: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_operation", default=None)
+# 実行中の一番内側の計測対象メソッドで報告されたエラー（計測していなければ None）
+_operation_errors: contextvars.ContextVar[Optional[List[str]]] = contextvars.ContextVar("operation_errors", default=None)
+
+
+def report_error(error: BaseException) -> None:
+    """
+    メソッド内で捕捉してエラー表示だけした例外を、実行中の計測対象メソッドのエラーとして記録します
+    （計測していない場合は何もしない）
+    """
+    errors = _operation_errors.get()
+    if errors is not None:
+        errors.append(type(error).__name__)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """バケットの上限で近似したパーセンタイル（最後のバケットは最大の境界を返す）"""
+        if not self.count:
+            return None
+        rank = self.count * percent / 100
+        seen = 0
+        for bound, bucket_count in zip(self.buckets + (self.buckets[-1],), self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+    def summary(self) -> dict:
+        return {
+            "sampled": self.count,
+            "mean_ms": round(self.sum / self.count * 1000, 3) if self.count else None,
+            "p50_ms": _ms(self.percentile(50)),
+            "p99_ms": _ms(self.percentile(99)),
+        }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def _json_size(value: Any) -> int:
+    return len(FriendlyJsonSerde().json_encode(value, Web3JsonEncoder).encode())
+
+
+def _response_error(response: Any) -> Optional[str]:
+    if isinstance(response, dict) and "error" in response:
+        error = response["error"]
+        code = error.get("code") if isinstance(error, dict) else None
+        return f"rpc_error({code})"
+    return None
+
+
+class _Counters:
+    __slots__ = ("calls", "errors", "latency", "request_bytes", "response_bytes")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.calls = 0
+        self.errors: Dict[str, int] = {}
+        self.latency = Histogram(buckets)
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+
+class RpcMetrics:
+    def __init__(self,
+                 sample_rate: float = 1.0,
+                 tracing: bool = False,
+                 buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        """
+        sample_rate: レイテンシとバイト数を測る呼び出しの割合（0〜1）
+        tracing: RPC 呼び出しを公開メソッドに帰属させる
+        """
+        self.sample_rate = sample_rate
+        self.tracing = tracing
+        self.buckets = tuple(buckets)
+        self.rpc: Dict[str, _Counters] = {}
+        # バッチの往復（calls は往復数）
+        self.batch = _Counters(self.buckets)
+        self.operations: Dict[str, _Counters] = {}
+        self.operation_rpc_calls: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self._random = random.random
+
+    def sampled(self) -> bool:
+        return self.sample_rate >= 1.0 or self._random() < self.sample_rate
+
+    def _counters(self, table: Dict[str, _Counters], name: str) -> _Counters:
+        counters = table.get(name)
+        if counters is None:
+            counters = table[name] = _Counters(self.buckets)
+        return counters
+
+    def record_rpc(self,
+                   methods: Iterable[str],
+                   errors: Iterable[Optional[str]] = (),
+                   latency: float = None,
+                   request_bytes: int = 0,
+                   response_bytes: int = 0,
+                   batch: bool = False) -> None:
+        """
+        methods の呼び出し数と errors（methods と同じ順のエラークラス、なければ None）を数えます
+        latency / バイト数（サンプルされた呼び出しのみ渡す）は methods の先頭に記録し、
+        batch=True の場合はバッチの往復として batch に記録して往復数を数えます
+        """
+        methods = list(methods)
+        operation = (_current_operation.get() or UNTRACED) if self.tracing else None
+        with self._lock:
+            for method in methods:
+                self._counters(self.rpc, method).calls += 1
+                if operation is not None:
+                    per_method = self.operation_rpc_calls.setdefault(operation, {})
+                    per_method[method] = per_method.get(method, 0) + 1
+            if batch:
+                self.batch.calls += 1
+            for method, error in zip(methods, errors):
+                if error is not None:
+                    counter_errors = self._counters(self.rpc, method).errors
+                    counter_errors[error] = counter_errors.get(error, 0) + 1
+            if latency is not None:
+                counters = self.batch if batch else self._counters(self.rpc, methods[0])
+                counters.latency.observe(latency)
+                counters.request_bytes += request_bytes
+                counters.response_bytes += response_bytes
+
+    def record_operation(self, name: str, latency: Optional[float], error: Optional[str] = None) -> None:
+        with self._lock:
+            counters = self._counters(self.operations, name)
+            counters.calls += 1
+            if error is not None:
+                counters.errors[error] = counters.errors.get(error, 0) + 1
+            if latency is not None:
+                counters.latency.observe(latency)
+
+    @contextmanager
+    def trace(self, operation: str):
+        """with metrics.trace("rebalance"): の中の RPC 呼び出しを operation に帰属させます（tracing=True のとき）"""
+        token = _current_operation.set(_current_operation.get() or operation)
+        try:
+            yield
+        finally:
+            _current_operation.reset(token)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.rpc.clear()
+            self.batch = _Counters(self.buckets)
+            self.operations.clear()
+            self.operation_rpc_calls.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            rpc = {name: self._summary(counters, True) for name, counters in self.rpc.items()}
+            batch = self._summary(self.batch, True)
+            batch["round_trips"] = batch.pop("calls")
+            del batch["errors"]
+            operations = {name: self._summary(counters, False) for name, counters in self.operations.items()}
+            result = {"sample_rate": self.sample_rate, "rpc": rpc, "batch": batch, "operations": operations}
+            if self.tracing:
+                result["operation_rpc_calls"] = {
+                    operation: {
+                        "total": sum(per_method.values()),
+                        "per_call": round(
+                            sum(per_method.values()) / self.operations[operation].calls, 3
+                        ) if operation in self.operations else None,
+                        "methods": dict(per_method),
+                    }
+                    for operation, per_method in self.operation_rpc_calls.items()
+                }
+            return result
+
+    @staticmethod
+    def _summary(counters: _Counters, payload: bool) -> dict:
+        summary = {"calls": counters.calls, "errors": dict(counters.errors), **counters.latency.summary()}
+        if payload:
+            summary["request_bytes"] = counters.request_bytes
+            summary["response_bytes"] = counters.response_bytes
+        return summary
+
+    def prometheus_text(self, prefix: str = METRIC_PREFIX) -> str:
+        """Prometheus のテキスト形式（exposition format 0.0.4）で返します"""
+        lines: List[str] = []
+        with self._lock:
+            for kind, table, label in (("rpc", self.rpc, "method"), ("operation", self.operations, "operation")):
+                name = f"{prefix}_{kind}"
+                lines += [f"# HELP {name}_calls_total Calls by {label}", f"# TYPE {name}_calls_total counter"]
+                lines += [f'{name}_calls_total{{{label}="{key}"}} {c.calls}' for key, c in table.items()]
+                lines += [f"# HELP {name}_errors_total Errors by {label} and class", f"# TYPE {name}_errors_total counter"]
+                lines += [
+                    f'{name}_errors_total{{{label}="{key}",error="{error}"}} {count}'
+                    for key, c in table.items() for error, count in c.errors.items()
+                ]
+                lines += [f"# HELP {name}_latency_seconds Sampled latency by {label}",
+                          f"# TYPE {name}_latency_seconds histogram"]
+                for key, c in table.items():
+                    cumulative = 0
+                    for bound, count in zip(c.latency.buckets, c.latency.counts):
+                        cumulative += count
+                        lines.append(f'{name}_latency_seconds_bucket{{{label}="{key}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_latency_seconds_bucket{{{label}="{key}",le="+Inf"}} {c.latency.count}')
+                    lines.append(f'{name}_latency_seconds_sum{{{label}="{key}"}} {c.latency.sum}')
+                    lines.append(f'{name}_latency_seconds_count{{{label}="{key}"}} {c.latency.count}')
+
+            for direction in ("request", "response"):
+                name = f"{prefix}_rpc_{direction}_bytes_total"
+                lines += [f"# HELP {name} Sampled JSON-RPC {direction} bytes", f"# TYPE {name} counter"]
+                lines += [
+                    f'{name}{{method="{key}"}} {getattr(c, direction + "_bytes")}' for key, c in self.rpc.items()
+                ]
+
+            name = f"{prefix}_rpc_batch"
+            batch = self.batch
+            lines += [f"# HELP {name}_round_trips_total JSON-RPC batch requests (HTTP round trips)",
+                      f"# TYPE {name}_round_trips_total counter",
+                      f"{name}_round_trips_total {batch.calls}",
+                      f"# HELP {name}_latency_seconds Sampled batch latency",
+                      f"# TYPE {name}_latency_seconds histogram"]
+            cumulative = 0
+            for bound, count in zip(batch.latency.buckets, batch.latency.counts):
+                cumulative += count
+                lines.append(f'{name}_latency_seconds_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_latency_seconds_bucket{{le="+Inf"}} {batch.latency.count}')
+            lines.append(f"{name}_latency_seconds_sum {batch.latency.sum}")
+            lines.append(f"{name}_latency_seconds_count {batch.latency.count}")
+            for direction in ("request", "response"):
+                lines += [f"# HELP {name}_{direction}_bytes_total Sampled batch {direction} bytes",
+                          f"# TYPE {name}_{direction}_bytes_total counter",
+                          f"{name}_{direction}_bytes_total {getattr(batch, direction + '_bytes')}"]
+
+            if self.tracing:
+                name = f"{prefix}_operation_rpc_calls_total"
+                lines += [f"# HELP {name} JSON-RPC calls attributed to the outermost operation", f"# TYPE {name} counter"]
+                lines += [
+                    f'{name}{{operation="{operation}",method="{method}"}} {count}'
+                    for operation, per_method in self.operation_rpc_calls.items()
+                    for method, count in per_method.items()
+                ]
+        return "\n".join(lines) + "\n"
+
+
+def instrument_provider(provider, metrics: RpcMetrics) -> RpcMetrics:
+    """
+    provider の make_request / make_batch_request をラップします（同期・非同期どちらのプロバイダでも可）
+    すでにラップ済みのプロバイダは、そのときの RpcMetrics を返します（同じ接続を共有するビュー向け）
+    """
+    existing = getattr(provider, "rpc_metrics", None)
+    if existing is not None:
+        return existing
+
+    make_request = provider.make_request
+    make_batch_request = getattr(provider, "make_batch_request", None)
+    is_async = asyncio.iscoroutinefunction(make_request)
+
+    def record_request(method, params, response, error, started):
+        if started is None:
+            metrics.record_rpc([method], [error or _response_error(response)])
+            return
+        metrics.record_rpc(
+            [method],
+            [error or _response_error(response)],
+            time.perf_counter() - started,
+            _json_size({"method": method, "params": params}),
+            _json_size(response) if response is not None else 0,
+        )
+
+    def record_batch(batch, responses, error, started):
+        methods = [method for method, _ in batch]
+        errors = [error] * len(batch) if error else [_response_error(response) for response in responses]
+        if started is None:
+            metrics.record_rpc(methods, errors, batch=True)
+            return
+        metrics.record_rpc(
+            methods,
+            errors,
+            time.perf_counter() - started,
+            _json_size([{"method": method, "params": params} for method, params in batch]),
+            _json_size(responses) if responses is not None else 0,
+            batch=True,
+        )
+
+    if is_async:
+        async def instrumented_request(method, params):
+            started = time.perf_counter() if metrics.sampled() else None
+            try:
+                response = await make_request(method, params)
+            except Exception as e:
+                record_request(method, params, None, type(e).__name__, started)
+                raise
+            record_request(method, params, response, None, started)
+            return response
+
+        async def instrumented_batch(batch):
+            started = time.perf_counter() if metrics.sampled() else None
+            try:
+                responses = await make_batch_request(batch)
+            except Exception as e:
+                record_batch(batch, None, type(e).__name__, started)
+                raise
+            record_batch(batch, responses, None, started)
+            return responses
+    else:
+        def instrumented_request(method, params):
+            started = time.perf_counter() if metrics.sampled() else None
+            try:
+                response = make_request(method, params)
+            except Exception as e:
+                record_request(method, params, None, type(e).__name__, started)
+                raise
+            record_request(method, params, response, None, started)
+            return response
+
+        def instrumented_batch(batch):
+            started = time.perf_counter() if metrics.sampled() else None
+            try:
+                responses = make_batch_request(batch)
+            except Exception as e:
+                record_batch(batch, None, type(e).__name__, started)
+                raise
+            record_batch(batch, responses, None, started)
+            return responses
+
+    provider.make_request = instrumented_request
+    if make_batch_request is not None:
+        provider.make_batch_request = instrumented_batch
+    # web3 はミドルウェアと make_request を組み合わせた関数をキャッシュしているため作り直させる
+    provider._request_func_cache = (None, None)
+    provider.rpc_metrics = metrics
+    return metrics
+
+
+def instrument_methods(obj, names: Iterable[str], metrics: RpcMetrics) -> List[str]:
+    """
+    obj の公開メソッド names をインスタンス属性のラッパーで置き換え、呼び出し数・エラー・レイテンシを記録します
+    外に出た例外と、メソッド内で report_error() に渡された例外（最初の1つ）をエラーとして数えます
+    戻り値はラップしたメソッド名のリスト（存在しない名前は無視）
+    """
+    wrapped = []
+    for name in names:
+        method = getattr(obj, name, None)
+        if method is None or not callable(method) or getattr(method, "__instrumented__", False):
+            continue
+        setattr(obj, name, _instrument(name, method, metrics))
+        wrapped.append(name)
+    return wrapped
+
+
+def _instrument(name: str, method, metrics: RpcMetrics):
+    if asyncio.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def instrumented(*args, **kwargs):
+            started = time.perf_counter() if metrics.sampled() else None
+            token = _current_operation.set(_current_operation.get() or name)
+            errors: List[str] = []
+            errors_token = _operation_errors.set(errors)
+            try:
+                result = await method(*args, **kwargs)
+            except Exception as e:
+                metrics.record_operation(name, _elapsed(started), type(e).__name__)
+                raise
+            finally:
+                _operation_errors.reset(errors_token)
+                _current_operation.reset(token)
+            metrics.record_operation(name, _elapsed(started), errors[0] if errors else None)
+            return result
+    else:
+        @functools.wraps(method)
+        def instrumented(*args, **kwargs):
+            started = time.perf_counter() if metrics.sampled() else None
+            token = _current_operation.set(_current_operation.get() or name)
+            errors: List[str] = []
+            errors_token = _operation_errors.set(errors)
+            try:
+                result = method(*args, **kwargs)
+            except Exception as e:
+                metrics.record_operation(name, _elapsed(started), type(e).__name__)
+                raise
+            finally:
+                _operation_errors.reset(errors_token)
+                _current_operation.reset(token)
+            metrics.record_operation(name, _elapsed(started), errors[0] if errors else None)
+            return result
+    instrumented.__instrumented__ = True
+    return instrumented
+
+
+def _elapsed(started: Optional[float]) -> Optional[float]:
+    return None if started is None else time.perf_counter() - started
+
+
+def serve_metrics(metrics: RpcMetrics, port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """GET /metrics で prometheus_text() を返す HTTP サーバーをデーモンスレッドで起動します（停止は shutdown()）"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            data = metrics.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,124 @@
+import asyncio
+from typing import Any, Dict, List, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from web3 import AsyncWeb3, Web3
+from web3._utils.encoding import FriendlyJsonSerde, Web3JsonEncoder
+
+"""
+PooledHTTPProvider / AsyncPooledHTTPProvider クラス
+
+web3 の HTTP プロバイダはスレッド（イベントループ）ごとに既定設定のセッションを作るため、
+並列送信やスレッドプールから呼ぶと接続が使い回されず TLS ハンドシェイクが増えます。
+
+- 1つのセッション（コネクションプール・keep-alive・タイムアウト設定済み）を全スレッドで共有する
+- make_batch_request で複数の JSON-RPC リクエストを1回の配列 POST で送信する（max_batch_size ごとに分割）
+- 応答は id で対応付けて、リクエストと同じ順番で返す
+"""
+
+DEFAULT_PROVIDER_CONFIG = {
+    "pool_connections": 10,
+    "pool_maxsize": 32,
+    "timeout": 10,
+    "max_retries": 0,
+    "keepalive_timeout": 60,
+    "max_batch_size": 100,
+}
+
+
+def provider_config(config: Dict[str, Any] = None) -> Dict[str, Any]:
+    return {**DEFAULT_PROVIDER_CONFIG, **(config or {})}
+
+
+def _encode_batch(provider, batch: List[Tuple[str, Any]]) -> Tuple[List[int], bytes]:
+    ids = [next(provider.request_counter) for _ in batch]
+    payload = [
+        {"jsonrpc": "2.0", "method": method, "params": params or [], "id": request_id}
+        for request_id, (method, params) in zip(ids, batch)
+    ]
+    return ids, FriendlyJsonSerde().json_encode(payload, Web3JsonEncoder).encode()
+
+
+def _order_responses(ids: List[int], responses: Any) -> List[dict]:
+    if not isinstance(responses, list):
+        # バッチ全体が拒否された場合（バッチ非対応のノードなど）は単一のエラーが返る
+        return [responses for _ in ids]
+    by_id = {response.get("id"): response for response in responses}
+    return [by_id.get(request_id, {"error": {"message": "missing response in batch"}}) for request_id in ids]
+
+
+class PooledHTTPProvider(Web3.HTTPProvider):
+    def __init__(self, endpoint_uri: str, config: Dict[str, Any] = None):
+        self.config = provider_config(config)
+        super().__init__(endpoint_uri, request_kwargs={"timeout": self.config["timeout"]})
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.config["pool_connections"],
+            pool_maxsize=self.config["pool_maxsize"],
+            max_retries=self.config["max_retries"],
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({**self.get_request_headers(), "Connection": "keep-alive"})
+
+    def _post(self, data: bytes) -> bytes:
+        response = self.session.post(self.endpoint_uri, data=data, timeout=self.config["timeout"])
+        response.raise_for_status()
+        return response.content
+
+    def make_request(self, method, params):
+        return self.decode_rpc_response(self._post(self.encode_rpc_request(method, params)))
+
+    def make_batch_request(self, batch: List[Tuple[str, Any]]) -> List[dict]:
+        """[(method, params), ...] をまとめて送信し、同じ順番の JSON-RPC 応答のリストを返します"""
+        responses = []
+        size = self.config["max_batch_size"]
+        for start in range(0, len(batch), size):
+            ids, data = _encode_batch(self, batch[start:start + size])
+            responses += _order_responses(ids, self.decode_rpc_response(self._post(data)))
+        return responses
+
+
+class AsyncPooledHTTPProvider(AsyncWeb3.AsyncHTTPProvider):
+    def __init__(self, endpoint_uri: str, config: Dict[str, Any] = None):
+        self.config = provider_config(config)
+        super().__init__(endpoint_uri)
+        self._session = None
+
+    def _get_session(self):
+        import aiohttp
+
+        # aiohttp のセッションはイベントループに紐づくため、使用するループで初回に作成する
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.config["pool_maxsize"],
+                    keepalive_timeout=self.config["keepalive_timeout"],
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.config["timeout"]),
+                headers={**self.get_request_headers(), "Connection": "keep-alive"},
+            )
+        return self._session
+
+    async def _post(self, data: bytes) -> bytes:
+        async with self._get_session().post(self.endpoint_uri, data=data) as response:
+            response.raise_for_status()
+            return await response.read()
+
+    async def make_request(self, method, params):
+        return self.decode_rpc_response(await self._post(self.encode_rpc_request(method, params)))
+
+    async def make_batch_request(self, batch: List[Tuple[str, Any]]) -> List[dict]:
+        size = self.config["max_batch_size"]
+        chunks = [batch[start:start + size] for start in range(0, len(batch), size)]
+        encoded = [_encode_batch(self, chunk) for chunk in chunks]
+        raw_responses = await asyncio.gather(*(self._post(data) for _, data in encoded))
+        responses = []
+        for (ids, _), raw_response in zip(encoded, raw_responses):
+            responses += _order_responses(ids, self.decode_rpc_response(raw_response))
+        return responses
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
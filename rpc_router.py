@@ -0,0 +1,394 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Tuple
+
+from web3.providers.async_base import AsyncBaseProvider
+from web3.providers.base import BaseProvider
+
+from rpc_provider import AsyncPooledHTTPProvider, PooledHTTPProvider, provider_config
+
+"""
+RoutingHTTPProvider / AsyncRoutingHTTPProvider クラス
+
+1つのチェーンに対して複数の RPC エンドポイントを束ね、レイテンシとエラー率に応じて振り分けます。
+
+- エンドポイントごとに直近 window 件のレイテンシとエラーを記録し、p50 / p99 / エラー率を stats() で返す
+- 読み取りは正常なエンドポイントのうち p50 が最も小さいものへ送る
+- ヘッジ: hedge_after 秒（未指定ならそのエンドポイントの hedge_percentile 値）以内に応答がなければ、
+  次のエンドポイントへ同じリクエストを送り、先に返った方を使う
+- 接続エラー・HTTP エラー・レート制限は次のエンドポイントへフェイルオーバーし、連続 max_failures 回で cooldown 秒間外す
+- eth_sendRawTransaction は全エンドポイントへ同時送信し、成功した応答を返す（全て失敗した場合は最初のエラー）
+- フィルタ（eth_newFilter など）はノードごとの状態のため、ヘッジせず1つずつ送り、作成したエンドポイントに
+  フィルタ ID を固定して eth_getFilterChanges / eth_getFilterLogs / eth_uninstallFilter を同じエンドポイントへ送る
+"""
+
+DEFAULT_ROUTER_CONFIG = {
+    "window": 200,
+    "hedge_after": None,
+    "hedge_percentile": 95,
+    "min_hedge_after": 0.02,
+    "initial_hedge_after": 0.5,
+    "max_failures": 3,
+    "cooldown": 10.0,
+}
+BROADCAST_METHODS = ("eth_sendRawTransaction",)
+FILTER_CREATE_METHODS = ("eth_newFilter", "eth_newBlockFilter", "eth_newPendingTransactionFilter")
+FILTER_ID_METHODS = ("eth_getFilterChanges", "eth_getFilterLogs", "eth_uninstallFilter")
+# -32603 (internal error) は revert にも使われるため、フェイルオーバーの対象にしない
+RETRYABLE_ERROR_CODES = (-32005, 429)
+RETRYABLE_ERROR_MESSAGES = ("rate limit", "too many requests", "limit exceeded", "header not found", "timeout")
+
+
+class RetryableRPCError(Exception):
+    def __init__(self, message: str, response: dict = None):
+        super().__init__(message)
+        self.response = response
+
+
+def is_retryable_response(response: dict) -> bool:
+    """エンドポイント側の問題（レート制限・一時的な障害）による JSON-RPC エラーかどうか"""
+    error = response.get("error") if isinstance(response, dict) else None
+    if not error:
+        return False
+    if not isinstance(error, dict):
+        return True
+    message = str(error.get("message", "")).lower()
+    return error.get("code") in RETRYABLE_ERROR_CODES or any(pattern in message for pattern in RETRYABLE_ERROR_MESSAGES)
+
+
+class EndpointStats:
+    def __init__(self, endpoint_uri: str, window: int):
+        self.endpoint_uri = endpoint_uri
+        self.latencies = deque(maxlen=window)
+        self.errors = deque(maxlen=window)
+        self.requests = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, failed: bool, max_failures: int, cooldown: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.errors.append(failed)
+            if failed:
+                self.consecutive_failures += 1
+                if self.consecutive_failures >= max_failures:
+                    self.cooldown_until = time.monotonic() + cooldown
+            else:
+                self.latencies.append(latency)
+                self.consecutive_failures = 0
+
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.cooldown_until
+
+    def percentile(self, percent: float) -> float:
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percent / 100))]
+
+    def error_rate(self) -> float:
+        return sum(self.errors) / len(self.errors) if self.errors else 0.0
+
+    def summary(self) -> dict:
+        return {
+            "requests": self.requests,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "error_rate": self.error_rate(),
+            "healthy": self.healthy(),
+        }
+
+
+class _EndpointRouter:
+    """同期版・非同期版で共通のエンドポイント選択ロジック"""
+
+    def _init_router(self, endpoint_uris: List[str], config: Dict[str, Any], provider_class) -> None:
+        if not endpoint_uris:
+            raise ValueError("At least one RPC endpoint is required")
+        self.config = {**DEFAULT_ROUTER_CONFIG, **provider_config(config)}
+        self.endpoints = [provider_class(endpoint_uri, self.config) for endpoint_uri in endpoint_uris]
+        self.endpoint_stats = [EndpointStats(endpoint_uri, self.config["window"]) for endpoint_uri in endpoint_uris]
+        # フィルタ ID -> 作成したエンドポイント
+        self.filter_endpoints: Dict[str, int] = {}
+
+    def _ranked(self) -> List[int]:
+        """正常なエンドポイントをエラー率（10% 刻み）、p50 の小さい順に、外しているものはその後ろに並べます"""
+        def score(index: int) -> tuple:
+            stats = self.endpoint_stats[index]
+            return not stats.healthy(), round(stats.error_rate(), 1), stats.percentile(50)
+        return sorted(range(len(self.endpoints)), key=score)
+
+    def _filter_route(self, method: str, params: Any) -> List[int]:
+        """フィルタのメソッドを送るエンドポイントの順番（固定済みのフィルタはそのエンドポイントのみ）"""
+        if method in FILTER_ID_METHODS and params:
+            index = self.filter_endpoints.get(params[0])
+            if index is not None:
+                return [index]
+        return self._ranked()
+
+    def _track_filter(self, method: str, params: Any, index: int, response: Any) -> None:
+        if not isinstance(response, dict) or "error" in response:
+            return
+        if method in FILTER_CREATE_METHODS:
+            self.filter_endpoints[response.get("result")] = index
+        elif method == "eth_uninstallFilter" and params:
+            self.filter_endpoints.pop(params[0], None)
+
+    def _batch_route(self, batch: List[Tuple[str, Any]]) -> List[int]:
+        """固定済みのフィルタを含むバッチはそのエンドポイントだけへ送ります（異なるエンドポイントのフィルタは混ぜられない）"""
+        pinned = {
+            self.filter_endpoints[params[0]] for method, params in batch
+            if method in FILTER_ID_METHODS and params and params[0] in self.filter_endpoints
+        }
+        if len(pinned) > 1:
+            raise ValueError("A batch cannot poll filters created on different endpoints")
+        return list(pinned) or self._ranked()
+
+    def _track_batch_filters(self, batch: List[Tuple[str, Any]], index: int, responses: List[dict]) -> None:
+        for (method, params), response in zip(batch, responses):
+            if method in FILTER_CREATE_METHODS or method == "eth_uninstallFilter":
+                self._track_filter(method, params, index, response)
+
+    def _hedge_after(self, index: int) -> float:
+        if self.config["hedge_after"] is not None:
+            return self.config["hedge_after"]
+        stats = self.endpoint_stats[index]
+        if len(stats.latencies) < 10:
+            return self.config["initial_hedge_after"]
+        return max(self.config["min_hedge_after"], stats.percentile(self.config["hedge_percentile"]))
+
+    def _record(self, index: int, started: float, failed: bool) -> None:
+        self.endpoint_stats[index].record(
+            time.monotonic() - started, failed, self.config["max_failures"], self.config["cooldown"]
+        )
+
+    def _broadcast_result(self, responses: List[Any]) -> dict:
+        errors = []
+        for response in responses:
+            if isinstance(response, dict) and "error" not in response:
+                return response
+            errors.append(response)
+        for error in errors:
+            if isinstance(error, dict):
+                return error
+        return self._exhausted(errors[0])
+
+    def _batch_failed(self, responses: List[dict]) -> bool:
+        """バッチの全応答がレート制限などのエラーなら、エンドポイント側の失敗として次へ回します"""
+        return bool(responses) and all(is_retryable_response(response) for response in responses)
+
+    def _exhausted(self, error: Exception) -> dict:
+        """全エンドポイントで失敗した場合、JSON-RPC エラーなら web3 側で例外にさせるため応答として返します"""
+        if isinstance(error, RetryableRPCError) and error.response is not None:
+            return error.response
+        raise error
+
+    def stats(self) -> Dict[str, dict]:
+        return {stats.endpoint_uri: stats.summary() for stats in self.endpoint_stats}
+
+
+class RoutingHTTPProvider(_EndpointRouter, BaseProvider):
+    def __init__(self, endpoint_uris: List[str], config: Dict[str, Any] = None):
+        self._init_router(endpoint_uris, config, PooledHTTPProvider)
+        self.executor = ThreadPoolExecutor(max_workers=max(4, 2 * len(self.endpoints)))
+
+    def _timed(self, index: int, method: str, params: Any) -> dict:
+        started = time.monotonic()
+        try:
+            response = self.endpoints[index].make_request(method, params)
+        except Exception:
+            self._record(index, started, True)
+            raise
+        retryable = is_retryable_response(response)
+        self._record(index, started, retryable)
+        if retryable:
+            raise RetryableRPCError(f"{self.endpoints[index].endpoint_uri}: {response['error']}", response)
+        return response
+
+    def make_request(self, method, params):
+        if method in BROADCAST_METHODS:
+            return self._broadcast(method, params)
+        if method in FILTER_CREATE_METHODS or method in FILTER_ID_METHODS:
+            return self._filter_request(method, params)
+        return self._read(method, params)
+
+    def _filter_request(self, method, params):
+        """ヘッジせず、固定されたエンドポイント（なければ順位順に1つずつ）へ送ります"""
+        last_error = None
+        for index in self._filter_route(method, params):
+            try:
+                response = self._timed(index, method, params)
+            except Exception as e:
+                last_error = e
+                continue
+            self._track_filter(method, params, index, response)
+            return response
+        return self._exhausted(last_error)
+
+    def _read(self, method, params):
+        attempts = iter(self._ranked())
+        primary = next(attempts)
+        futures = {self.executor.submit(self._timed, primary, method, params): primary}
+        hedged = False
+        last_error = None
+        while futures:
+            done, _ = wait(futures, timeout=None if hedged else self._hedge_after(primary), return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                backup = next(attempts, None)
+                if backup is not None:
+                    futures[self.executor.submit(self._timed, backup, method, params)] = backup
+                continue
+            for future in done:
+                futures.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    last_error = e
+                    fallback = next(attempts, None)
+                    if fallback is not None:
+                        futures[self.executor.submit(self._timed, fallback, method, params)] = fallback
+        return self._exhausted(last_error)
+
+    def _broadcast(self, method, params):
+        futures = [self.executor.submit(self._timed, index, method, params) for index in range(len(self.endpoints))]
+        responses = []
+        for future in futures:
+            try:
+                responses.append(future.result())
+            except Exception as e:
+                responses.append(e)
+        return self._broadcast_result(responses)
+
+    def make_batch_request(self, batch: List[Tuple[str, Any]]) -> List[dict]:
+        last_error = None
+        responses = None
+        for index in self._batch_route(batch):
+            started = time.monotonic()
+            try:
+                responses = self.endpoints[index].make_batch_request(batch)
+            except Exception as e:
+                self._record(index, started, True)
+                last_error = e
+                continue
+            failed = self._batch_failed(responses)
+            self._record(index, started, failed)
+            if not failed:
+                self._track_batch_filters(batch, index, responses)
+                return responses
+        if responses is not None:
+            return responses
+        raise last_error
+
+    def is_connected(self, show_traceback: bool = False) -> bool:
+        return any(endpoint.is_connected(show_traceback) for endpoint in self.endpoints)
+
+
+class AsyncRoutingHTTPProvider(_EndpointRouter, AsyncBaseProvider):
+    def __init__(self, endpoint_uris: List[str], config: Dict[str, Any] = None):
+        self._init_router(endpoint_uris, config, AsyncPooledHTTPProvider)
+
+    async def _timed(self, index: int, method: str, params: Any) -> dict:
+        started = time.monotonic()
+        try:
+            response = await self.endpoints[index].make_request(method, params)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._record(index, started, True)
+            raise
+        retryable = is_retryable_response(response)
+        self._record(index, started, retryable)
+        if retryable:
+            raise RetryableRPCError(f"{self.endpoints[index].endpoint_uri}: {response['error']}", response)
+        return response
+
+    async def make_request(self, method, params):
+        if method in BROADCAST_METHODS:
+            responses = await asyncio.gather(
+                *(self._timed(index, method, params) for index in range(len(self.endpoints))),
+                return_exceptions=True
+            )
+            return self._broadcast_result(list(responses))
+        if method in FILTER_CREATE_METHODS or method in FILTER_ID_METHODS:
+            return await self._filter_request(method, params)
+        return await self._read(method, params)
+
+    async def _filter_request(self, method, params):
+        last_error = None
+        for index in self._filter_route(method, params):
+            try:
+                response = await self._timed(index, method, params)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                last_error = e
+                continue
+            self._track_filter(method, params, index, response)
+            return response
+        return self._exhausted(last_error)
+
+    async def _read(self, method, params):
+        attempts = iter(self._ranked())
+        primary = next(attempts)
+        tasks = {asyncio.ensure_future(self._timed(primary, method, params))}
+        hedged = False
+        last_error = None
+        try:
+            while tasks:
+                done, tasks = await asyncio.wait(
+                    tasks, timeout=None if hedged else self._hedge_after(primary), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = True
+                    backup = next(attempts, None)
+                    if backup is not None:
+                        tasks.add(asyncio.ensure_future(self._timed(backup, method, params)))
+                    continue
+                for task in done:
+                    try:
+                        return task.result()
+                    except Exception as e:
+                        last_error = e
+                        fallback = next(attempts, None)
+                        if fallback is not None:
+                            tasks.add(asyncio.ensure_future(self._timed(fallback, method, params)))
+            return self._exhausted(last_error)
+        finally:
+            # ヘッジで負けた側のリクエストは不要なので取り消す
+            for task in tasks:
+                task.cancel()
+
+    async def make_batch_request(self, batch: List[Tuple[str, Any]]) -> List[dict]:
+        last_error = None
+        responses = None
+        for index in self._batch_route(batch):
+            started = time.monotonic()
+            try:
+                responses = await self.endpoints[index].make_batch_request(batch)
+            except Exception as e:
+                self._record(index, started, True)
+                last_error = e
+                continue
+            failed = self._batch_failed(responses)
+            self._record(index, started, failed)
+            if not failed:
+                self._track_batch_filters(batch, index, responses)
+                return responses
+        if responses is not None:
+            return responses
+        raise last_error
+
+    async def is_connected(self, show_traceback: bool = False) -> bool:
+        results = await asyncio.gather(
+            *(endpoint.is_connected(show_traceback) for endpoint in self.endpoints), return_exceptions=True
+        )
+        return any(result is True for result in results)
+
+    async def close(self) -> None:
+        for endpoint in self.endpoints:
+            await endpoint.close()
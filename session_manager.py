@@ -0,0 +1,119 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Union
+
+from gas_oracle import GasOracle
+from metadata_cache import MetadataCache
+from nonce_manager import NonceManager
+from web3utility import Web3Utility, build_web3
+
+"""
+ChainSession / SessionManager クラス
+
+同じプロセスで複数チェーン × 複数ボットを動かすときに、チェーンごとの重い状態を1つにまとめます。
+
+- ChainSession: 1チェーン分の Web3 接続（HTTP セッション）、GasOracle、MetadataCache、
+  送信アドレスごとの NonceManager、構築済みコントラクトなどの共有オブジェクトを持つ
+- SessionManager: チェーン名ごとに ChainSession を1つだけ作って払い出すレジストリ
+- Web3Utility.from_session / Uniutility.from_session は接続を作らず、セッションの状態を参照する軽量なビューを返す
+  （ビューの生成で RPC・ABI 読み込み・sqlite 接続は発生しない）
+
+メモリと接続数はボットの数ではなくチェーンの数に比例します。
+同じチェーン・同じ送信アドレスのビューは NonceManager を共有するため、nonce が重複しません。
+"""
+
+
+class ChainSession:
+    def __init__(self,
+                 chain: str,
+                 rpc_url: Union[str, List[str]] = None,
+                 rpc_key: Union[str, List[str]] = None,
+                 metadata_db: str = None,
+                 provider_config: dict = None,
+                 offline: bool = False):
+        self.chain = chain
+        self.metadata_db = metadata_db
+        self.offline = offline
+        self.w3 = build_web3(rpc_url, rpc_key, chain, provider_config, offline)
+        self.gas_oracle = GasOracle()
+        self.metadata_cache = MetadataCache(metadata_db)
+        self._nonce_managers: Dict[str, NonceManager] = {}
+        self._shared: Dict[Hashable, Any] = {}
+        self._checksums: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def to_checksum_address(self, address: str) -> str:
+        """チェックサム変換（keccak）の結果をメモ化します。ビューの生成ごとに同じアドレスを変換するため"""
+        checksum = self._checksums.get(address)
+        if checksum is None:
+            checksum = self._checksums[address] = self.w3.to_checksum_address(address)
+        return checksum
+
+    def nonce_manager(self, user_address: Optional[str]) -> NonceManager:
+        """送信アドレスごとに1つの NonceManager を返します（同じアドレスのビュー間で共有）"""
+        with self._lock:
+            manager = self._nonce_managers.get(user_address)
+            if manager is None:
+                manager = self._nonce_managers[user_address] = NonceManager()
+            return manager
+
+    def shared(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """key ごとに factory の結果を1回だけ作って共有します（コントラクト・デコーダ・プールインデックスなど）"""
+        with self._lock:
+            if key not in self._shared:
+                self._shared[key] = factory()
+            return self._shared[key]
+
+    def contract(self, address: str, abi: list):
+        # ABI は load_abi の共有オブジェクトを想定し、同一性で区別する（abi も値に保持して id の再利用を防ぐ）
+        return self.shared(
+            ("contract", address, id(abi)), lambda: (self.w3.eth.contract(address=address, abi=abi), abi)
+        )[0]
+
+    def close(self) -> None:
+        self.metadata_cache.close()
+        pool_index = self._shared.get("pool_index")
+        if pool_index is not None:
+            pool_index.close()
+
+
+class SessionManager:
+    def __init__(self,
+                 rpc_url: Union[str, List[str]] = None,
+                 rpc_key: Union[str, List[str]] = None,
+                 metadata_db: str = None,
+                 provider_config: dict = None):
+        """
+        rpc_url / rpc_key / metadata_db / provider_config は全チェーン共通の既定値です（chain ごとに session() で上書き可）
+        """
+        self.defaults = {
+            "rpc_url": rpc_url,
+            "rpc_key": rpc_key,
+            "metadata_db": metadata_db,
+            "provider_config": provider_config,
+        }
+        self.sessions: Dict[str, ChainSession] = {}
+        self._lock = threading.Lock()
+
+    def session(self, chain: str, **overrides) -> ChainSession:
+        """chain の ChainSession を返します。初回のみ作成し、以降は同じものを返します"""
+        with self._lock:
+            session = self.sessions.get(chain)
+            if session is None:
+                session = self.sessions[chain] = ChainSession(chain, **{**self.defaults, **overrides})
+            return session
+
+    def view(self, utility_class, chain: str, user_address: str = None, **kwargs):
+        """
+        utility_class（Web3Utility / Uniutility など from_session を持つクラス）のビューを返します
+        例: manager.view(Uniutility, "base", user_address=ADDRESS)
+        """
+        return utility_class.from_session(self.session(chain), user_address=user_address, **kwargs)
+
+    def utility(self, chain: str, contract_address: str, abi: list, user_address: str = None):
+        return self.view(Web3Utility, chain, user_address=user_address, contract_address=contract_address, abi=abi)
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# benchmarks/ provides StubNode, the local JSON-RPC node used by the provider tests
+sys.path[:0] = [REPO_ROOT, os.path.join(REPO_ROOT, "Dapps"), os.path.join(REPO_ROOT, "benchmarks")]
+# ABI paths in the modules are relative to the repository root
+os.chdir(REPO_ROOT)
@@ -0,0 +1,115 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from eth_abi import encode as abi_encode
+
+from abi_encoder import ContractEncoder, compile_types
+from uniswap_utility import UNI_V3_ROUTER2_ABI_PATH
+from web3utility import load_abi
+
+WETH = "0x82aF49447D8a07e3bd95BD0d56f35241523fBab1"
+USDC = "0xaf88d065e77c8cC2239327C5EDb3A432268e5831"
+RECIPIENT = "0xdC333239245ebBC6B656Ace7c08099AA415585d1"
+
+# (types, values) pairs checked against eth_abi
+CASES = [
+    (("uint256",), (0,)),
+    (("uint24", "int24", "bool"), (500, -887272, True)),
+    (("address", "bytes32"), (WETH, b"\x01" * 32)),
+    (("bytes", "string"), (b"\x12" * 45, "swap")),
+    (("uint256[]", "address[2]"), ([1, 2, 3], [WETH, USDC])),
+    (("bytes[]",), ([b"", b"\xab" * 33, b"\xcd" * 64],)),
+    (("(address,bool,bytes)[]",), ([(WETH, True, b"\x01\x02"), (USDC, False, b"")],)),
+    (("(bytes,address,uint256,uint256)",), ((b"\x99" * 43, RECIPIENT, 10 ** 18, 1),)),
+    (("int256", "uint8"), (-(2 ** 255), 255)),
+]
+
+
+@pytest.fixture
+def encoder():
+    return ContractEncoder(load_abi(UNI_V3_ROUTER2_ABI_PATH))
+
+
+@pytest.mark.parametrize("types, values", CASES)
+def test_compile_types_matches_eth_abi(types, values):
+    assert compile_types(types)(values) == abi_encode(list(types), list(values))
+
+
+def test_router_calls_match_eth_abi(encoder):
+    params = {
+        "tokenIn": WETH,
+        "tokenOut": USDC,
+        "fee": 500,
+        "recipient": RECIPIENT,
+        "amountIn": 5 * 10 ** 18,
+        "amountOutMinimum": 12299834718,
+        "sqrtPriceLimitX96": 0,
+    }
+    calldata = encoder.encode("exactInputSingle", [params])
+    assert calldata[:4] == bytes.fromhex("04e45aaf")
+    assert calldata[4:] == abi_encode(
+        ["(address,address,uint24,address,uint256,uint256,uint160)"], [tuple(params.values())]
+    )
+    # Structs can also be given positionally
+    assert encoder.encode("exactInputSingle", [tuple(params.values())]) == calldata
+
+    multicall = encoder.encode("multicall(uint256,bytes[])", [1729964578, [calldata]])
+    assert multicall == bytes.fromhex("5ae401dc") + abi_encode(["uint256", "bytes[]"], [1729964578, [calldata]])
+    assert encoder.encode_many("unwrapWETH9", [[1], [2]]) == [
+        encoder.encode("unwrapWETH9", [1]), encoder.encode("unwrapWETH9", [2])
+    ]
+
+
+@pytest.mark.parametrize("types, values", [
+    (("uint8",), (256,)),
+    (("uint256",), (-1,)),
+    (("int8",), (128,)),
+    (("address",), ("0x1234",)),
+    (("bytes2",), (b"\x00" * 3,)),
+    (("address[2]",), ([WETH],)),
+])
+def test_rejects_out_of_range_values(types, values):
+    with pytest.raises(ValueError):
+        compile_types(types)(values)
+
+
+@pytest.mark.parametrize("value", [1.0, True])
+def test_memo_does_not_skip_type_validation(encoder, value):
+    # 1 == 1.0 == True, so a type-blind memo key would return the cached encoding of the int
+    encoder.encode("unwrapWETH9", [1])
+    with pytest.raises(TypeError):
+        encoder.encode("unwrapWETH9", [value])
+
+
+def test_memo_is_bounded():
+    encoder = ContractEncoder(load_abi(UNI_V3_ROUTER2_ABI_PATH), max_cache=4)
+    for amount in range(10):
+        encoder.encode("unwrapWETH9", [amount])
+    assert len(encoder._cache) == 4
+
+
+class SlowDict(dict):
+    """Yields the GIL while looking for the oldest entry, so unguarded evictions pick the same key."""
+
+    def __iter__(self):
+        for key in super().__iter__():
+            time.sleep(0.0005)
+            yield key
+
+
+def test_memo_is_safe_across_threads():
+    encoder = ContractEncoder(load_abi(UNI_V3_ROUTER2_ABI_PATH), max_cache=8)
+    encoder._cache = SlowDict()
+    barrier = threading.Barrier(8)
+
+    def worker(offset):
+        barrier.wait()
+        return [(amount, encoder.encode("unwrapWETH9", [amount])) for amount in range(offset * 50, offset * 50 + 50)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = [result for chunk in executor.map(worker, range(8)) for result in chunk]
+    selector = bytes.fromhex("49616997")
+    assert all(calldata == selector + abi_encode(["uint256"], [amount]) for amount, calldata in results)
+    assert len(encoder._cache) == 8
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+from eth_account import Account
+
+from async_uniswap_utility import AsyncUniutility
+from stub_node import StubNode
+
+FIXTURE = "benchmarks/fixtures/base.json"
+ROUTER = "0x2626664c2603336E57B271c5C0b26F421741e481"
+POOL = "0xd0b53D9277642d899DF5C87A3966A349A798F224"
+WETH = "0x4200000000000000000000000000000000000006"
+USDC = "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913"
+ADDRESS = Account.from_key("0x" + "4c" * 32).address
+
+
+@pytest.fixture
+def node():
+    with StubNode(FIXTURE) as node:
+        yield node
+
+
+def utility(node) -> AsyncUniutility:
+    return AsyncUniutility(rpc_url=node.url, chain="base", contract_address=ROUTER, user_address=ADDRESS)
+
+
+def test_concurrent_chain_id_lookups_install_the_static_cache_once(node):
+    uni = utility(node)
+
+    async def run():
+        return await asyncio.gather(uni.get_chain_id(), uni.prefetch_tx_context(), uni.get_chain_id())
+
+    chain_id, _, _ = asyncio.run(run())
+    assert chain_id == 8453
+    names = [name for name in uni.w3.middleware_onion._queue if name == "static_rpc_cache"]
+    assert names == ["static_rpc_cache"]
+
+
+@pytest.mark.parametrize("name, args, key, selector", [
+    ("exactInputSingle", (WETH, USDC, 500, POOL, True, ADDRESS, 10 ** 18, 0.5, 1), "encoded_exactInputSingle", "0x04e45aaf"),
+    ("exactOutputSingle", (WETH, USDC, 500, POOL, True, ADDRESS, 10 ** 9, 1.0, 1), "encoded_exactOutputSingle", "0x5023b4df"),
+    ("exact_output", ([WETH, USDC], 500, POOL, True, ADDRESS, 10 ** 9), "encoded_exactOutput", "0x09b81346"),
+])
+def test_swap_builders_are_coroutines(node, name, args, key, selector):
+    uni = utility(node)
+    method = getattr(uni, name)
+    assert asyncio.iscoroutinefunction(method)
+    result = asyncio.run(method(*args))
+    assert result[key].startswith(selector)
+    assert uni.decode_calls([result[key]])[0] is not None
+
+
+def test_from_session_is_not_available():
+    with pytest.raises(NotImplementedError):
+        AsyncUniutility.from_session(None)
@@ -0,0 +1,94 @@
+import random
+import statistics
+
+import pytest
+
+from gas_oracle import GasOracle
+
+PERCENTILES = [25, 50, 75]
+
+
+def history(oldest: int, count: int, seed: int = 0) -> dict:
+    generator = random.Random(seed * 100003 + oldest)
+    return {
+        "oldestBlock": oldest,
+        "baseFeePerGas": [generator.randrange(10 ** 6, 10 ** 9) for _ in range(count + 1)],
+        "reward": [[generator.randrange(0, 10 ** 8) for _ in PERCENTILES] for _ in range(count)],
+    }
+
+
+def expected_fees(blocks, percentile_index: int = 1, max_fee_multiplier: float = 2, reward_multiplier: float = 1) -> dict:
+    """Recompute from scratch over the window: base fee mean and the median of one reward percentile."""
+    base_fee_avg = statistics.mean(base_fee for base_fee, _ in blocks)
+    priority_fee_median = statistics.median(reward[percentile_index] for _, reward in blocks)
+    return {
+        "maxFeePerGas": int(base_fee_avg * max_fee_multiplier + priority_fee_median * reward_multiplier),
+        "priorityFeePerGasMedian": int(priority_fee_median),
+        "baseFeeAvg": int(base_fee_avg),
+    }
+
+
+def window(*histories: dict, size: int) -> list:
+    blocks = {}
+    for fee_history in histories:
+        for index, reward in enumerate(fee_history["reward"]):
+            blocks.setdefault(fee_history["oldestBlock"] + index, (fee_history["baseFeePerGas"][index], reward))
+    return [blocks[number] for number in sorted(blocks)][-size:]
+
+
+def test_empty_oracle_raises():
+    with pytest.raises(ValueError):
+        GasOracle().fees()
+
+
+def test_blocks_to_fetch():
+    oracle = GasOracle(blocks=10, percentiles=PERCENTILES)
+    assert oracle.blocks_to_fetch(100) == 10
+    oracle.update(history(91, 10))
+    assert oracle.newest_block == 100
+    assert oracle.blocks_to_fetch(100) == 0
+    assert oracle.blocks_to_fetch(103) == 3
+    assert oracle.blocks_to_fetch(500) == 10
+    # A head behind the window (reorg or another node) needs the full window again
+    assert oracle.blocks_to_fetch(95) == 10
+
+
+def test_rolling_window_matches_a_full_recompute():
+    oracle = GasOracle(blocks=10, percentiles=PERCENTILES)
+    histories = [history(91, 10)]
+    oracle.update(histories[-1])
+    for head in range(101, 140, 3):
+        # Overlapping history: the already known blocks must be skipped
+        histories.append(history(head - 4, 5))
+        oracle.update(histories[-1])
+        assert oracle.newest_block == head
+        assert oracle.fees() == expected_fees(window(*histories, size=10))
+    for index, percentile in enumerate(PERCENTILES):
+        assert oracle.fees(reward_percentile=percentile) == expected_fees(window(*histories, size=10), index)
+
+
+def test_fees_are_stable_per_head_and_change_with_it():
+    oracle = GasOracle(blocks=10, percentiles=PERCENTILES)
+    oracle.update(history(91, 10))
+    first = oracle.fees()
+    assert oracle.fees() is first
+    oracle.update(history(101, 1, seed=1))
+    assert oracle.fees() is not first
+
+
+def test_head_moving_back_resets_the_window():
+    oracle = GasOracle(blocks=10, percentiles=PERCENTILES)
+    oracle.update(history(91, 10))
+    rewound = history(81, 5, seed=2)
+    oracle.update(rewound)
+    assert oracle.newest_block == 85
+    assert oracle.fees() == expected_fees(window(rewound, size=10))
+
+
+def test_strategy_fees():
+    oracle = GasOracle(blocks=10, percentiles=PERCENTILES)
+    fee_history = history(91, 10)
+    oracle.update(fee_history)
+    blocks = window(fee_history, size=10)
+    assert oracle.strategy_fees("slow") == expected_fees(blocks, 0, 1.5, 1)
+    assert oracle.strategy_fees("fast") == expected_fees(blocks, 2, 2.5, 1.25)
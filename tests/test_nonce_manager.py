@@ -0,0 +1,162 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from eth_account import Account
+
+from nonce_manager import NonceManager
+from stub_node import DEFAULT_RECEIPT, StubNode
+from web3utility import Web3Utility
+
+FIXTURE = "benchmarks/fixtures/base.json"
+ROUTER = "0x2626664c2603336E57B271c5C0b26F421741e481"
+PRIVATE_KEY = "0x" + "4c" * 32
+ADDRESS = Account.from_key(PRIVATE_KEY).address
+# eth_getTransactionCount(ADDRESS, "pending") in the fixture
+PENDING_NONCE = 5
+
+
+class Counter:
+    def __init__(self, value: int):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self) -> int:
+        self.calls += 1
+        return self.value
+
+
+def test_fetches_once_then_counts_locally():
+    manager, fetch = NonceManager(), Counter(7)
+    assert [manager.next_nonce(fetch) for _ in range(3)] == [7, 8, 9]
+    assert fetch.calls == 1
+    assert manager.peek() == 10
+
+
+def test_resync_fetches_again():
+    manager, fetch = NonceManager(), Counter(7)
+    manager.next_nonce(fetch)
+    manager.resync()
+    assert manager.peek() is None
+    fetch.value = 3
+    assert manager.next_nonce(fetch) == 3
+    assert fetch.calls == 2
+
+
+def test_prime_only_sets_an_unset_nonce():
+    manager, fetch = NonceManager(), Counter(7)
+    manager.prime(4)
+    manager.prime(9)
+    assert manager.next_nonce(fetch) == 4
+    assert fetch.calls == 0
+
+
+def test_threads_get_distinct_contiguous_nonces():
+    manager, fetch = NonceManager(), Counter(100)
+    nonces = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(50):
+            nonce = manager.next_nonce(fetch)
+            with lock:
+                nonces.append(nonce)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(nonces) == list(range(100, 500))
+    assert fetch.calls == 1
+
+
+def test_concurrent_async_callers_fetch_once():
+    manager = NonceManager()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 20
+
+    async def run():
+        return await asyncio.gather(*(manager.async_next_nonce(fetch) for _ in range(10)))
+
+    assert sorted(asyncio.run(run())) == list(range(20, 30))
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("nonce too low: next nonce 5, tx nonce 4", True),
+    ("Replacement transaction underpriced", True),
+    ("insufficient funds for gas * price + value", False),
+])
+def test_is_nonce_error(message, expected):
+    assert NonceManager.is_nonce_error(ValueError(message)) is expected
+
+
+def fixture(status: str) -> dict:
+    with open(FIXTURE) as file:
+        data = json.load(file)
+    data["receipt"] = {**DEFAULT_RECEIPT, "status": status}
+    return data
+
+
+class RejectingNode(StubNode):
+    """Rejects the second raw transaction with ``message``."""
+
+    def __init__(self, fixture, message):
+        super().__init__(fixture)
+        self.message = message
+
+    def _result(self, method, params):
+        if method == "eth_sendRawTransaction" and self.calls[method] == 2:
+            raise LookupError(self.message)
+        return super()._result(method, params)
+
+
+def swap_txs(count: int) -> list:
+    return [{"to": ROUTER, "data": "0x", "value": 0, "gas": 21000, "type": 2, "chainId": 8453} for _ in range(count)]
+
+
+def send(node, txs, pipeline=False):
+    utility = Web3Utility(rpc_url=node.url, chain="base", contract_address=ROUTER, abi=[], user_address=ADDRESS)
+    return utility, utility.send_multiple_tx(txs, PRIVATE_KEY, pipeline=pipeline)
+
+
+@pytest.mark.parametrize("pipeline", [False, True])
+def test_successful_sends_use_consecutive_nonces(pipeline):
+    with StubNode(fixture("0x1")) as node:
+        utility, ok = send(node, swap_txs(3), pipeline)
+    assert ok is True
+    assert node.calls["eth_getTransactionCount"] == 1
+    assert utility.nonce_manager.peek() == PENDING_NONCE + 3
+
+
+def test_failed_receipt_resyncs():
+    with StubNode(fixture("0x0")) as node:
+        utility, ok = send(node, swap_txs(3))
+    assert ok is False
+    # The first receipt fails, so the rest are never sent and their nonces must be fetched again
+    assert node.calls["eth_sendRawTransaction"] == 1
+    assert utility.nonce_manager.peek() is None
+
+
+@pytest.mark.parametrize("pipeline", [False, True])
+def test_send_error_stops_and_resyncs(pipeline):
+    with RejectingNode(fixture("0x1"), "insufficient funds for gas * price + value") as node:
+        utility, ok = send(node, swap_txs(3), pipeline)
+    assert ok is False
+    assert node.calls["eth_sendRawTransaction"] == 2
+    assert utility.nonce_manager.peek() is None
+
+
+@pytest.mark.parametrize("pipeline", [False, True])
+def test_nonce_error_refetches_and_retries(pipeline):
+    with RejectingNode(fixture("0x1"), "nonce too low") as node:
+        utility, ok = send(node, swap_txs(3), pipeline)
+    assert ok is True
+    assert node.calls["eth_sendRawTransaction"] == 4
+    assert node.calls["eth_getTransactionCount"] == 2
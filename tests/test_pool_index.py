@@ -0,0 +1,123 @@
+import sqlite3
+
+import pytest
+
+import pool_index
+from pool_index import ZERO_ADDRESS, PoolIndex, pool_key
+
+CHAIN = 8453
+WETH = "0x4200000000000000000000000000000000000006"
+USDC = "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913"
+DAI = "0x50c5725949A6F0c72E6C4a641F24049A917DB0Cb"
+POOL = "0xd0b53D9277642d899DF5C87A3966A349A798F224"
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(pool_index.time, "time", clock)
+    return clock
+
+
+def test_pool_key_orders_like_the_factory():
+    assert pool_key(USDC, WETH, 500) == (WETH, USDC, 500)
+    assert pool_key(WETH, USDC, "3000") == (WETH, USDC, 3000)
+
+
+def test_lookup_is_order_independent():
+    index = PoolIndex()
+    assert index.get(CHAIN, WETH, USDC, 500) is None
+    index.set(CHAIN, USDC, WETH, 500, POOL)
+    assert index.get(CHAIN, WETH, USDC, 500) == POOL
+    assert index.get(CHAIN, USDC, WETH, 500) == POOL
+    assert index.get(1, WETH, USDC, 500) is None
+
+
+def test_missing_pool_expires_after_ttl(clock):
+    index = PoolIndex(missing_ttl=60)
+    index.set(CHAIN, WETH, USDC, 100, ZERO_ADDRESS)
+    assert index.get(CHAIN, WETH, USDC, 100) == ZERO_ADDRESS
+    clock.now += 60
+    assert index.get(CHAIN, WETH, USDC, 100) == ZERO_ADDRESS
+    clock.now += 1
+    assert index.get(CHAIN, WETH, USDC, 100) is None
+    # A new check restarts the TTL
+    index.set(CHAIN, WETH, USDC, 100, ZERO_ADDRESS)
+    assert index.get(CHAIN, WETH, USDC, 100) == ZERO_ADDRESS
+
+
+def test_found_pool_replaces_missing_and_never_expires(clock):
+    index = PoolIndex(missing_ttl=60)
+    index.set(CHAIN, WETH, USDC, 100, ZERO_ADDRESS)
+    index.set(CHAIN, WETH, USDC, 100, POOL)
+    clock.now += 10 ** 6
+    assert index.get(CHAIN, WETH, USDC, 100) == POOL
+
+
+def test_pools_skips_missing_and_filters_tokens():
+    index = PoolIndex()
+    index.set_many(CHAIN, {
+        pool_key(WETH, USDC, 500): POOL,
+        pool_key(WETH, USDC, 100): ZERO_ADDRESS,
+        pool_key(WETH, DAI, 500): "0x" + "11" * 20,
+    })
+    assert index.pools(CHAIN) == {pool_key(WETH, USDC, 500): POOL, pool_key(WETH, DAI, 500): "0x" + "11" * 20}
+    assert index.pools(CHAIN, [WETH, USDC]) == {pool_key(WETH, USDC, 500): POOL}
+
+
+def test_persists_pools_missing_entries_and_last_block(tmp_path, clock):
+    path = str(tmp_path / "index.db")
+    index = PoolIndex(path, missing_ttl=60)
+    index.set_many(CHAIN, {pool_key(WETH, USDC, 500): POOL, pool_key(WETH, USDC, 100): ZERO_ADDRESS})
+    index.set_last_block(CHAIN, "0xfactory", 123)
+    index.close()
+
+    reloaded = PoolIndex(path, missing_ttl=60)
+    assert reloaded.get(CHAIN, WETH, USDC, 500) == POOL
+    assert reloaded.get(CHAIN, WETH, USDC, 100) == ZERO_ADDRESS
+    assert reloaded.last_block(CHAIN, "0xfactory") == 123
+    # The check time is persisted, so the TTL keeps running across restarts
+    clock.now += 61
+    assert reloaded.get(CHAIN, WETH, USDC, 100) is None
+    reloaded.close()
+
+
+def test_found_pool_clears_the_persisted_missing_entry(tmp_path):
+    path = str(tmp_path / "index.db")
+    index = PoolIndex(path)
+    index.set(CHAIN, WETH, USDC, 100, ZERO_ADDRESS)
+    index.set(CHAIN, WETH, USDC, 100, POOL)
+    index.close()
+    with sqlite3.connect(path) as db:
+        assert db.execute("SELECT COUNT(*) FROM missing_pools").fetchone()[0] == 0
+    assert PoolIndex(path).get(CHAIN, WETH, USDC, 100) == POOL
+
+
+def test_legacy_zero_rows_are_rechecked(tmp_path):
+    path = str(tmp_path / "index.db")
+    PoolIndex(path).close()
+    with sqlite3.connect(path) as db:
+        db.execute("INSERT INTO pools VALUES (?, ?, ?, ?, ?)", (CHAIN, WETH, USDC, 100, ZERO_ADDRESS))
+    assert PoolIndex(path).get(CHAIN, WETH, USDC, 100) is None
+
+
+def test_clear(tmp_path):
+    path = str(tmp_path / "index.db")
+    index = PoolIndex(path)
+    index.set(CHAIN, WETH, USDC, 500, POOL)
+    index.set(CHAIN, WETH, USDC, 100, ZERO_ADDRESS)
+    index.set_last_block(CHAIN, "0xfactory", 1)
+    index.clear()
+    index.close()
+    reloaded = PoolIndex(path)
+    assert reloaded.get(CHAIN, WETH, USDC, 500) is None
+    assert reloaded.get(CHAIN, WETH, USDC, 100) is None
+    assert reloaded.last_block(CHAIN, "0xfactory") is None
@@ -0,0 +1,236 @@
+import pytest
+from eth_abi import encode as abi_encode
+from eth_utils import event_abi_to_log_topic, keccak
+from web3 import Web3
+
+from pool_state_mirror import PoolStateMirror
+from uniswap_v3_math import MAX_TICK, MIN_TICK, Q96, PoolSnapshot
+from web3utility import UNISWAP_V3_POOL_ABI_PATH, load_abi
+
+POOL_A = Web3.to_checksum_address("0x" + "aa" * 20)
+POOL_B = Web3.to_checksum_address("0x" + "bb" * 20)
+OWNER = "0x" + "cc" * 20
+E18 = 10 ** 18
+SPACING = 60
+POOL_ABI = load_abi(UNISWAP_V3_POOL_ABI_PATH)
+EVENTS = {event["name"]: event for event in POOL_ABI if event.get("type") == "event"}
+
+
+def event_log(pool: str, name: str, **args) -> dict:
+    event = EVENTS[name]
+    topics = [event_abi_to_log_topic(event)]
+    data_types, data_values = [], []
+    for param in event["inputs"]:
+        if param["indexed"]:
+            topics.append(abi_encode([param["type"]], [args[param["name"]]]))
+        else:
+            data_types.append(param["type"])
+            data_values.append(args[param["name"]])
+    return {"address": pool.lower(), "topics": topics, "data": abi_encode(data_types, data_values)}
+
+
+def swap(pool: str, sqrt_price_x96: int, liquidity: int, tick: int) -> dict:
+    return event_log(pool, "Swap", sender=OWNER, recipient=OWNER, amount0=1, amount1=-1,
+                     sqrtPriceX96=sqrt_price_x96, liquidity=liquidity, tick=tick)
+
+
+def mint(pool: str, lower: int, upper: int, amount: int) -> dict:
+    return event_log(pool, "Mint", sender=OWNER, owner=OWNER, tickLower=lower, tickUpper=upper,
+                     amount=amount, amount0=1, amount1=1)
+
+
+def burn(pool: str, lower: int, upper: int, amount: int) -> dict:
+    return event_log(pool, "Burn", owner=OWNER, tickLower=lower, tickUpper=upper, amount=amount, amount0=1, amount1=1)
+
+
+class FakeChain:
+    """A canonical chain of blocks that can be reorged; each block carries its pool logs."""
+
+    def __init__(self, start: int):
+        self.blocks = []
+        self.start = start
+        self.forks = 0
+        self.mine([])
+
+    def mine(self, logs):
+        number = self.start + len(self.blocks)
+        parent = self.blocks[-1]["hash"] if self.blocks else b"\x00" * 32
+        block_hash = keccak(parent + number.to_bytes(8, "big") + bytes([self.forks]))
+        self.blocks.append({"number": number, "hash": block_hash, "parentHash": parent, "logs": [
+            {**log, "blockNumber": number, "blockHash": block_hash, "logIndex": index,
+             "transactionHash": b"\x00" * 32, "transactionIndex": 0}
+            for index, log in enumerate(logs)
+        ]})
+
+    def reorg(self, depth: int):
+        """Drop the newest ``depth`` blocks; the blocks mined next get new hashes."""
+        del self.blocks[len(self.blocks) - depth:]
+        self.forks += 1
+
+    @property
+    def head(self):
+        return self.blocks[-1]["number"]
+
+
+class FakeEth:
+    def __init__(self, chain: FakeChain):
+        self.chain = chain
+        self.log_queries = []
+
+    def get_block(self, identifier):
+        block = self.chain.blocks[-1] if identifier == "latest" else self.chain.blocks[identifier - self.chain.start]
+        return {key: block[key] for key in ("number", "hash", "parentHash")}
+
+    def get_logs(self, params):
+        self.log_queries.append(params)
+        if "blockHash" in params:
+            blocks = [block for block in self.chain.blocks if Web3.to_hex(block["hash"]) == params["blockHash"]]
+        else:
+            blocks = [block for block in self.chain.blocks if params["fromBlock"] <= block["number"] <= params["toBlock"]]
+        topics = set(params["topics"][0])
+        addresses = {address.lower() for address in params["address"]}
+        return [log for block in blocks for log in block["logs"]
+                if log["address"] in addresses and Web3.to_hex(log["topics"][0]) in topics]
+
+
+class FakeW3:
+    to_checksum_address = staticmethod(Web3.to_checksum_address)
+    to_hex = staticmethod(Web3.to_hex)
+
+    def __init__(self, chain: FakeChain):
+        self.eth = FakeEth(chain)
+
+
+class FakeUtility:
+    """Snapshots every pool as one full-range position of 2e18 at price 1, taken at the current head."""
+
+    def __init__(self, chain: FakeChain, word_radius: int = 4):
+        self.chain = chain
+        self.w3 = FakeW3(chain)
+        self.word_radius = word_radius
+        self.snapshots = []
+
+    def load_pool_contract(self, address):
+        return Web3().eth.contract(address=address, abi=POOL_ABI)
+
+    def get_pool_snapshot(self, address, word_radius=2):
+        self.snapshots.append(address)
+        lower, upper = (MIN_TICK // SPACING + 1) * SPACING, MAX_TICK // SPACING * SPACING
+        return PoolSnapshot(
+            address, "0x" + "01" * 20, "0x" + "02" * 20, 18, 18, 3000, SPACING, Q96, 0, 2 * E18,
+            {lower: 2 * E18, upper: -2 * E18}, -self.word_radius, self.word_radius, self.chain.head,
+        )
+
+
+@pytest.fixture
+def chain():
+    return FakeChain(start=100)
+
+
+def mirror(chain, checkpoints=64, **kwargs):
+    utility = FakeUtility(chain, **kwargs)
+    state = PoolStateMirror(utility, [POOL_A, POOL_B], checkpoints=checkpoints)
+    state.sync()
+    return state, utility
+
+
+def test_sync_applies_swaps_and_copies_only_touched_pools(chain):
+    state, _ = mirror(chain)
+    before_a, before_b = state.snapshot(POOL_A), state.snapshot(POOL_B)
+    chain.mine([swap(POOL_A, Q96 * 2, 3 * E18, 120)])
+    assert state.sync() == 1
+    assert (state.snapshot(POOL_A).sqrt_price_x96, state.snapshot(POOL_A).liquidity, state.snapshot(POOL_A).tick) == (Q96 * 2, 3 * E18, 120)
+    # The previous checkpoint still holds the old object; the untouched pool is shared
+    assert before_a.sqrt_price_x96 == Q96 and state.checkpoints[0][2][POOL_A] is before_a
+    assert state.snapshot(POOL_B) is before_b
+    # One block ahead is fetched by hash
+    assert "blockHash" in state.w3.eth.log_queries[-1]
+    assert state.sync() == 0
+
+
+def test_mint_and_burn_update_liquidity(chain):
+    state, _ = mirror(chain)
+    chain.mine([mint(POOL_A, -120, 120, E18), mint(POOL_B, 60, 180, E18)])
+    chain.mine([burn(POOL_A, -120, 120, E18 // 2)])
+    assert state.sync() == 3
+    pool_a = state.snapshot(POOL_A)
+    assert pool_a.liquidity == 2 * E18 + E18 // 2
+    assert pool_a.ticks[-120] == E18 // 2 and pool_a.ticks[120] == -E18 // 2
+    # Out of range at tick 0, so only liquidityNet changes
+    assert state.snapshot(POOL_B).liquidity == 2 * E18 and state.snapshot(POOL_B).ticks[60] == E18
+    # Several blocks at once use a range
+    assert state.w3.eth.log_queries[-1]["fromBlock"] == 101
+
+
+def test_logs_already_in_the_snapshot_are_skipped(chain):
+    chain.mine([swap(POOL_A, Q96 * 2, E18, 120)])
+    state, _ = mirror(chain)
+    state.block_number -= 1
+    state.block_hash = chain.blocks[-2]["hash"]
+    state.sync()
+    assert state.snapshot(POOL_A).sqrt_price_x96 == Q96
+
+
+def test_reorg_rolls_back_to_the_last_canonical_checkpoint(chain):
+    state, utility = mirror(chain)
+    chain.mine([swap(POOL_A, Q96 * 2, E18, 120)])
+    chain.mine([swap(POOL_A, Q96 * 3, E18, 240)])
+    state.sync()
+    state.sync()
+
+    chain.reorg(2)
+    chain.mine([swap(POOL_A, Q96 // 2, 5 * E18, -120)])
+    chain.mine([])
+    chain.mine([])
+    assert state.sync() == 1
+    assert state.snapshot(POOL_A).sqrt_price_x96 == Q96 // 2 and state.snapshot(POOL_A).liquidity == 5 * E18
+    assert state.block_number == 103 and state.block_hash == chain.blocks[-1]["hash"]
+    # Only the load snapshotted pools; the rollback reused the checkpoint
+    assert utility.snapshots == [POOL_A, POOL_B]
+    assert [number for number, _, _ in state.checkpoints] == [100, 103]
+
+
+def test_reorg_at_the_same_height_applies_the_replacement_block(chain):
+    state, _ = mirror(chain)
+    chain.mine([swap(POOL_A, Q96 * 2, E18, 120)])
+    state.sync()
+    chain.reorg(1)
+    chain.mine([swap(POOL_A, Q96 * 4, E18, 360)])
+    assert state.sync() == 1
+    assert state.snapshot(POOL_A).sqrt_price_x96 == Q96 * 4
+    assert state.block_hash == chain.blocks[-1]["hash"]
+
+
+def test_head_behind_the_mirror_rolls_back_and_waits(chain):
+    state, _ = mirror(chain)
+    chain.mine([swap(POOL_A, Q96 * 2, E18, 120)])
+    state.sync()
+    chain.reorg(1)
+    assert state.sync() == 0
+    assert state.block_number == 100 and state.snapshot(POOL_A).sqrt_price_x96 == Q96
+    chain.mine([swap(POOL_A, Q96 * 4, E18, 360)])
+    assert state.sync() == 1
+    assert state.snapshot(POOL_A).sqrt_price_x96 == Q96 * 4
+
+
+def test_reorg_deeper_than_the_checkpoints_reloads(chain):
+    state, utility = mirror(chain, checkpoints=2)
+    for price in (2, 3, 4):
+        chain.mine([swap(POOL_A, Q96 * price, E18, 120)])
+        state.sync()
+    chain.reorg(3)
+    chain.mine([])
+    chain.mine([])
+    chain.mine([])
+    chain.mine([])
+    state.sync()
+    assert utility.snapshots == [POOL_A, POOL_B] * 2
+    assert state.snapshot(POOL_A).sqrt_price_x96 == Q96
+
+
+def test_drift_to_the_edge_of_the_loaded_words_resnapshots(chain):
+    state, utility = mirror(chain, word_radius=1)
+    chain.mine([swap(POOL_B, Q96 // 2, E18, -SPACING * 256)])
+    state.sync()
+    assert utility.snapshots == [POOL_A, POOL_B, POOL_B]
+    assert state.snapshot(POOL_B).tick == 0
@@ -0,0 +1,149 @@
+import itertools
+import math
+import random
+
+import pytest
+
+from router_decoder import decode_path
+from uniswap_utility import RouteGraph, Uniutility, encode_packed_path
+from uniswap_v3_math import Q96
+
+TOKENS = ["0x" + f"{index:02x}" * 20 for index in range(1, 6)]
+T0, T1, T2, T3, T4 = TOKENS
+RECIPIENT = "0xdC333239245ebBC6B656Ace7c08099AA415585d1"
+E18 = 10 ** 18
+
+
+def sqrt_price(price: float) -> int:
+    """sqrtPriceX96 for ``price`` token1 per token0."""
+    return int(math.sqrt(price) * Q96)
+
+
+def pool_address(index: int) -> str:
+    return "0x" + f"{0xa0 + index:02x}" * 20
+
+
+def graph(specs) -> RouteGraph:
+    """specs: (token_a, token_b, fee, price of the higher address in the lower, liquidity)."""
+    pools, states = {}, {}
+    for index, (token_a, token_b, fee, price, liquidity) in enumerate(specs):
+        token0, token1 = sorted((token_a, token_b), key=lambda token: int(token, 16))
+        pools[(token0, token1, fee)] = pool_address(index)
+        states[pool_address(index)] = (sqrt_price(price), liquidity)
+    return RouteGraph(pools, states, block_number=100)
+
+
+def brute_force(route_graph: RouteGraph, token_in: str, token_out: str, amount_in: int, max_hops: int) -> int:
+    """Best exact output over every path of 1..max_hops hops that visits no token twice."""
+    source, target = route_graph.token_ids[token_in], route_graph.token_ids[token_out]
+    best = 0
+    for hops in range(1, max_hops + 1):
+        for edges in itertools.product(range(len(route_graph.edges)), repeat=hops):
+            chain = [route_graph.edges[edge] for edge in edges]
+            if chain[0][0] != source or chain[-1][1] != target:
+                continue
+            if any(a[1] != b[0] for a, b in zip(chain, chain[1:])):
+                continue
+            if len({edge[0] for edge in chain} | {target}) != hops + 1:
+                continue
+            best = max(best, route_graph.quote_exact(list(edges), amount_in))
+    return best
+
+
+def test_prefers_a_deep_two_hop_route_over_a_thin_direct_pool():
+    route_graph = graph([
+        (T0, T1, 3000, 1.0, 10 ** 17),
+        (T0, T2, 500, 2.0, 10 ** 24),
+        (T1, T2, 500, 2.0, 10 ** 24),
+    ])
+    route = route_graph.best_route(T0, T1, E18)
+    assert route["tokens"] == [T0, T2, T1]
+    assert route["fees"] == [500, 500]
+    assert route["pools"] == [pool_address(1), pool_address(2)]
+    assert route["amount_out"] == brute_force(route_graph, T0, T1, E18, 3)
+    assert route["block_number"] == 100
+    assert decode_path(route["encoded_path"]) == ((T0, T2, T1), (500, 500))
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_search_matches_brute_force(seed):
+    generator = random.Random(seed)
+    specs = []
+    for token_a, token_b in itertools.combinations(TOKENS, 2):
+        for fee in (500, 3000):
+            if generator.random() < 0.6:
+                specs.append((token_a, token_b, fee, generator.uniform(0.5, 2.0), generator.randrange(10 ** 18, 10 ** 21)))
+    route_graph = graph(specs)
+    for token_in, token_out in [(T0, T4), (T1, T3), (T4, T2)]:
+        if token_in not in route_graph.token_ids or token_out not in route_graph.token_ids:
+            continue
+        route = route_graph.best_route(token_in, token_out, E18, max_hops=3)
+        expected = brute_force(route_graph, token_in, token_out, E18, 3)
+        assert route["amount_out"] == expected
+
+
+def test_unconnected_and_unknown_tokens():
+    route_graph = graph([(T0, T1, 500, 1.0, 10 ** 21), (T2, T3, 500, 1.0, 10 ** 21)])
+    assert route_graph.best_route(T0, T3, E18) is None
+    assert route_graph.best_route(T0, T4, E18) is None
+    assert route_graph.split_route(T0, T4, E18) is None
+    assert route_graph.best_route(T0, T0, E18) is None
+
+
+def test_pools_without_liquidity_are_skipped():
+    route_graph = graph([(T0, T1, 500, 1.0, 0), (T0, T1, 3000, 1.0, 10 ** 21)])
+    assert len(route_graph.edges) == 2
+    assert route_graph.best_route(T0, T1, E18)["fees"] == [3000]
+
+
+def test_split_route_spreads_a_large_trade():
+    route_graph = graph([
+        (T0, T1, 500, 1.0, 10 ** 20),
+        (T0, T1, 3000, 1.0, 10 ** 20),
+        (T0, T2, 500, 1.0, 10 ** 20),
+        (T1, T2, 500, 1.0, 10 ** 20),
+    ])
+    amount_in = 50 * E18
+    best = route_graph.best_route(T0, T1, amount_in)
+    split = route_graph.split_route(T0, T1, amount_in, parts=20)
+    assert split["amount_in"] == amount_in
+    assert sum(route["amount_in"] for route in split["routes"]) == amount_in
+    assert split["amount_out"] == sum(route["amount_out"] for route in split["routes"])
+    assert len(split["routes"]) > 1
+    assert split["amount_out"] > best["amount_out"]
+    # Multi-hop candidates never share a pool with another candidate
+    pools = [pool for route in split["routes"] for pool in route["pools"]]
+    assert len(pools) == len(set(pools))
+
+
+def test_split_route_small_trade_stays_on_one_route():
+    route_graph = graph([(T0, T1, 500, 1.0, 10 ** 24), (T0, T1, 10000, 1.0, 10 ** 24)])
+    split = route_graph.split_route(T0, T1, 10 ** 6)
+    assert [route["fees"] for route in split["routes"]] == [[500]]
+
+
+def test_encode_packed_path_accepts_unprefixed_addresses():
+    prefixed = encode_packed_path([T0, T1, T2], [500, 3000])
+    assert len(prefixed) == 20 + 3 + 20 + 3 + 20
+    assert encode_packed_path([T0[2:], T1, T2[2:]], [500, 3000]) == prefixed
+
+
+@pytest.mark.parametrize("tokens, fees", [([T0, T1[:-2]], [500]), ([T0, T1], []), ([T0, "0xzz" + T1[4:]], [500])])
+def test_encode_packed_path_rejects_bad_input(tokens, fees):
+    with pytest.raises(ValueError):
+        encode_packed_path(tokens, fees)
+
+
+def test_exact_input_with_only_a_route():
+    uni = Uniutility(offline=True)
+    route = graph([(T0, T1, 500, 1.0, 10 ** 21)]).best_route(T0, T1, E18)
+    result = uni.exact_input(route=route, recipient=RECIPIENT, slippage=1)
+    params = uni.decode_calls([result["encoded_exactInput"]])[0].args.params
+    assert params.amountIn == E18
+    assert params.amountOutMinimum == route["amount_out"] * 99 // 100
+    assert params.path == route["encoded_path"]
+
+
+def test_exact_input_needs_a_path_or_route():
+    with pytest.raises(ValueError):
+        Uniutility(offline=True).exact_input(amount_in=E18)
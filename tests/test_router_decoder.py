@@ -0,0 +1,123 @@
+import time
+
+import pytest
+from eth_abi import encode as abi_encode
+
+from router_decoder import RouterDecoder, decode_path
+from uniswap_utility import UNI_V3_ROUTER2_ABI_PATH, encode_packed_path
+from web3utility import load_abi
+
+WETH = "0x82af49447d8a07e3bd95bd0d56f35241523fbab1"
+USDC = "0xaf88d065e77c8cc2239327c5edb3a432268e5831"
+RECIPIENT = "0xdc333239245ebbc6b656ace7c08099aa415585d1"
+
+EXACT_INPUT_SINGLE = bytes.fromhex("04e45aaf")
+EXACT_INPUT = bytes.fromhex("b858183f")
+MULTICALL = bytes.fromhex("ac9650d8")
+MULTICALL_DEADLINE = bytes.fromhex("5ae401dc")
+
+# Arbitrum router transaction: multicall(deadline, [exactInputSingle(WETH -> USDC, fee 500)])
+SAMPLE_MULTICALL = (
+    "0x5ae401dc00000000000000000000000000000000000000000000000000000000671d2a220000000000000000000000"
+    "000000000000000000000000000000000000000040000000000000000000000000000000000000000000000000000000"
+    "000000000100000000000000000000000000000000000000000000000000000000000000200000000000000000000000"
+    "0000000000000000000000000000000000000000e404e45aaf00000000000000000000000082af49447d8a07e3bd95bd"
+    "0d56f35241523fbab1000000000000000000000000af88d065e77c8cc2239327c5edb3a432268e583100000000000000"
+    "000000000000000000000000000000000000000000000001f4000000000000000000000000dc333239245ebbc6b656ac"
+    "e7c08099aa415585d10000000000000000000000000000000000000000000000004563918244f4000000000000000000"
+    "000000000000000000000000000000000000000002dd20955e0000000000000000000000000000000000000000000000"
+    "00000000000000000000000000000000000000000000000000000000000000000000000000"
+)
+
+
+@pytest.fixture(scope="module")
+def decoder():
+    return RouterDecoder(load_abi(UNI_V3_ROUTER2_ABI_PATH))
+
+
+def exact_input_single(amount_in=5 * 10 ** 18):
+    return EXACT_INPUT_SINGLE + abi_encode(
+        ["(address,address,uint24,address,uint256,uint256,uint160)"],
+        [(WETH, USDC, 500, RECIPIENT, amount_in, 1, 0)],
+    )
+
+
+def exact_input(path):
+    return EXACT_INPUT + abi_encode(["(bytes,address,uint256,uint256)"], [(path, RECIPIENT, 10 ** 6, 1)])
+
+
+def test_decodes_recorded_multicall(decoder):
+    call = decoder.decode(SAMPLE_MULTICALL)
+    assert call.fn_name == "multicall"
+    assert call.args.deadline == 0x671d2a22
+    (inner,) = call.calls
+    assert inner.fn_name == "exactInputSingle"
+    params = inner.args.params
+    assert (params.tokenIn, params.tokenOut, params.fee, params.recipient) == (WETH, USDC, 500, RECIPIENT)
+    assert params.amountIn == 5 * 10 ** 18
+    assert params.amountOutMinimum == 12299834718
+
+
+def test_round_trips_eth_abi_encoding(decoder):
+    path = encode_packed_path([USDC, WETH], [500])
+    calldata = MULTICALL + abi_encode(["bytes[]"], [[exact_input_single(), exact_input(path)]])
+    call = decoder.decode(calldata)
+    assert [inner.fn_name for inner in call.calls] == ["exactInputSingle", "exactInput"]
+    assert call.calls[0].args.params.amountIn == 5 * 10 ** 18
+    decoded = call.calls[1].args.params
+    assert decoded.path == path
+    assert decode_path(decoded.path) == ((USDC, WETH), (500,))
+    assert (decoded.recipient, decoded.amountIn, decoded.amountOutMinimum) == (RECIPIENT, 10 ** 6, 1)
+
+
+def test_unknown_selector(decoder):
+    assert decoder.decode(b"\xde\xad\xbe\xef" + bytes(64)) is None
+
+
+def test_truncated_calldata_is_rejected(decoder):
+    path = encode_packed_path([USDC, WETH], [500])
+    calldata = exact_input(path)
+    # 4 selector + 32 offset + 128 tuple head + 32 length word + the path itself (trailing padding is optional)
+    end_of_data = 4 + 32 + 128 + 32 + len(path)
+    for length in range(end_of_data):
+        assert decoder.decode(calldata[:length]) is None, length
+    assert decoder.decode(calldata[:end_of_data]).args.params.path == path
+
+    single = exact_input_single()
+    for length in range(len(single)):
+        assert decoder.decode(single[:length]) is None, length
+
+    nested = MULTICALL + abi_encode(["bytes[]"], [[single]])
+    for length in range(len(nested) - 28):
+        assert decoder.decode(nested[:length]) is None, length
+
+
+def test_hostile_array_count_fails_fast(decoder):
+    calldata = MULTICALL + (32).to_bytes(32, "big") + (2 ** 200).to_bytes(32, "big")
+    start = time.perf_counter()
+    assert decoder.decode(calldata) is None
+    assert time.perf_counter() - start < 0.1
+
+
+@pytest.mark.parametrize("word_index", [0, 2])
+def test_hostile_offsets_are_rejected(decoder, word_index):
+    calldata = bytearray(MULTICALL + abi_encode(["bytes[]"], [[exact_input_single()]]))
+    # word 0: offset of the bytes[] array, word 2: offset of its first element
+    calldata[4 + 32 * word_index:4 + 32 * (word_index + 1)] = (2 ** 255).to_bytes(32, "big")
+    assert decoder.decode(bytes(calldata)) is None
+
+
+def test_hostile_bytes_length_is_rejected(decoder):
+    calldata = bytearray(exact_input(encode_packed_path([USDC, WETH], [500])))
+    # exactInput: selector, tuple offset, 4 head words, then the path length word
+    length_word = 4 + 32 + 128
+    calldata[length_word:length_word + 32] = (2 ** 64).to_bytes(32, "big")
+    assert decoder.decode(bytes(calldata)) is None
+
+
+def test_decode_path_rejects_bad_lengths():
+    path = encode_packed_path([USDC, WETH, RECIPIENT], [500, 3000])
+    assert decode_path(path) == ((USDC, WETH, RECIPIENT), (500, 3000))
+    for length in (0, 20, 42, 44, len(path) - 1):
+        with pytest.raises(ValueError):
+            decode_path(path[:length])
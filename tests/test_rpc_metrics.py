@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from rpc_metrics import RpcMetrics, instrument_methods, report_error
+
+
+class Service:
+    def lookup(self, fail: bool):
+        try:
+            if fail:
+                raise KeyError("missing")
+            return 1
+        except Exception as e:
+            print(f"Error in lookup: {e}")
+            report_error(e)
+            return None
+
+    def outer(self):
+        # 内側の計測対象メソッドのエラーは内側にだけ数える
+        return self.lookup(True)
+
+    def explode(self):
+        raise ValueError("boom")
+
+    async def async_lookup(self, fail: bool):
+        try:
+            await asyncio.sleep(0)
+            if fail:
+                raise KeyError("missing")
+            return 1
+        except Exception as e:
+            print(f"Error in async_lookup: {e}")
+            report_error(e)
+            return None
+
+
+@pytest.fixture
+def service():
+    service = Service()
+    metrics = RpcMetrics()
+    instrument_methods(service, ("lookup", "outer", "explode", "async_lookup"), metrics)
+    return service, metrics
+
+
+def test_reported_errors_are_counted(service):
+    service, metrics = service
+    assert service.lookup(False) == 1
+    assert service.lookup(True) is None
+    operations = metrics.stats()["operations"]
+    assert operations["lookup"]["calls"] == 2
+    assert operations["lookup"]["errors"] == {"KeyError": 1}
+
+
+def test_escaping_errors_are_counted(service):
+    service, metrics = service
+    with pytest.raises(ValueError):
+        service.explode()
+    assert metrics.stats()["operations"]["explode"]["errors"] == {"ValueError": 1}
+
+
+def test_nested_errors_stay_with_the_inner_operation(service):
+    service, metrics = service
+    service.outer()
+    operations = metrics.stats()["operations"]
+    assert operations["lookup"]["errors"] == {"KeyError": 1}
+    assert operations["outer"]["errors"] == {}
+
+
+def test_async_reported_errors_are_counted(service):
+    service, metrics = service
+    assert asyncio.run(service.async_lookup(True)) is None
+    assert metrics.stats()["operations"]["async_lookup"]["errors"] == {"KeyError": 1}
+
+
+def test_report_error_outside_an_operation_is_ignored():
+    report_error(RuntimeError("not traced"))
+
+
+def test_batch_round_trips_are_separate_from_methods():
+    metrics = RpcMetrics()
+    metrics.record_rpc(["eth_call", "eth_call", "eth_blockNumber"], [None, "rpc_error(3)", None],
+                       latency=0.01, request_bytes=120, response_bytes=80, batch=True)
+    metrics.record_rpc(["eth_chainId"], latency=0.002, request_bytes=40, response_bytes=30)
+    stats = metrics.stats()
+    assert set(stats["rpc"]) == {"eth_call", "eth_blockNumber", "eth_chainId"}
+    assert stats["rpc"]["eth_call"]["calls"] == 2
+    assert stats["rpc"]["eth_call"]["errors"] == {"rpc_error(3)": 1}
+    assert stats["batch"]["round_trips"] == 1
+    assert stats["batch"]["request_bytes"] == 120
+
+    text = metrics.prometheus_text()
+    assert 'method="batch"' not in text
+    assert "web3utility_rpc_batch_round_trips_total 1" in text
+    assert "web3utility_rpc_batch_latency_seconds_count 1" in text
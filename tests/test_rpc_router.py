@@ -0,0 +1,146 @@
+import time
+
+import pytest
+
+from rpc_router import RoutingHTTPProvider
+from stub_node import StubNode
+
+RATE_LIMITED = {"code": -32005, "message": "rate limit exceeded"}
+REVERTED = {"code": -32603, "message": "execution reverted"}
+
+
+class Node(StubNode):
+    """StubNode that answers each method with a JSON-RPC error from ``errors`` when one is set."""
+
+    def __init__(self, filter_id: str = "0x1", latency: float = 0.0):
+        super().__init__({"responses": {
+            "eth_chainId": {"*": "0x2105"},
+            "eth_newFilter": {"*": filter_id},
+            "eth_newBlockFilter": {"*": filter_id},
+            "eth_getFilterChanges": {"*": [filter_id]},
+            "eth_uninstallFilter": {"*": True},
+        }}, latency=latency)
+        self.errors = {}
+
+    def handle(self, request: dict) -> dict:
+        error = self.errors.get(request["method"])
+        if error is None:
+            return super().handle(request)
+        with self._lock:
+            self.calls[request["method"]] += 1
+        return {"jsonrpc": "2.0", "id": request.get("id"), "error": error}
+
+
+@pytest.fixture
+def nodes():
+    first, second = Node("0xa"), Node("0xb")
+    with first, second:
+        yield first, second
+
+
+def router(nodes, **config):
+    return RoutingHTTPProvider([node.url for node in nodes], {"hedge_after": 5.0, **config})
+
+
+def test_read_goes_to_one_endpoint(nodes):
+    provider = router(nodes)
+    assert provider.make_request("eth_chainId", [])["result"] == "0x2105"
+    assert nodes[0].calls["eth_chainId"] + nodes[1].calls["eth_chainId"] == 1
+
+
+def test_rate_limited_endpoint_fails_over_and_cools_down(nodes):
+    first, second = nodes
+    first.errors["eth_chainId"] = RATE_LIMITED
+    provider = router(nodes, max_failures=1, cooldown=60)
+    assert provider.make_request("eth_chainId", [])["result"] == "0x2105"
+    assert (first.calls["eth_chainId"], second.calls["eth_chainId"]) == (1, 1)
+    assert provider.stats()[first.url]["healthy"] is False
+    # While cooling down the endpoint is ranked last and not tried first
+    provider.make_request("eth_chainId", [])
+    assert (first.calls["eth_chainId"], second.calls["eth_chainId"]) == (1, 2)
+
+
+def test_unreachable_endpoint_fails_over(nodes):
+    with Node() as down:
+        pass
+    provider = RoutingHTTPProvider([down.url, nodes[1].url], {"hedge_after": 5.0})
+    assert provider.make_request("eth_chainId", [])["result"] == "0x2105"
+    assert provider.stats()[down.url]["error_rate"] == 1.0
+
+
+def test_internal_error_is_not_retried(nodes):
+    # -32603 is also how a revert is reported, so sending it elsewhere would only repeat it
+    for node in nodes:
+        node.errors["eth_chainId"] = REVERTED
+    provider = router(nodes)
+    assert provider.make_request("eth_chainId", [])["error"] == REVERTED
+    assert nodes[0].calls["eth_chainId"] + nodes[1].calls["eth_chainId"] == 1
+    assert all(summary["error_rate"] == 0.0 for summary in provider.stats().values())
+
+
+def test_all_endpoints_rate_limited_returns_the_error(nodes):
+    for node in nodes:
+        node.errors["eth_chainId"] = RATE_LIMITED
+    assert router(nodes).make_request("eth_chainId", [])["error"] == RATE_LIMITED
+
+
+def test_slow_endpoint_is_hedged():
+    slow, fast = Node(latency=0.5), Node()
+    with slow, fast:
+        provider = RoutingHTTPProvider([slow.url, fast.url], {"hedge_after": 0.05})
+        started = time.monotonic()
+        assert provider.make_request("eth_chainId", [])["result"] == "0x2105"
+        assert time.monotonic() - started < 0.4
+        assert fast.calls["eth_chainId"] == 1
+
+
+def test_filters_are_pinned_to_the_creating_endpoint(nodes):
+    first, second = nodes
+    provider = router(nodes)
+    filter_id = provider.make_request("eth_newFilter", [{}])["result"]
+    creator = {"0xa": 0, "0xb": 1}[filter_id]
+    assert provider.filter_endpoints == {filter_id: creator}
+    # Even when the creator is ranked last, polls go to it
+    provider.endpoint_stats[creator].cooldown_until = time.monotonic() + 60
+    for _ in range(3):
+        assert provider.make_request("eth_getFilterChanges", [filter_id])["result"] == [filter_id]
+    assert nodes[creator].calls["eth_getFilterChanges"] == 3
+    assert nodes[1 - creator].calls["eth_getFilterChanges"] == 0
+    assert provider.make_request("eth_uninstallFilter", [filter_id])["result"] is True
+    assert provider.filter_endpoints == {}
+
+
+def test_filter_creation_is_not_hedged_but_fails_over(nodes):
+    first, second = nodes
+    first.errors["eth_newBlockFilter"] = RATE_LIMITED
+    provider = router(nodes, hedge_after=0.0)
+    assert provider.make_request("eth_newBlockFilter", [])["result"] == "0xb"
+    assert provider.filter_endpoints == {"0xb": 1}
+    assert (first.calls["eth_newBlockFilter"], second.calls["eth_newBlockFilter"]) == (1, 1)
+
+
+def test_batches_follow_pinned_filters(nodes):
+    provider = router(nodes)
+    provider.filter_endpoints = {"0xa": 0, "0xb": 1}
+    responses = provider.make_batch_request([("eth_getFilterChanges", ["0xb"]), ("eth_chainId", [])])
+    assert [response["result"] for response in responses] == [["0xb"], "0x2105"]
+    assert nodes[0].round_trips == 0 and nodes[1].round_trips == 1
+    with pytest.raises(ValueError):
+        provider.make_batch_request([("eth_getFilterChanges", ["0xa"]), ("eth_getFilterChanges", ["0xb"])])
+
+
+def test_rate_limited_batch_fails_over(nodes):
+    first, second = nodes
+    first.errors["eth_chainId"] = RATE_LIMITED
+    provider = router(nodes)
+    responses = provider.make_batch_request([("eth_chainId", []), ("eth_chainId", [])])
+    assert [response["result"] for response in responses] == ["0x2105", "0x2105"]
+    assert (first.round_trips, second.round_trips) == (1, 1)
+
+
+def test_broadcast_reaches_every_endpoint(nodes):
+    first, second = nodes
+    first.errors["eth_sendRawTransaction"] = {"code": -32000, "message": "already known"}
+    response = router(nodes).make_request("eth_sendRawTransaction", ["0x01"])
+    assert response["result"].startswith("0x")
+    assert (first.calls["eth_sendRawTransaction"], second.calls["eth_sendRawTransaction"]) == (1, 1)
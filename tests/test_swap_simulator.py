@@ -0,0 +1,82 @@
+import json
+
+import pytest
+from eth_abi import encode as abi_encode
+
+from swap_simulator import ERROR_SELECTOR, PANIC_SELECTOR, RemoteSwapSimulator, SwapSimulator
+from uniswap_utility import Uniutility
+
+WETH = "0x4200000000000000000000000000000000000006"
+USDC = "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913"
+RECIPIENT = "0xdC333239245ebBC6B656Ace7c08099AA415585d1"
+BLOCK = 100
+
+
+@pytest.fixture(scope="module")
+def uni():
+    return Uniutility(offline=True)
+
+
+def single(uni, amount_in: int) -> str:
+    params = (WETH, USDC, 500, RECIPIENT, amount_in, 1, 0)
+    return uni.encode_call("exactInputSingle", [params])
+
+
+def snapshot(tmp_path, uni, entries) -> str:
+    """A save() snapshot holding (calldata, eth_call response, eth_estimateGas response) entries."""
+    path = str(tmp_path / "simulations.json")
+    with open(path, "w") as f:
+        json.dump([
+            [[BLOCK, uni.user_address, uni.target_contract, "0x" + bytes.fromhex(calldata[2:]).hex(), 0], call, gas]
+            for calldata, call, gas in entries
+        ], f)
+    return path
+
+
+def test_offline_snapshot_is_replayed_without_rpc(tmp_path, uni):
+    ok, reverted, panicked = single(uni, 10 ** 18), single(uni, 1), single(uni, 2)
+    path = snapshot(tmp_path, uni, [
+        (ok, {"result": "0x" + abi_encode(["uint256"], [3000 * 10 ** 6]).hex()}, {"result": hex(120000)}),
+        (reverted, {"error": {"code": 3, "message": "execution reverted",
+                              "data": "0x" + (ERROR_SELECTOR + abi_encode(["string"], ["Too little received"])).hex()}},
+         {"error": {"code": 3, "message": "execution reverted"}}),
+        (panicked, {"error": {"code": 3, "message": "execution reverted",
+                              "data": "0x" + (PANIC_SELECTOR + abi_encode(["uint256"], [0x11])).hex()}},
+         {"error": {"code": 3, "message": "execution reverted"}}),
+    ])
+    simulator = uni.remote_simulator(snapshot=path)
+    assert simulator.block_number == BLOCK
+    ok_result, reverted_result, panicked_result, missing = simulator.simulate_many([ok, reverted, panicked, single(uni, 3)])
+    assert ok_result.success and ok_result.gas_used == 120000 and ok_result.outputs == {"amountOut": 3000 * 10 ** 6}
+    assert not reverted_result.success and reverted_result.revert_reason == "Too little received"
+    assert panicked_result.revert_reason == "Panic(0x11)"
+    # Not in the snapshot and no node to ask
+    assert missing is None
+
+
+def test_multicall_outputs_are_decoded_per_call(tmp_path, uni):
+    calls = [single(uni, 10 ** 18), single(uni, 2 * 10 ** 18)]
+    calldata = uni.encode_call("multicall", [[bytes.fromhex(call[2:]) for call in calls]])
+    results = [abi_encode(["uint256"], [amount]) for amount in (3000, 6000)]
+    path = snapshot(tmp_path, uni, [(calldata, {"result": "0x" + abi_encode(["bytes[]"], [results]).hex()}, {"result": "0x1"})])
+    result = uni.remote_simulator(snapshot=path).simulate(calldata)
+    assert result.outputs == [{"amountOut": 3000}, {"amountOut": 6000}]
+
+
+def test_save_and_load_round_trip(tmp_path, uni):
+    calldata = single(uni, 10 ** 18)
+    simulator = uni.remote_simulator(snapshot=snapshot(tmp_path, uni, [(calldata, {"result": "0x" + abi_encode(["uint256"], [1]).hex()}, {"result": "0x5208"})]))
+    copy = str(tmp_path / "copy.json")
+    assert simulator.save(copy) == 1
+    assert uni.remote_simulator(snapshot=copy).simulate(calldata).gas_used == 21000
+
+
+def test_offline_without_a_snapshot_needs_a_block_number(uni):
+    with pytest.raises(ValueError):
+        uni.remote_simulator()
+    assert uni.remote_simulator(BLOCK).block_number == BLOCK
+
+
+def test_former_names_still_work(uni):
+    assert SwapSimulator is RemoteSwapSimulator
+    assert isinstance(uni.swap_simulator(BLOCK), RemoteSwapSimulator)
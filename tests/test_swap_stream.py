@@ -0,0 +1,251 @@
+import threading
+import time
+
+import pytest
+from eth_abi import encode as abi_encode
+
+import swap_stream
+from router_decoder import RouterDecoder
+from swap_stream import ReplaySource, RpcBlockSource, RpcPendingSource, SwapStream, router_transactions, swap_records
+from uniswap_utility import UNI_V3_ROUTER2_ABI_PATH, encode_packed_path
+from web3utility import load_abi
+
+ROUTER = "0x2626664c2603336E57B271c5C0b26F421741e481"
+WETH = "0x4200000000000000000000000000000000000006"
+USDC = "0x833589fcd6edb6e08f4c7c32d4f71b54bda02913"
+DAI = "0x50c5725949a6f0c72e6c4a641f24049a917db0cb"
+RECIPIENT = "0xdc333239245ebbc6b656ace7c08099aa415585d1"
+
+EXACT_INPUT_SINGLE = bytes.fromhex("04e45aaf")
+EXACT_INPUT = bytes.fromhex("b858183f")
+EXACT_OUTPUT = bytes.fromhex("09b81346")
+MULTICALL = bytes.fromhex("ac9650d8")
+UNWRAP_WETH9 = bytes.fromhex("49404b7c")
+
+
+@pytest.fixture(scope="module")
+def decoder():
+    return RouterDecoder(load_abi(UNI_V3_ROUTER2_ABI_PATH))
+
+
+def exact_input_single(amount_in: int) -> bytes:
+    return EXACT_INPUT_SINGLE + abi_encode(
+        ["(address,address,uint24,address,uint256,uint256,uint160)"], [(WETH, USDC, 500, RECIPIENT, amount_in, 1, 0)]
+    )
+
+
+def exact_input(path: bytes) -> bytes:
+    return EXACT_INPUT + abi_encode(["(bytes,address,uint256,uint256)"], [(path, RECIPIENT, 10 ** 18, 7)])
+
+
+def exact_output(path: bytes) -> bytes:
+    return EXACT_OUTPUT + abi_encode(["(bytes,address,uint256,uint256)"], [(path, RECIPIENT, 10 ** 6, 10 ** 18)])
+
+
+def multicall(calls) -> bytes:
+    return MULTICALL + abi_encode(["bytes[]"], [calls])
+
+
+def tx(data: bytes, to: str = ROUTER, index: int = 0) -> dict:
+    return {"hash": "0x" + f"{index:064x}", "from": RECIPIENT, "to": to, "input": "0x" + data.hex()}
+
+
+def blocks(count: int, per_block: int = 2) -> list:
+    return [
+        {"number": number, "transactions": [tx(exact_input_single(10 ** 18 + i), index=number * 100 + i) for i in range(per_block)]}
+        for number in range(count)
+    ]
+
+
+def test_router_transactions_filters_by_router_case_insensitively():
+    block = {"number": 1, "transactions": [tx(b"", ROUTER.lower()), tx(b"", "0x" + "00" * 20), {"to": None, "input": "0x"}]}
+    assert [number for number, _, _ in router_transactions([block], ROUTER)] == [1]
+
+
+def test_swap_records_flattens_multicalls_and_orders_paths(decoder):
+    path = encode_packed_path([WETH, USDC, DAI], [500, 3000])
+    transactions = [
+        (1, tx(exact_input_single(10 ** 18)), False),
+        (1, tx(multicall([exact_input(path), UNWRAP_WETH9 + abi_encode(["uint256", "address"], [0, RECIPIENT])])), False),
+        # exactOutput paths run from tokenOut back to tokenIn
+        (2, tx(exact_output(encode_packed_path([DAI, USDC, WETH], [3000, 500]))), True),
+    ]
+    stats = {}
+    records = list(swap_records(transactions, decoder, stats))
+    assert [record.fn_name for record in records] == ["exactInputSingle", "exactInput", "exactOutput"]
+    assert records[0].tokens == (WETH, USDC) and records[0].amount_in == 10 ** 18 and records[0].exact_input
+    assert records[1].tokens == (WETH, USDC, DAI) and records[1].fees == (500, 3000) and records[1].amount_out == 7
+    assert records[2].tokens == (WETH, USDC, DAI) and records[2].fees == (500, 3000)
+    assert records[2].pending and not records[2].exact_input
+    assert stats == {"records": 3}
+
+
+def test_bad_transactions_are_skipped_and_counted(decoder):
+    transactions = [
+        (1, tx(exact_input(b"\x01" * 30)), False),  # path of the wrong length
+        (1, {"hash": "0x00", "to": ROUTER}, False),  # no input
+        (1, tx(b"\xde\xad\xbe\xef"), False),  # unknown selector: not a swap, not an error
+        (1, tx(exact_input_single(5)), False),
+    ]
+    stats = {}
+    records = list(swap_records(transactions, decoder, stats))
+    assert [record.amount_in for record in records] == [5]
+    assert stats == {"decode_errors": 2, "records": 1}
+
+
+def test_stream_delivers_every_record_from_every_source(decoder):
+    stream = SwapStream([ReplaySource(blocks(5)), ReplaySource(blocks(3, per_block=1))], decoder, ROUTER).start()
+    records = list(stream)
+    assert len(records) == 5 * 2 + 3
+    assert stream.stats == {"records": 13, "decode_errors": 0, "source_errors": 0}
+
+
+def test_replay_file_round_trip(tmp_path, decoder):
+    path = str(tmp_path / "blocks.jsonl")
+    assert ReplaySource.record(blocks(4), path) == 4
+    assert len(list(SwapStream([ReplaySource(path)], decoder, ROUTER))) == 8
+
+
+def test_bounded_queue_makes_producers_wait(decoder):
+    stream = SwapStream([ReplaySource(blocks(50))], decoder, ROUTER, max_queue=3).start()
+    time.sleep(0.2)
+    # The producer is blocked on the full queue instead of decoding everything up front
+    assert stream.queue.qsize() == 3
+    assert stream.stats["records"] < 100
+    assert len(list(stream)) == 100
+
+
+def test_close_releases_a_blocked_producer(decoder):
+    stream = SwapStream([ReplaySource(blocks(50))], decoder, ROUTER, max_queue=2).start()
+    time.sleep(0.1)
+    stream.close()
+    for thread in stream._threads:
+        thread.join(timeout=2)
+        assert not thread.is_alive()
+
+
+class FailingSource:
+    def __iter__(self):
+        yield from blocks(1)
+        raise ConnectionError("node went away")
+
+
+def test_source_error_ends_only_that_source(decoder):
+    stream = SwapStream([FailingSource(), ReplaySource(blocks(2))], decoder, ROUTER).start()
+    assert len(list(stream)) == 2 + 4
+    assert stream.stats["source_errors"] == 1
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(swap_stream, "RETRY_DELAY", 0.001)
+    monkeypatch.setattr(swap_stream, "MAX_RETRY_DELAY", 0.004)
+
+
+class FlakyEth:
+    """block_number / get_block that fail ``failures`` times in a row before each success."""
+
+    def __init__(self, head: int, failures: int):
+        self.head = head
+        self.failures = failures
+        self.remaining = failures
+        self.requested = []
+
+    def _maybe_fail(self):
+        if self.remaining:
+            self.remaining -= 1
+            raise ConnectionError("timeout")
+        self.remaining = self.failures
+
+    @property
+    def block_number(self):
+        return self.head
+
+    def get_block(self, number, full_transactions=False):
+        self._maybe_fail()
+        self.requested.append(number)
+        return {"number": number, "transactions": []}
+
+
+class FakeW3:
+    def __init__(self, eth):
+        self.eth = eth
+
+
+def test_block_source_retries_with_backoff_without_skipping(fast_retries):
+    eth = FlakyEth(head=12, failures=3)
+    source = RpcBlockSource(FakeW3(eth), start_block=10, poll_interval=0.001)
+    delays = []
+    failed = source._failed
+
+    def record(error):
+        delays.append(source._delay)
+        failed(error)
+
+    source._failed = record
+    numbers = []
+    for block in source:
+        numbers.append(block["number"])
+        if len(numbers) == 3:
+            source.stop()
+    assert numbers == [10, 11, 12]
+    assert eth.requested == [10, 11, 12]
+    assert source.errors == 9
+    # 1x, 2x, 4x then capped, and reset after every success
+    assert delays == [0.001, 0.002, 0.004] * 3
+
+
+class FakeFilter:
+    def __init__(self, polls):
+        self.polls = polls
+
+    def get_new_entries(self):
+        entries = self.polls.pop(0)
+        if isinstance(entries, Exception):
+            raise entries
+        return entries
+
+
+class FakeFilterEth:
+    def __init__(self, polls):
+        self.polls = polls
+        self.filters = 0
+
+    def filter(self, name):
+        assert name == "pending"
+        self.filters += 1
+        return FakeFilter(self.polls)
+
+
+class PendingUtility:
+    """Answers eth_getTransactionByHash batches; odd hashes are already mined (null)."""
+
+    def __init__(self, polls):
+        self.w3 = FakeW3(FakeFilterEth(polls))
+        self.batches = []
+
+    def rpc_batch_responses(self, batch):
+        self.batches.append(batch)
+        responses = []
+        for method, (tx_hash,) in batch:
+            assert method == "eth_getTransactionByHash"
+            index = int(tx_hash, 16)
+            responses.append({"result": tx(exact_input_single(index), index=index) if index % 2 == 0 else None})
+        return responses
+
+
+def test_pending_source_fetches_each_poll_in_one_batch(fast_retries):
+    polls = [[bytes([0] * 31 + [index]) for index in range(6)], ConnectionError("filter not found"), ["0x" + f"{8:064x}"], []]
+    utility = PendingUtility(polls)
+    source = RpcPendingSource(utility, poll_interval=0.001)
+    received = []
+    for block in source:
+        received.append([int(transaction["hash"], 16) for transaction in block["transactions"]])
+        assert block["pending"] is True
+        if len(received) == 2:
+            source.stop()
+    assert received == [[0, 2, 4], [8]]
+    assert [len(batch) for batch in utility.batches] == [6, 1]
+    # The failed poll is retried on a new filter
+    assert utility.w3.eth.filters == 2
+    assert source.errors == 1
@@ -0,0 +1,78 @@
+import pytest
+from eth_account import Account
+
+from tx_signer import DEFAULT_FEE_BUMPS, DEFAULT_MAX_CACHED, TxSigner
+
+PRIVATE_KEY = "0x" + "4c" * 32
+RECIPIENT = "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913"
+
+
+def tx(nonce: int, max_fee: int = 2 * 10 ** 9) -> dict:
+    return {
+        "chainId": 8453, "nonce": nonce, "to": RECIPIENT, "value": 0, "gas": 21000, "data": "0x",
+        "maxFeePerGas": max_fee, "maxPriorityFeePerGas": 10 ** 6, "type": 2,
+    }
+
+
+def expected(transaction: dict) -> bytes:
+    return bytes(Account.sign_transaction(transaction, PRIVATE_KEY).rawTransaction)
+
+
+@pytest.fixture
+def signer():
+    signer = TxSigner(PRIVATE_KEY, workers=4, use_processes=False, chunk_size=2)
+    yield signer
+    signer.close()
+
+
+def test_defaults():
+    signer = TxSigner(PRIVATE_KEY)
+    assert signer.max_cached == DEFAULT_MAX_CACHED
+    assert signer.address == Account.from_key(PRIVATE_KEY).address
+
+
+def test_pooled_signatures_keep_input_order(signer):
+    txs = [tx(nonce) for nonce in range(11)]
+    payloads = signer.sign_many(txs)
+    assert [payload.nonce for payload in payloads] == list(range(11))
+    assert [payload.raw_transaction for payload in payloads] == [expected(transaction) for transaction in txs]
+
+
+def test_process_pool_matches_in_process_signing():
+    signer = TxSigner(PRIVATE_KEY, workers=2, use_processes=True)
+    try:
+        txs = [tx(nonce) for nonce in range(4)]
+        assert [payload.raw_transaction for payload in signer.sign_many(txs)] == [expected(transaction) for transaction in txs]
+    finally:
+        signer.close()
+
+
+def test_cache_keeps_the_newest_signatures():
+    signer = TxSigner(PRIVATE_KEY, workers=1, max_cached=3)
+    payloads = signer.sign_many([tx(nonce) for nonce in range(5)])
+    assert list(signer.signed) == [payload.tx_hash for payload in payloads[2:]]
+    assert signer.get(payloads[0].tx_hash) is None
+    # Signing an already cached transaction again makes it the newest
+    signer.sign(tx(2))
+    signer.sign(tx(5))
+    assert [payload.nonce for payload in signer.signed.values()] == [4, 2, 5]
+
+
+def test_get_accepts_hex_hashes(signer):
+    payload = signer.sign(tx(0))
+    hex_hash = payload.tx_hash.hex()
+    assert signer.get("0x" + hex_hash) is payload
+    assert signer.get(hex_hash) is payload
+    assert signer.get(payload.tx_hash) is payload
+
+
+def test_fee_variants_and_discard(signer):
+    variants = signer.fee_variants(tx(7))
+    signer.sign(tx(8))
+    assert [variant.tx["maxFeePerGas"] for variant in variants] == [int(2 * 10 ** 9 * bump) for bump in DEFAULT_FEE_BUMPS]
+    assert len({variant.tx_hash for variant in variants}) == len(DEFAULT_FEE_BUMPS)
+    signer.discard(7)
+    assert [payload.nonce for payload in signer.signed.values()] == [8]
+    # The cache keeps its order after a discard
+    signer.sign(tx(9))
+    assert [payload.nonce for payload in signer.signed.values()] == [8, 9]
@@ -0,0 +1,154 @@
+from decimal import ROUND_FLOOR, ROUND_HALF_UP, Decimal, localcontext
+
+import pytest
+
+from uniswap_v3_math import (
+    MAX_SQRT_RATIO,
+    MAX_TICK,
+    MIN_SQRT_RATIO,
+    MIN_TICK,
+    Q96,
+    PoolSnapshot,
+    compute_swap_step,
+    get_sqrt_ratio_at_tick,
+    get_tick_at_sqrt_ratio,
+)
+
+E18 = 10 ** 18
+
+# TickMath.getSqrtRatioAtTick outputs of the deployed library (v3-core test snapshots)
+SQRT_RATIOS = {
+    MIN_TICK: MIN_SQRT_RATIO,
+    MIN_TICK + 1: 4295343490,
+    -50: 79030349367926598376800521322,
+    0: Q96,
+    50: 79426470787362580746886972461,
+    100: 79625275426524748796330556128,
+    250: 80224679980005306637834519095,
+    500: 81233731461783161732293370115,
+    1000: 83290069058676223003182343270,
+    2500: 89776708723587163891445672585,
+    3000: 92049301871182272007977902845,
+    4000: 96768528593268422080558758223,
+    5000: 101729702841318637793976746270,
+    50000: 965075977353221155028623082916,
+    150000: 143194173941309278083010301478497,
+    250000: 21246587762933397357449903968194344,
+    500000: 5697689776495288729098254600827762987878,
+    738203: 847134979253254120489401328389043031315994541,
+    MAX_TICK - 1: 1461373636630004318706518188784493106690254656249,
+    MAX_TICK: MAX_SQRT_RATIO,
+}
+
+
+def encode_price_sqrt(reserve1: int, reserve0: int) -> int:
+    """sqrt(reserve1 / reserve0) as a Q64.96, rounded like the v3-core test helper."""
+    with localcontext() as context:
+        context.prec = 80
+        root = (Decimal(reserve1) / Decimal(reserve0)).sqrt().quantize(Decimal(10) ** -40, rounding=ROUND_HALF_UP)
+        return int((root * Q96).to_integral_value(rounding=ROUND_FLOOR))
+
+
+@pytest.mark.parametrize("tick, sqrt_ratio", SQRT_RATIOS.items())
+def test_sqrt_ratio_at_tick(tick, sqrt_ratio):
+    assert get_sqrt_ratio_at_tick(tick) == sqrt_ratio
+
+
+@pytest.mark.parametrize("tick", [MIN_TICK - 1, MAX_TICK + 1])
+def test_sqrt_ratio_at_tick_out_of_range(tick):
+    with pytest.raises(ValueError):
+        get_sqrt_ratio_at_tick(tick)
+
+
+@pytest.mark.parametrize("tick", [tick for tick in SQRT_RATIOS if tick < MAX_TICK])
+def test_tick_at_sqrt_ratio_round_trip(tick):
+    sqrt_ratio = get_sqrt_ratio_at_tick(tick)
+    assert get_tick_at_sqrt_ratio(sqrt_ratio) == tick
+    # The greatest tick whose ratio is <= the price
+    assert get_tick_at_sqrt_ratio(get_sqrt_ratio_at_tick(tick + 1) - 1) == tick
+
+
+@pytest.mark.parametrize("sqrt_ratio", [MIN_SQRT_RATIO - 1, MAX_SQRT_RATIO])
+def test_tick_at_sqrt_ratio_out_of_range(sqrt_ratio):
+    with pytest.raises(ValueError):
+        get_tick_at_sqrt_ratio(sqrt_ratio)
+
+
+# SwapMath.computeSwapStep cases from v3-core: (current, target, liquidity, amount_remaining, fee) -> (next, in, out, fee)
+SWAP_STEPS = [
+    # exact input capped at the price target, one for zero
+    ((encode_price_sqrt(1, 1), encode_price_sqrt(101, 100), 2 * E18, E18, 600),
+     (encode_price_sqrt(101, 100), 9975124224178055, 9925619580021728, 5988667735148)),
+    # exact output capped at the price target, one for zero
+    ((encode_price_sqrt(1, 1), encode_price_sqrt(101, 100), 2 * E18, -E18, 600),
+     (encode_price_sqrt(101, 100), 9975124224178055, 9925619580021728, 5988667735148)),
+    # exact input fully spent before the target
+    ((encode_price_sqrt(1, 1), encode_price_sqrt(1000, 100), 2 * E18, E18, 600),
+     (118818475322642227089037862318, 999400000000000000, 666399946655997866, 600000000000000)),
+    # entire input taken as fee
+    ((2413, 79887613182836312, 1985041575832132834610021537970, 10, 1872), (2413, 0, 0, 10)),
+    # intermediate insufficient liquidity, exact output with the price moving up (one for zero)
+    ((20282409603651670423947251286016, 20282409603651670423947251286016 * 11 // 10, 1024, -4, 3000),
+     (20282409603651670423947251286016 * 11 // 10, 26215, 0, 79)),
+    # intermediate insufficient liquidity, exact output with the price moving down (zero for one)
+    ((20282409603651670423947251286016, 20282409603651670423947251286016 * 9 // 10, 1024, -263000, 3000),
+     (20282409603651670423947251286016 * 9 // 10, 1, 26214, 1)),
+]
+
+
+@pytest.mark.parametrize("args, expected", SWAP_STEPS)
+def test_compute_swap_step(args, expected):
+    assert compute_swap_step(*args) == expected
+
+
+def snapshot(**kwargs) -> PoolSnapshot:
+    """One full-range position of 2e18 liquidity at price 1, fee 0.3%."""
+    spacing = 60
+    lower, upper = (MIN_TICK // spacing + 1) * spacing, MAX_TICK // spacing * spacing
+    params = dict(
+        pool_address="0x" + "00" * 20, token0="0x" + "01" * 20, token1="0x" + "02" * 20, decimals0=18, decimals1=18,
+        fee=3000, tick_spacing=spacing, sqrt_price_x96=Q96, tick=0, liquidity=2 * E18,
+        ticks={lower: 2 * E18, upper: -2 * E18}, min_word=(lower // spacing) >> 8, max_word=(upper // spacing) >> 8,
+    )
+    params.update(kwargs)
+    return PoolSnapshot(**params)
+
+
+@pytest.mark.parametrize("zero_for_one", [True, False])
+def test_snapshot_swap_matches_single_step(zero_for_one):
+    pool = snapshot()
+    amount0, amount1, sqrt_price, tick, liquidity = pool.swap(zero_for_one, E18 // 10)
+    # The swap ends inside one word without crossing a tick, so it is one step that stops short of its target
+    limit = MIN_SQRT_RATIO + 1 if zero_for_one else MAX_SQRT_RATIO - 1
+    next_price, amount_in, amount_out, fee = compute_swap_step(Q96, limit, 2 * E18, E18 // 10, 3000)
+    assert sqrt_price == next_price
+    assert (amount0, amount1) == ((amount_in + fee, -amount_out) if zero_for_one else (-amount_out, amount_in + fee))
+    assert tick == get_tick_at_sqrt_ratio(sqrt_price)
+    assert liquidity == 2 * E18
+    # The snapshot itself is not changed
+    assert pool.sqrt_price_x96 == Q96
+
+
+@pytest.mark.parametrize("zero_for_one", [True, False])
+def test_snapshot_exact_output_covers_exact_input(zero_for_one):
+    pool = snapshot()
+    amount_out = pool.quote_exact_input(E18 // 10, zero_for_one)
+    amount_in = pool.quote_exact_output(amount_out, zero_for_one)
+    # Rounding favours the pool, so buying the same output never costs more than was sold
+    assert 0 < amount_in <= E18 // 10
+    assert pool.quote_exact_input(amount_in, zero_for_one) >= amount_out
+
+
+def test_snapshot_swap_outside_loaded_words_raises():
+    with pytest.raises(ValueError):
+        snapshot(min_word=0, max_word=0).swap(True, E18)
+
+
+def test_apply_liquidity_updates_active_liquidity_and_ticks():
+    pool = snapshot()
+    pool.apply_liquidity(-120, 120, E18)
+    assert pool.liquidity == 3 * E18
+    assert pool.ticks[-120] == E18 and pool.ticks[120] == -E18
+    pool.apply_liquidity(-120, 120, -E18)
+    assert pool.liquidity == 2 * E18
+    assert -120 not in pool.ticks and 120 not in pool.ticks
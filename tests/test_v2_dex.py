@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from eth_abi import encode as abi_encode
+from web3 import Web3
+
+from pool_index import ZERO_ADDRESS
+from v2_dex import GET_RESERVES_SELECTOR, V2DexQuoter
+
+WETH = "0x4200000000000000000000000000000000000006"
+USDC = "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913"
+PAIR = "0x88A43bbDF9D098eEC7bCEda4e2494615dfD9bB9C"
+V3_POOL = "0xd0b53D9277642d899DF5C87A3966A349A798F224"
+# Above 2**53, so float64 rounds them
+RESERVE_WETH = 1234567890123456789012
+RESERVE_USDC = 3456789012345678901
+
+
+class FakeUtility:
+    """Answers getPair with PAIR and getReserves with the reserves above (WETH is token0); the V3 side is configurable."""
+
+    def __init__(self, v3=None, metadata_error=None):
+        self.w3 = Web3()
+        self.v3 = v3
+        self.metadata_error = metadata_error
+
+    def rpc_batch(self, batch):
+        responses = []
+        for _, (tx, _) in batch:
+            calls = Web3().codec.decode(["(address,bool,bytes)[]"], bytes.fromhex(tx["data"][10:]))[0]
+            results = []
+            for _, _, data in calls:
+                if data[:4] == GET_RESERVES_SELECTOR:
+                    results.append((True, abi_encode(["uint112", "uint112", "uint32"], [RESERVE_WETH, RESERVE_USDC, 0])))
+                else:
+                    results.append((True, abi_encode(["address"], [PAIR])))
+            responses.append("0x" + abi_encode(["(bool,bytes)[]"], [results]).hex())
+        return responses
+
+    def get_pool_metadata(self, pool_address):
+        if self.metadata_error is not None:
+            raise self.metadata_error
+        return {"token0": WETH, "token1": USDC, "fee": 500, "decimals0": 18, "decimals1": 6}
+
+    def simple_slippage_batch(self, pool_address, path, amounts, slippage):
+        return self.v3
+
+
+def quoter(**kwargs):
+    return V2DexQuoter(FakeUtility(**kwargs), {"uniswap_v2": {"factory": ZERO_ADDRESS[:-1] + "1", "fee_bps": 30}})
+
+
+def test_exact_quote_uses_integer_reserves():
+    amount = 10 ** 21
+    quote = quoter().quote(WETH, USDC, [amount], exact=True)
+    expected = V2DexQuoter.exact_amount_out(RESERVE_WETH, RESERVE_USDC, 30, amount)
+    assert quote["best_amount_out_exact"][0] == expected
+    from_floats = V2DexQuoter.exact_amount_out(int(float(RESERVE_WETH)), int(float(RESERVE_USDC)), 30, amount)
+    assert from_floats != expected
+
+
+def test_scan_keeps_integer_reserves():
+    scanned = quoter().scan([(USDC, WETH)], [10 ** 6])
+    assert scanned["reserve_in_int"][0, 0] == RESERVE_USDC
+    assert scanned["reserve_out_int"][0, 0] == RESERVE_WETH
+
+
+@pytest.mark.parametrize("kwargs", [{"v3": None}, {"metadata_error": ValueError("no pool")}])
+def test_unavailable_v3_keeps_v2_quote(kwargs):
+    quote = quoter(**kwargs).quote(WETH, USDC, [10 ** 18], v3_pool=V3_POOL)
+    assert quote is not None
+    assert quote["best_dex"] == ["uniswap_v2"]
+    assert quote["v3_available"] is False
+    assert quote["v3_amount_out"] is None
+    assert quote["v2_vs_v3"] is None
+
+
+def test_missing_v3_pool_is_unavailable():
+    quote = quoter(v3={"amount_out": np.array([1.0]), "decimals_out": 6}).quote(WETH, USDC, [10 ** 18], v3_pool=ZERO_ADDRESS)
+    assert quote["v3_available"] is False
+
+
+def test_available_v3_is_compared():
+    quote = quoter(v3={"amount_out": np.array([2.0]), "decimals_out": 6}).quote(WETH, USDC, [10 ** 18], v3_pool=V3_POOL)
+    assert quote["v3_available"] is True
+    assert quote["v3_amount_out"][0] == 2.0 * 10 ** 6
+    assert quote["v2_vs_v3"][0] == pytest.approx(quote["best_amount_out"][0] / 2e6)
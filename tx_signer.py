@@ -0,0 +1,160 @@
+import os
+import threading
+from collections import OrderedDict
+from functools import partial
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Union
+
+from eth_account import Account
+from eth_keys.backends import CoinCurveECCBackend, get_backend
+
+"""
+TxSigner クラス
+
+トランザクションの署名（secp256k1）と RLP シリアライズをワーカープールでまとめて行い、
+送信用の raw トランザクションを tx hash 単位でキャッシュします。
+
+- 既定ではプロセスプールで署名する（eth_keys の native バックエンドは GIL を解放しないため）
+  coincurve バックエンドが使える場合はスレッドプールで十分なので、プロセス起動のコストを避ける
+- 秘密鍵はワーカープロセスの初期化時に1回だけ渡し、以降はトランザクションの dict だけを送る
+- fee_variants() で同じ nonce の手数料違い（置き換え用）を事前に署名しておける
+- 結果は SignedPayload で、Web3Utility.send_multiple_tx にそのまま渡すと署名済みとして送信だけを行う
+- tx hash のキャッシュは max_cached 件までで、超えた分は古いものから外す
+"""
+
+DEFAULT_CHUNK_SIZE = 16
+DEFAULT_MAX_CACHED = 4096
+# 置き換えトランザクションはノードに最低 10% 以上の手数料の引き上げを要求されるため、既定は 12.5% 刻み
+DEFAULT_FEE_BUMPS = (1.0, 1.125, 1.25, 1.5, 2.0)
+
+_worker_account = None
+
+
+def _init_worker(private_key: str) -> None:
+    global _worker_account
+    _worker_account = Account.from_key(private_key)
+
+
+def _sign_with(account, txs: List[dict]) -> List[tuple]:
+    results = []
+    for tx in txs:
+        signed_tx = account.sign_transaction(tx)
+        results.append((bytes(signed_tx.rawTransaction), bytes(signed_tx.hash)))
+    return results
+
+
+def _sign_chunk(txs: List[dict]) -> List[tuple]:
+    return _sign_with(_worker_account, txs)
+
+
+class SignedPayload:
+    """署名済みのトランザクション。raw_transaction をそのまま eth_sendRawTransaction に渡せます"""
+
+    __slots__ = ("raw_transaction", "tx_hash", "nonce", "tx")
+
+    def __init__(self, raw_transaction: bytes, tx_hash: bytes, nonce: int, tx: dict):
+        self.raw_transaction = raw_transaction
+        self.tx_hash = tx_hash
+        self.nonce = nonce
+        self.tx = tx
+
+    def __repr__(self) -> str:
+        return f"SignedPayload(nonce={self.nonce}, tx_hash=0x{self.tx_hash.hex()})"
+
+
+class TxSigner:
+    def __init__(self,
+                 private_key: str,
+                 workers: int = None,
+                 use_processes: bool = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 max_cached: int = DEFAULT_MAX_CACHED):
+        """
+        workers: ワーカー数（既定は CPU 数）
+        use_processes: None の場合、coincurve バックエンドならスレッド、それ以外はプロセスを使う
+        max_cached: get() 用に保持する署名済みトランザクションの上限
+        """
+        self.account = Account.from_key(private_key)
+        self.address = self.account.address
+        self.workers = workers or os.cpu_count() or 1
+        if use_processes is None:
+            use_processes = not isinstance(get_backend(), CoinCurveECCBackend)
+        self.use_processes = use_processes
+        self.chunk_size = chunk_size
+        self.max_cached = max_cached
+        self.signed: Dict[bytes, SignedPayload] = OrderedDict()
+        self._private_key = private_key
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    def matches(self, private_key: str) -> bool:
+        return private_key == self._private_key
+
+    def _get_executor(self) -> Executor:
+        # プロセスの起動は初回の署名まで遅らせる
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=_init_worker, initargs=(self._private_key,)
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def sign_many(self, txs: Sequence[dict]) -> List[SignedPayload]:
+        """
+        nonce・手数料・gas が埋まったトランザクションをまとめて署名し、同じ順番の SignedPayload を返します
+        """
+        txs = [dict(tx) for tx in txs]
+        if len(txs) < 2 or self.workers == 1:
+            # 1件だけならワーカーへの受け渡しの方が高くつく
+            results = _sign_with(self.account, txs)
+        else:
+            chunk_size = max(1, min(self.chunk_size, -(-len(txs) // self.workers)))
+            chunks = [txs[start:start + chunk_size] for start in range(0, len(txs), chunk_size)]
+            sign_chunk = _sign_chunk if self.use_processes else partial(_sign_with, self.account)
+            results = [result for chunk in self._get_executor().map(sign_chunk, chunks) for result in chunk]
+
+        payloads = [
+            SignedPayload(raw_transaction, tx_hash, tx.get("nonce"), tx)
+            for tx, (raw_transaction, tx_hash) in zip(txs, results)
+        ]
+        with self._lock:
+            for payload in payloads:
+                self.signed[payload.tx_hash] = payload
+                self.signed.move_to_end(payload.tx_hash)
+            while len(self.signed) > self.max_cached:
+                self.signed.popitem(last=False)
+        return payloads
+
+    def sign(self, tx: dict) -> SignedPayload:
+        return self.sign_many([tx])[0]
+
+    def fee_variants(self, tx: dict, bumps: Sequence[float] = DEFAULT_FEE_BUMPS) -> List[SignedPayload]:
+        """
+        同じ nonce で maxFeePerGas / maxPriorityFeePerGas を bumps 倍したトランザクションを事前に署名します（置き換え用）
+        """
+        variants = []
+        for bump in bumps:
+            variant = dict(tx)
+            variant["maxFeePerGas"] = int(tx["maxFeePerGas"] * bump)
+            variant["maxPriorityFeePerGas"] = int(tx["maxPriorityFeePerGas"] * bump)
+            variants.append(variant)
+        return self.sign_many(variants)
+
+    def get(self, tx_hash: Union[bytes, str]) -> Optional[SignedPayload]:
+        if isinstance(tx_hash, str):
+            tx_hash = bytes.fromhex(tx_hash[2:] if tx_hash.startswith("0x") else tx_hash)
+        return self.signed.get(bytes(tx_hash))
+
+    def discard(self, nonce: int) -> None:
+        """nonce が使われた（取り込まれた）署名済みトランザクションをキャッシュから外します"""
+        with self._lock:
+            self.signed = OrderedDict(
+                (tx_hash, payload) for tx_hash, payload in self.signed.items() if payload.nonce != nonce
+            )
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -1,13 +1,102 @@
 import os
 import json
 import statistics
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
+from fractions import Fraction
+from functools import lru_cache
+import numpy as np
 from dotenv import load_dotenv
-from typing import List, Dict, Union, Any
+from typing import List, Dict, Union, Any, Sequence
 from web3 import Web3
+from web3.middleware import construct_simple_cache_middleware
+from web3.providers.base import BaseProvider
+from metadata_cache import MetadataCache
+from nonce_manager import NonceManager
+from gas_oracle import GasOracle, GAS_STRATEGIES
+from rpc_provider import PooledHTTPProvider
+from rpc_router import RoutingHTTPProvider
+from tx_signer import TxSigner, SignedPayload
+from abi_encoder import compile_types
+from gas_estimator import GasEstimateCache
+from rpc_metrics import RpcMetrics, instrument_methods, instrument_provider, report_error
 
 load_dotenv("web3.env")
 
+# Multicall3 は全EVMチェーンで同一アドレスにデプロイされている
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+ERC20_ABI_PATH = "Abi/token_basics_abi.json"
+MULTICALL3_ABI_PATH = "Abi/multicall_base_call_abi.json"
+UNISWAP_V3_POOL_ABI_PATH = "Dapps/UniswapAbi/UniswapV3_pool_abi.json"
+CONTRACT_CACHE_SIZE = 512
+
+# chain 引数（RPC URL の choice_chain に入る名前）と接続先が一致しているかの確認に使う
+CHAIN_IDS = {
+    "mainnet": 1,
+    "ethereum": 1,
+    "optimism": 10,
+    "bsc": 56,
+    "polygon": 137,
+    "base": 8453,
+    "arbitrum": 42161,
+    "avalanche": 43114,
+    "linea": 59144,
+    "sepolia": 11155111,
+    "base-sepolia": 84532,
+}
+# 接続中に変化しない RPC の結果をキャッシュする（web3 の validation ミドルウェアが eth_call ごとに eth_chainId を呼ぶため）
+STATIC_RPC_METHODS = ("eth_chainId", "net_version")
+
+
+@lru_cache(maxsize=None)
+def load_abi(abi_path: str) -> list:
+    """ABIファイルをプロセス内で1回だけ読み込みます（戻り値は共有されるため変更しないこと）"""
+    with open(abi_path, mode="r") as file:
+        return json.load(file)
+
+
+@lru_cache(maxsize=CONTRACT_CACHE_SIZE)
+def cached_contract(w3: Web3, address: str, abi_path: str):
+    """(Web3接続, チェックサムアドレス, ABI) ごとに構築済みのコントラクトオブジェクトを再利用します"""
+    return w3.eth.contract(address=address, abi=load_abi(abi_path))
+
+
+def endpoint_urls(rpc_url: Union[str, Sequence[str]], rpc_key: Union[str, Sequence[str]], chain: str) -> List[str]:
+    """rpc_url（choice_chain を含むテンプレート）と rpc_key の組から接続先 URL のリストを作ります"""
+    urls = [rpc_url] if isinstance(rpc_url, str) else list(rpc_url)
+    keys = [rpc_key] * len(urls) if rpc_key is None or isinstance(rpc_key, str) else list(rpc_key)
+    return [url.replace("choice_chain", chain) + (key or "") for url, key in zip(urls, keys)]
+
+
+class OfflineProvider(BaseProvider):
+    """offline モード用のプロバイダ。エンコード・デコードのみを許可し、RPC 呼び出しは即座にエラーにします"""
+
+    def make_request(self, method, params):
+        raise ConnectionError(f"Web3Utility is in offline mode: {method} is not available")
+
+    def is_connected(self, show_traceback: bool = False) -> bool:
+        return False
+
+
+def build_web3(rpc_url: Union[str, Sequence[str]],
+               rpc_key: Union[str, Sequence[str]],
+               chain: str,
+               provider_config: dict = None,
+               offline: bool = False) -> Web3:
+    """接続先の数に応じたプロバイダで Web3 を作ります（offline=True なら RPC を使わないプロバイダ）"""
+    if offline:
+        return Web3(OfflineProvider())
+    full_rpc_urls = endpoint_urls(rpc_url, rpc_key, chain)
+    if len(full_rpc_urls) > 1:
+        w3 = Web3(RoutingHTTPProvider(full_rpc_urls, provider_config))
+    else:
+        w3 = Web3(PooledHTTPProvider(full_rpc_urls[0], provider_config))
+    w3.middleware_onion.add(
+        construct_simple_cache_middleware(rpc_whitelist=STATIC_RPC_METHODS), name="static_rpc_cache"
+    )
+    return w3
+
 """
 Web3Utility クラス
 
@@ -28,46 +117,238 @@ Web3Utility クラス
 """
 
 class Web3Utility:
+    # enable_metrics() で計測する公開メソッド（サブクラスで追加する）
+    INSTRUMENTED_METHODS = (
+        "simple_slippage",
+        "simple_slippage_batch",
+        "get_block_gas_fees",
+        "estimate_gas_limit",
+        "estimate_calldata_gas",
+        "estimate_gas_batch",
+        "send_multiple_tx",
+        "sign_transactions",
+        "get_pool_metadata",
+        "get_tokens_metadata",
+        "get_token_info",
+        "execute_calls",
+        "batch_call",
+        "batch_eth_calls",
+        "rpc_batch",
+        "prefetch_tx_context",
+        "get_nonce",
+    )
+
     def __init__(self, 
                  rpc_url: str = None, 
                  rpc_key: str = None,
                  chain: str = None, 
                  contract_address: str = None,
                  abi: list[dict] = None,
-                 user_address: str = None):
+                 user_address: str = None,
+                 metadata_db: str = None,
+                 lazy: bool = False,
+                 offline: bool = False,
+                 provider_config: dict = None):
+        """
+        lazy=True: ガス料金・接続確認・chain id は初回使用時に取得してメモ化します（コンストラクタで RPC を呼ばない）
+        offline=True: RPC を一切使わず、エンコード・デコード専用として初期化します（lazy を含む）
+        provider_config: HTTP セッションの設定（pool_maxsize、timeout、max_batch_size など。rpc_provider.DEFAULT_PROVIDER_CONFIG を上書き）
+        rpc_url / rpc_key にリストを渡すと複数エンドポイントを RoutingHTTPProvider で振り分けます（ヘッジ等の設定も provider_config）
+        """
         try:
-            full_rpc_url = rpc_url.replace("choice_chain", chain) + rpc_key
-            self.w3 = Web3(Web3.HTTPProvider(full_rpc_url))
+            self.offline = offline
+            self.lazy = lazy or offline
+            self.w3 = build_web3(rpc_url, rpc_key, chain, provider_config, offline)
+            self.session = None
+            self.chain = chain
             self.target_contract = self.w3.to_checksum_address(contract_address)
             self.abi = abi
-            self.user_address = self.w3.to_checksum_address(user_address)
+            self.user_address = self.w3.to_checksum_address(user_address) if user_address else None
             self.contract = self.w3.eth.contract(address=self.target_contract, abi=abi)
+            self.gas_oracle = GasOracle()
+            self.gas_estimates = GasEstimateCache()
+            self._init_state()
+            self.metadata_cache = MetadataCache(metadata_db)
+            self.nonce_manager = NonceManager()
+            if self.lazy:
+                return
+
             self.gas_fees = self.get_block_gas_fees()
-            self.token_contract = None
-            self.approve_tx = None
-            
             if (self.w3.is_address(self.target_contract) 
                 and self.w3.is_address(self.user_address) 
-                and self.w3.is_connected()):
+                and self.is_connected()):
                 print("Web3Utility initialized successfully.")
             else:    
                 raise ConnectionError("Initialization failed. Check your parameters.")    
         except Exception as e:
             print(f"Input argument error for Web3Utility: {e}")
 
+    def _init_state(self) -> None:
+        self._gas_fees = None
+        self._connected = None
+        self.token_contract = None
+        self.approve_tx = None
+        self.multicall_contract = None
+        self.call_queue = []
+        self.chain_id = None
+        self._tx_template = None
+        self.tx_signer = None
+        self.metrics = None
+
+    @classmethod
+    def from_session(cls, session, contract_address: str = None, abi: list[dict] = None, user_address: str = None):
+        """
+        session_manager.ChainSession の接続・GasOracle・MetadataCache・NonceManager を共有する軽量なインスタンスを返します
+        （接続の作成・RPC 呼び出しは行わない。lazy=True と同じく必要になった時点で取得します）
+        """
+        self = cls.__new__(cls)
+        self._bind_session(session, contract_address, abi, user_address)
+        return self
+
+    def _bind_session(self, session, contract_address: str, abi: list[dict], user_address: str) -> None:
+        self.session = session
+        self.offline = session.offline
+        self.lazy = True
+        self.w3 = session.w3
+        self.chain = session.chain
+        self.target_contract = session.to_checksum_address(contract_address)
+        self.abi = abi
+        self.user_address = session.to_checksum_address(user_address) if user_address else None
+        self.contract = session.contract(self.target_contract, abi)
+        self.gas_oracle = session.gas_oracle
+        self.gas_estimates = session.shared("gas_estimates", GasEstimateCache)
+        self._init_state()
+        self.metadata_cache = session.metadata_cache
+        self.nonce_manager = session.nonce_manager(self.user_address)
+
+    @property
+    def gas_fees(self) -> dict:
+        if self._gas_fees is None:
+            self._gas_fees = self.get_block_gas_fees()
+        return self._gas_fees
+
+    @gas_fees.setter
+    def gas_fees(self, value: dict) -> None:
+        self._gas_fees = value
+
+    def is_connected(self) -> bool:
+        if self._connected is None:
+            self._connected = self.w3.is_connected()
+        return self._connected
+
+    def rpc_stats(self) -> dict:
+        """
+        複数エンドポイント使用時、エンドポイントごとのリクエスト数・p50・p99・エラー率を返します
+        """
+        stats = getattr(self.w3.provider, "stats", None)
+        return stats() if stats is not None else {}
+
+    def enable_metrics(self, metrics: RpcMetrics = None, sample_rate: float = 1.0, tracing: bool = False) -> RpcMetrics:
+        """
+        プロバイダと INSTRUMENTED_METHODS をラップし、RPC・公開メソッドごとの呼び出し数・レイテンシ・エラーを記録します
+        tracing=True で RPC 呼び出しを一番外側の公開メソッドに帰属させます（stats() の operation_rpc_calls）
+        同じ接続（セッション）のプロバイダがすでに計測中なら、その RpcMetrics を共有します
+        """
+        if metrics is None:
+            metrics = getattr(self.w3.provider, "rpc_metrics", None) or RpcMetrics(sample_rate, tracing)
+        self.metrics = instrument_provider(self.w3.provider, metrics)
+        instrument_methods(self, self.INSTRUMENTED_METHODS, self.metrics)
+        return self.metrics
+
+    def metrics_stats(self) -> dict:
+        """enable_metrics() 後の計測結果を返します（未計測なら空の dict）"""
+        return self.metrics.stats() if self.metrics is not None else {}
+
     def estimate_gas_limit(self, *args, function_name: str = None, value: int = None, contract: bool = True) -> int:
+        """
+        GasEstimateCache に同じ形の呼び出しの見積もり（または実績）があれば RPC を呼ばずに返します
+        返り値は見積もり値に gas_estimates.margin を掛けたガスリミットです
+        """
         if contract:
             contract_function = getattr(self.contract.functions, function_name)
         else:
             contract_function = getattr(self.token_contract.functions, function_name)
         try:
-            if value is not None:
-                estimated_gas = contract_function(*args).estimate_gas({"from": self.user_address, "value": value})
-            else:    
-                estimated_gas = contract_function(*args).estimate_gas({"from": self.user_address})
-            return int(estimated_gas)
+            bound_function = contract_function(*args)
+            return self.estimate_calldata_gas(bound_function._encode_transaction_data(), bound_function.address, value)
         except Exception as e:
             print(f"Function error in estimate_gas_limit: {e}")
+            report_error(e)
+
+    def gas_key(self, to: str, calldata: str, value: Union[int, str] = None) -> tuple:
+        """
+        ガス見積もりのキャッシュキー。既定は (送信元, value, 宛先, 関数セレクタ, calldata 長) で、サブクラスで呼び出しの形に合わせて上書きします
+        送信元と value を含めるため、セッションを共有するビューや ETH を送る呼び出しで見積もりが混ざらない
+        """
+        return (self.user_address, self._gas_value(value), to, calldata[:10], len(calldata))
+
+    @staticmethod
+    def _gas_value(value: Union[int, str, None]) -> int:
+        if isinstance(value, str):
+            return int(value, 16)
+        return int(value or 0)
+
+    def estimate_calldata_gas(self, calldata: str, to: str = None, value: int = None) -> int:
+        """
+        エンコード済みの calldata のガスリミットを返します（キャッシュになければ eth_estimateGas を1回呼ぶ）
+        見積もりが失敗（revert など）した場合はエラーを表示して None を返します
+        """
+        to = to or self.target_contract
+        key = self.gas_key(to, calldata, value)
+        gas_limit = self.gas_estimates.get(key)
+        if gas_limit is not None:
+            return gas_limit
+        tx = {"from": self.user_address, "to": to, "data": calldata}
+        if value is not None:
+            tx["value"] = value
+        try:
+            return self.gas_estimates.set(key, int(self.w3.eth.estimate_gas(tx)))
+        except Exception as e:
+            print(f"Function error in estimate_calldata_gas: {e}")
+            report_error(e)
+
+    def estimate_gas_batch(self, calldatas: List[str], to: str = None, value: int = None) -> List[int]:
+        """
+        複数の calldata のガスリミットを返します。キャッシュにない形の分だけを1回の JSON-RPC バッチで見積もります（失敗は None）
+        """
+        to = to or self.target_contract
+        keys = [self.gas_key(to, calldata, value) for calldata in calldatas]
+        limits = []
+        missing = {}
+        for calldata, key in zip(calldatas, keys):
+            gas_limit = self.gas_estimates.get(key)
+            limits.append(gas_limit)
+            if gas_limit is None and key not in missing:
+                missing[key] = calldata
+        if missing:
+            batch = [("eth_estimateGas", [self._estimate_params(to, calldata, value)]) for calldata in missing.values()]
+            estimated = dict(zip(missing, self.rpc_batch(batch)))
+            for key, result in estimated.items():
+                if result is not None:
+                    estimated[key] = self.gas_estimates.set(key, int(result, 16))
+            limits = [
+                gas_limit if gas_limit is not None else estimated.get(key)
+                for gas_limit, key in zip(limits, keys)
+            ]
+        return limits
+
+    def _estimate_params(self, to: str, calldata: str, value: int = None) -> dict:
+        params = {"from": self.user_address, "to": to, "data": calldata}
+        if value is not None:
+            params["value"] = hex(value)
+        return params
+
+    def _learn_gas_used(self, txs: list, tx_receipts: list) -> None:
+        """送信に成功したトランザクションの gasUsed を、見積もり時のキーの実績として GasEstimateCache に取り込みます"""
+        for tx, tx_receipt in zip(txs, tx_receipts):
+            tx = tx.tx if isinstance(tx, SignedPayload) else tx
+            calldata = tx.get("data")
+            if not calldata or not tx.get("to") or tx_receipt["status"] != 1:
+                continue
+            if not isinstance(calldata, str):
+                calldata = self.w3.to_hex(calldata)
+            key = self.gas_key(self.w3.to_checksum_address(tx["to"]), calldata, tx.get("value"))
+            self.gas_estimates.observe(key, tx_receipt["gasUsed"])
 
     def get_block_gas_fees(self, 
                           blocks: int = 50, 
@@ -75,8 +356,34 @@ class Web3Utility:
                           percentiles: List[int] = [25, 50, 75], 
                           reward_percentile: int = 50, 
                           max_fee_multiplier: float = 2,
-                          reward_multiplier: float = 1) -> dict:
-        block_fee_data = self.w3.eth.fee_history(block_count=blocks, newest_block=newest, reward_percentiles=percentiles)
+                          reward_multiplier: float = 1,
+                          strategy: str = None) -> dict:
+        """
+        GasOracle にブロック単位でキャッシュしたガス料金を返します。新しいブロック分だけ fee_history を取得します
+        strategy に "slow" / "normal" / "fast" を指定すると reward_percentile と倍率をプリセットで上書きします
+        """
+        if strategy is not None:
+            reward_percentile = GAS_STRATEGIES[strategy]["reward_percentile"]
+            max_fee_multiplier = GAS_STRATEGIES[strategy]["max_fee_multiplier"]
+            reward_multiplier = GAS_STRATEGIES[strategy]["reward_multiplier"]
+        if newest != "latest" or blocks != self.gas_oracle.blocks or percentiles != self.gas_oracle.percentiles:
+            block_fee_data = self.w3.eth.fee_history(block_count=blocks, newest_block=newest, reward_percentiles=percentiles)
+            return self._calc_gas_fees(block_fee_data, percentiles, reward_percentile, max_fee_multiplier, reward_multiplier)
+
+        head_block = self.w3.eth.block_number
+        missing_blocks = self.gas_oracle.blocks_to_fetch(head_block)
+        if missing_blocks:
+            self.gas_oracle.update(self.w3.eth.fee_history(
+                block_count=missing_blocks, newest_block=head_block, reward_percentiles=percentiles
+            ))
+        return self.gas_oracle.fees(reward_percentile, max_fee_multiplier, reward_multiplier)
+
+    def _calc_gas_fees(self,
+                       block_fee_data: dict,
+                       percentiles: List[int],
+                       reward_percentile: int,
+                       max_fee_multiplier: float,
+                       reward_multiplier: float) -> dict:
         base_fee_avg = statistics.mean(block_fee_data["baseFeePerGas"][:-1])
         priority_fee_median = statistics.median(fee[percentiles.index(reward_percentile)] for fee in block_fee_data["reward"])
 
@@ -98,15 +405,15 @@ class Web3Utility:
         return list(decoded)
 
     def encode(self, values: List[Any], types: List[str]) -> str:
-        encoded = self.w3.codec.encode(types, values)
+        # 型の組み合わせごとにコンパイル済みのエンコーダを使う（w3.codec.encode と同じ結果）
+        encoded = compile_types(tuple(types))(values)
         hex_data = '0x' + encoded.hex()
         return hex_data
     
     def load_erc20_contract(self, contract: str = None):
-        with open("Abi/token_basics_abi.json", mode="r") as file:
-            self.basics_token_abi = json.load(file)
+        self.basics_token_abi = load_abi(ERC20_ABI_PATH)
         contract = self.w3.to_checksum_address(contract)
-        self.token_contract = self.w3.eth.contract(address=contract, abi=self.basics_token_abi)   
+        self.token_contract = cached_contract(self.w3, contract, ERC20_ABI_PATH)
         return self.token_contract 
     
     def token_approve(self,
@@ -119,12 +426,255 @@ class Web3Utility:
         return self.approve_tx 
     
     def load_pool_contract(self, contract: str = None):
-        with open("Dapps/UniswapAbi/UniswapV3_pool_abi.json", mode="r") as file:
-            self.uniV3_pool_abi = json.load(file)
+        self.uniV3_pool_abi = load_abi(UNISWAP_V3_POOL_ABI_PATH)
         contract = self.w3.to_checksum_address(contract)
-        self.pool_contract = self.w3.eth.contract(address=contract, abi=self.uniV3_pool_abi)
+        self.pool_contract = cached_contract(self.w3, contract, UNISWAP_V3_POOL_ABI_PATH)
         return self.pool_contract
     
+    def load_multicall_contract(self):
+        if self.multicall_contract is None:
+            self.multicall_abi = load_abi(MULTICALL3_ABI_PATH)
+            self.multicall_contract = cached_contract(
+                self.w3, self.w3.to_checksum_address(MULTICALL3_ADDRESS), MULTICALL3_ABI_PATH
+            )
+        return self.multicall_contract
+
+    def add_call(self, contract_function, allow_failure: bool = True) -> int:
+        """
+        コントラクト関数呼び出し（例: pool.functions.slot0()）をキューに追加し、キュー内のインデックスを返します
+        """
+        self.call_queue.append(self._call_entry(contract_function, allow_failure))
+        return len(self.call_queue) - 1
+
+    def _call_entry(self, contract_function, allow_failure: bool) -> dict:
+        return {
+            "target": contract_function.address,
+            "allowFailure": allow_failure,
+            "callData": contract_function._encode_transaction_data(),
+            "output_types": self._abi_types(contract_function.abi.get("outputs", [])),
+        }
+
+    def execute_calls(self, block_identifier: Union[str, int] = "latest") -> List[Any]:
+        """
+        キューに溜めた呼び出しを Multicall3 の aggregate3 で1回の eth_call として送信し、
+        キュー順にデコード済みの値を返します（失敗した呼び出しは None）
+        """
+        queue, self.call_queue = self.call_queue, []
+        return self._aggregate(queue, block_identifier)
+
+    def batch_call(self,
+                   contract_functions: list,
+                   allow_failure: bool = True,
+                   block_identifier: Union[str, int] = "latest") -> List[Any]:
+        queue = [self._call_entry(contract_function, allow_failure) for contract_function in contract_functions]
+        return self._aggregate(queue, block_identifier)
+
+    def _aggregate(self, queue: List[dict], block_identifier: Union[str, int] = "latest") -> List[Any]:
+        if not queue:
+            return []
+        calls = [(call["target"], call["allowFailure"], call["callData"]) for call in queue]
+        results = self.load_multicall_contract().functions.aggregate3(calls).call(
+            block_identifier=block_identifier
+        )
+        return self._decode_call_results(queue, results)
+
+    def _decode_call_results(self, queue: List[dict], results: List[Any]) -> List[Any]:
+        decoded_results = []
+        for call, (success, return_data) in zip(queue, results):
+            if not success or (not return_data and call["output_types"]):
+                decoded_results.append(None)
+                continue
+            values = [
+                self.w3.to_checksum_address(value) if abi_type == "address" else value
+                for abi_type, value in zip(call["output_types"], self.decode(return_data, call["output_types"]))
+            ]
+            decoded_results.append(values[0] if len(values) == 1 else values)
+        return decoded_results
+
+    def _abi_types(self, params: List[dict]) -> List[str]:
+        types = []
+        for param in params:
+            abi_type = param["type"]
+            if abi_type.startswith("tuple"):
+                abi_type = "(" + ",".join(self._abi_types(param["components"])) + ")" + abi_type[len("tuple"):]
+            types.append(abi_type)
+        return types
+
+    def rpc_batch(self, batch: List[tuple]) -> List[Any]:
+        """
+        [(method, params), ...] を1回の JSON-RPC 配列リクエストで送信し、順番通りに生の結果を返します（エラーの要素は None）
+        バッチ非対応のプロバイダでは1件ずつ送信します
+        """
+        return self._batch_results(batch, self.rpc_batch_responses(batch))
+
+    def rpc_batch_responses(self, batch: List[tuple]) -> List[dict]:
+        """
+        rpc_batch と同じ送信を行い、error を含む生の JSON-RPC 応答を返します（revert データの取得などに使う）
+        """
+        provider = self.w3.provider
+        if hasattr(provider, "make_batch_request"):
+            return provider.make_batch_request(batch)
+        return [provider.make_request(method, params) for method, params in batch]
+
+    def _batch_results(self, batch: List[tuple], responses: List[dict]) -> List[Any]:
+        results = []
+        for (method, _), response in zip(batch, responses):
+            if "error" in response:
+                print(f"Error in rpc_batch ({method}): {response['error']}")
+                results.append(None)
+            else:
+                results.append(response.get("result"))
+        return results
+
+    def batch_eth_calls(self,
+                        contract_functions: list,
+                        block_identifier: Union[str, int] = "latest") -> List[Any]:
+        """
+        複数の eth_call を Multicall3 を使わずに1回の JSON-RPC バッチで送信し、デコード済みの値を返します（失敗した呼び出しは None）
+        """
+        queue, batch = self._eth_call_batch(contract_functions, block_identifier)
+        return self._decode_eth_call_results(queue, self.rpc_batch(batch))
+
+    def _eth_call_batch(self, contract_functions: list, block_identifier: Union[str, int]) -> tuple:
+        block = hex(block_identifier) if isinstance(block_identifier, int) else block_identifier
+        queue = [self._call_entry(contract_function, True) for contract_function in contract_functions]
+        batch = [("eth_call", [{"to": call["target"], "data": call["callData"]}, block]) for call in queue]
+        return queue, batch
+
+    def _decode_eth_call_results(self, queue: List[dict], results: List[Any]) -> List[Any]:
+        return self._decode_call_results(
+            queue,
+            [(result is not None, self.w3.to_bytes(hexstr=result) if result else b"") for result in results]
+        )
+
+    def prefetch_tx_context(self, blocks: int = 50) -> dict:
+        """
+        chain id・最新ブロック・fee_history・pending nonce を1回の JSON-RPC バッチで取得し、
+        chain id のメモ化、GasOracle の更新、NonceManager の初期化をまとめて行います
+        """
+        batch = self._tx_context_batch(blocks)
+        return self._apply_tx_context(batch, self.rpc_batch(batch))
+
+    def _tx_context_batch(self, blocks: int) -> List[tuple]:
+        batch = [
+            ("eth_chainId", []),
+            ("eth_blockNumber", []),
+            ("eth_feeHistory", [hex(blocks), "latest", self.gas_oracle.percentiles]),
+        ]
+        if self.user_address and self.nonce_manager.peek() is None:
+            batch.append(("eth_getTransactionCount", [self.user_address, "pending"]))
+        return batch
+
+    def _apply_tx_context(self, batch: List[tuple], results: List[Any]) -> dict:
+        context = dict(zip((method for method, _ in batch), results))
+        if context["eth_chainId"] is not None and self.chain_id is None:
+            self.chain_id = self._verify_chain_id(int(context["eth_chainId"], 16))
+        fee_history = context["eth_feeHistory"]
+        if fee_history is not None:
+            self.gas_oracle.update({
+                "oldestBlock": int(fee_history["oldestBlock"], 16),
+                "baseFeePerGas": [int(base_fee, 16) for base_fee in fee_history["baseFeePerGas"]],
+                "reward": [[int(reward, 16) for reward in rewards] for rewards in fee_history["reward"]],
+            })
+            self.gas_fees = self.gas_oracle.fees()
+        if context.get("eth_getTransactionCount") is not None:
+            self.nonce_manager.prime(int(context["eth_getTransactionCount"], 16))
+        return {
+            "chain_id": self.chain_id,
+            "block_number": int(context["eth_blockNumber"], 16) if context["eth_blockNumber"] else None,
+            "gas_fees": self._gas_fees,
+            "nonce": self.nonce_manager.peek(),
+        }
+
+    def get_chain_id(self) -> int:
+        """
+        chain id を1回だけ取得し、chain 引数から想定される値と一致するか確認してからメモ化します
+        """
+        if self.chain_id is None:
+            self.chain_id = self._verify_chain_id(self.w3.eth.chain_id)
+        return self.chain_id
+
+    def _verify_chain_id(self, chain_id: int) -> int:
+        expected_chain_id = CHAIN_IDS.get(self.chain)
+        if expected_chain_id is not None and chain_id != expected_chain_id:
+            raise ValueError(f"Connected to chain id {chain_id}, but chain '{self.chain}' is {expected_chain_id}")
+        return chain_id
+
+    def tx_template(self) -> dict:
+        """
+        トランザクションの静的なフィールド（from、type、chainId）を1回だけ組み立てて再利用します
+        """
+        if self._tx_template is None:
+            self._tx_template = {
+                'from': self.user_address,
+                'type': '0x2',
+                'chainId': self.get_chain_id(),
+            }
+        return self._tx_template
+
+    def get_tokens_metadata(self, token_addresses: List[str]) -> Dict[str, dict]:
+        """
+        トークンの不変情報（name、symbol、decimals）を返します。キャッシュにないものだけを1回の multicall で取得します
+        """
+        chain_id = self.get_chain_id()
+        tokens = [self.w3.to_checksum_address(token) for token in token_addresses]
+        metadata = {token: self.metadata_cache.get(chain_id, token) for token in tokens}
+
+        missing = [token for token, data in metadata.items() if data is None]
+        if missing:
+            results = self.batch_call(self._token_metadata_calls(missing))
+            fetched = self._parse_token_metadata(missing, results)
+            self.metadata_cache.set_many(chain_id, fetched)
+            metadata.update(fetched)
+        return metadata
+
+    def _token_metadata_calls(self, tokens: List[str]) -> list:
+        calls = []
+        for token in tokens:
+            contract = cached_contract(self.w3, token, ERC20_ABI_PATH)
+            calls += [contract.functions.name(), contract.functions.symbol(), contract.functions.decimals()]
+        return calls
+
+    def _parse_token_metadata(self, tokens: List[str], results: List[Any]) -> Dict[str, dict]:
+        fetched = {}
+        for index, token in enumerate(tokens):
+            name, symbol, decimals = results[index * 3:index * 3 + 3]
+            if decimals is None:
+                raise ValueError(f"decimals() failed for token {token}")
+            fetched[token] = {"name": name, "symbol": symbol, "decimals": decimals}
+        return fetched
+
+    def get_token_metadata(self, token_address: str) -> dict:
+        return next(iter(self.get_tokens_metadata([token_address]).values()))
+
+    def get_pool_metadata(self, pool_address: str) -> dict:
+        """
+        プールの不変情報（token0、token1、fee と各トークンの decimals）を返します
+        """
+        chain_id = self.get_chain_id()
+        pool_address = self.w3.to_checksum_address(pool_address)
+        metadata = self.metadata_cache.get(chain_id, pool_address)
+        if metadata is None:
+            pool = self.load_pool_contract(pool_address)
+            token0, token1, fee = self.batch_call([
+                pool.functions.token0(),
+                pool.functions.token1(),
+                pool.functions.fee(),
+            ], allow_failure=False)
+            tokens = self.get_tokens_metadata([token0, token1])
+            metadata = self._build_pool_metadata(token0, token1, fee, tokens)
+            self.metadata_cache.set(chain_id, pool_address, metadata)
+        return metadata
+
+    def _build_pool_metadata(self, token0: str, token1: str, fee: int, tokens: Dict[str, dict]) -> dict:
+        return {
+            "token0": token0,
+            "token1": token1,
+            "fee": fee,
+            "decimals0": tokens[token0]["decimals"],
+            "decimals1": tokens[token1]["decimals"],
+        }
+
     def simple_slippage(self,
                        pool_address: str = None,
                        path: bool = True,
@@ -132,109 +682,310 @@ class Web3Utility:
                        slippage_percent: float = 0.5) -> dict:
         try:
             pool = self.load_pool_contract(pool_address)
+            pool_metadata = self.get_pool_metadata(pool_address)
             
             slot0_info = pool.functions.slot0().call()
-            sqrt_price = Decimal(slot0_info[0]) / Decimal(2 ** 96)
-            price = sqrt_price * sqrt_price
-            
-            token0 = pool.functions.token0().call()
-            token1 = pool.functions.token1().call()
-            decimal0 = self.load_erc20_contract(token0).functions.decimals().call()
-            decimal1 = self.load_erc20_contract(token1).functions.decimals().call()
-            
-            price = price * Decimal(10 ** (decimal0 - decimal1))
-           
-            if path:
-                actual_price = price
-                decimals_out = decimal1
-                amount_in = amount_in / (10 ** decimal0)
-            else:
-                actual_price = Decimal(1) / price
-                decimals_out = decimal0
-                amount_in = amount_in / (10 ** decimal1) 
-
-            if amount_in != 0:
-                amount_out = Decimal(actual_price) * Decimal(amount_in)
-                min_amount = amount_out * Decimal((100 - slippage_percent)) / 100
-                min_amount_decimal = int(min_amount * (10 ** decimals_out))
-            else:
-                amount_out = Decimal(actual_price)
-                min_amount = actual_price * Decimal((100 - slippage_percent)) / 100
-                min_amount_decimal = int(min_amount * (10 ** decimals_out))
-
-            return {
-                "min_amount_out": min_amount_decimal,
-                "amount_out": float(amount_out),
-                "min_actual_amount": float(min_amount),
-                "token0": token0,
-                "token1": token1,
-                "current_tick": slot0_info[1],
-                "sqrt_price_x96": slot0_info[0],
-                "decimals_out": decimals_out
-            }
+            return self._calc_slippage(slot0_info, pool_metadata, path, amount_in, slippage_percent)
         except Exception as e:
             print(f"Error in simple_slippage: {e}")
+            report_error(e)
             return None
     
+    def _calc_slippage(self,
+                       slot0_info: list,
+                       pool_metadata: dict,
+                       path: bool,
+                       amount_in: int,
+                       slippage_percent: float) -> dict:
+        sqrt_price = Decimal(slot0_info[0]) / Decimal(2 ** 96)
+        price = sqrt_price * sqrt_price
+
+        token0 = pool_metadata["token0"]
+        token1 = pool_metadata["token1"]
+        decimal0 = pool_metadata["decimals0"]
+        decimal1 = pool_metadata["decimals1"]
+        
+        price = price * Decimal(10 ** (decimal0 - decimal1))
+       
+        if path:
+            actual_price = price
+            decimals_out = decimal1
+            amount_in = amount_in / (10 ** decimal0)
+        else:
+            actual_price = Decimal(1) / price
+            decimals_out = decimal0
+            amount_in = amount_in / (10 ** decimal1) 
+
+        if amount_in != 0:
+            amount_out = Decimal(actual_price) * Decimal(amount_in)
+            min_amount = amount_out * Decimal((100 - slippage_percent)) / 100
+            min_amount_decimal = int(min_amount * (10 ** decimals_out))
+        else:
+            amount_out = Decimal(actual_price)
+            min_amount = actual_price * Decimal((100 - slippage_percent)) / 100
+            min_amount_decimal = int(min_amount * (10 ** decimals_out))
+
+        return {
+            "min_amount_out": min_amount_decimal,
+            "amount_out": float(amount_out),
+            "min_actual_amount": float(min_amount),
+            "token0": token0,
+            "token1": token1,
+            "current_tick": slot0_info[1],
+            "sqrt_price_x96": slot0_info[0],
+            "decimals_out": decimals_out
+        }
+
+    def simple_slippage_batch(self,
+                              pool_address: str = None,
+                              path: bool = True,
+                              amounts_in: Sequence[int] = (),
+                              slippage_percent: float = 0.5,
+                              exact: bool = False) -> dict:
+        """
+        slot0 を1回だけ取得し（メタデータはキャッシュ）、複数の amount_in をまとめて NumPy で見積もります
+        exact=True の場合、決済用に整数演算で求めた min_amount_out も返します
+        """
+        try:
+            pool = self.load_pool_contract(pool_address)
+            pool_metadata = self.get_pool_metadata(pool_address)
+            slot0_info = pool.functions.slot0().call()
+            return self._calc_slippage_batch(slot0_info, pool_metadata, path, amounts_in, slippage_percent, exact)
+        except Exception as e:
+            print(f"Error in simple_slippage_batch: {e}")
+            report_error(e)
+            return None
+
+    def _calc_slippage_batch(self,
+                             slot0_info: list,
+                             pool_metadata: dict,
+                             path: bool,
+                             amounts_in: Sequence[int],
+                             slippage_percent: float,
+                             exact: bool = False) -> dict:
+        decimal0 = pool_metadata["decimals0"]
+        decimal1 = pool_metadata["decimals1"]
+        price = (slot0_info[0] / 2 ** 96) ** 2 * 10.0 ** (decimal0 - decimal1)
+        if path:
+            actual_price = price
+            decimals_in, decimals_out = decimal0, decimal1
+        else:
+            actual_price = 1 / price
+            decimals_in, decimals_out = decimal1, decimal0
+
+        amounts = np.asarray(amounts_in, dtype=np.float64)
+        amount_out = amounts / 10.0 ** decimals_in * actual_price
+        min_actual_amount = amount_out * (100 - slippage_percent) / 100
+        result = {
+            "amount_in": amounts,
+            "amount_out": amount_out,
+            "min_actual_amount": min_actual_amount,
+            "min_amount_out": np.floor(min_actual_amount * 10.0 ** decimals_out),
+            "price": np.full(amounts.shape, actual_price),
+            "token0": pool_metadata["token0"],
+            "token1": pool_metadata["token1"],
+            "current_tick": slot0_info[1],
+            "sqrt_price_x96": slot0_info[0],
+            "decimals_out": decimals_out,
+        }
+        if exact:
+            result["min_amount_out_exact"] = np.array(
+                [self.exact_min_amount_out(slot0_info[0], path, int(amount), slippage_percent) for amount in amounts_in],
+                dtype=object
+            )
+        return result
+
+    @staticmethod
+    def exact_min_amount_out(sqrt_price_x96: int, path: bool, amount_in: int, slippage_percent: float) -> int:
+        """
+        スポット価格による min_amount_out を整数演算のみで求めます（float の丸め誤差なしの決済用の値）
+        """
+        tolerance = (100 - Fraction(str(slippage_percent))) / 100
+        if path:
+            amount_out = Fraction(amount_in * sqrt_price_x96 ** 2, 2 ** 192)
+        else:
+            amount_out = Fraction(amount_in * 2 ** 192, sqrt_price_x96 ** 2)
+        return int(amount_out * tolerance)
+
     def build_tx_params(self, 
                        gas_limit: int = 21000,
                        value: int = 0,
                        extra_params: dict = None) -> dict:          
-        tx_data = {
-            'from': self.user_address,
+        tx_data = dict(self.tx_template())
+        tx_data.update({
             'gas': gas_limit,
             'maxFeePerGas': self.gas_fees['maxFeePerGas'],
             'maxPriorityFeePerGas': self.gas_fees['priorityFeePerGasMedian'],
-            'nonce': self.w3.eth.get_transaction_count(self.user_address),
+            'nonce': self.get_nonce(),
             'value': value,
-            'type': '0x2',
-            'chainId': self.w3.eth.chain_id,
-        }
+        })
         if extra_params:
             tx_data.update(extra_params)
         return tx_data
     
-    def send_multiple_tx(self, txs: list, private_key: str, basicGas: bool = True):
+    def get_nonce(self) -> int:
+        """
+        NonceManager からローカルに nonce を払い出します（初回のみノードの pending nonce を取得）
+        """
+        return self.nonce_manager.next_nonce(
+            lambda: self.w3.eth.get_transaction_count(self.user_address, "pending")
+        )
+
+    def get_tx_signer(self, private_key: str, workers: int = None) -> TxSigner:
+        """
+        秘密鍵ごとの TxSigner を返します（ワーカープールと署名済みキャッシュを使い回す）
+        """
+        if self.tx_signer is None or not self.tx_signer.matches(private_key):
+            if self.tx_signer is not None:
+                self.tx_signer.close()
+            self.tx_signer = TxSigner(private_key, workers=workers)
+        return self.tx_signer
+
+    def sign_transactions(self, txs: list, private_key: str, basicGas: bool = True, workers: int = None) -> List[SignedPayload]:
+        """
+        nonce とガス料金を埋めたうえで、ワーカープールでまとめて署名します
+        戻り値の SignedPayload を send_multiple_tx に渡すと、送信時には署名処理を行いません
+        """
+        gasfees = self.get_block_gas_fees() if basicGas else None
+        for tx in txs:
+            if "nonce" not in tx:
+                tx["nonce"] = self.get_nonce()
+            if gasfees:
+                tx["maxFeePerGas"] = gasfees["maxFeePerGas"]
+                tx["maxPriorityFeePerGas"] = gasfees["priorityFeePerGasMedian"]
+        return self.get_tx_signer(private_key, workers).sign_many(txs)
+
+    def send_multiple_tx(self, txs: list, private_key: str = None, basicGas: bool = True, pipeline: bool = False):
+        """
+        pipeline=True の場合、全トランザクションを連続して署名・送信した後にレシートをまとめて並行に待ちます
+        txs に sign_transactions の SignedPayload を含めると、その分は署名済みのまま送信します（private_key は不要）
+        """
+        if pipeline:
+            return self._send_pipelined_tx(txs, private_key, basicGas)
         for i, tx in enumerate(txs):
             try:
                 print(f"\nExecuting transaction {i+1}/{len(txs)}")
-                tx["nonce"] = self.w3.eth._get_transaction_count(self.user_address)
-                if basicGas:
-                    gasfees = self.get_block_gas_fees()
-                    tx["maxFeePerGas"] = gasfees["maxFeePerGas"]
-                    tx["maxPriorityFeePerGas"] = gasfees["priorityFeePerGasMedian"]
-                signed_tx = self.w3.eth.account.sign_transaction(tx, private_key)
-                tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
+                if isinstance(tx, SignedPayload):
+                    tx_hash = self._send_signed(tx)
+                else:
+                    if "nonce" not in tx:
+                        tx["nonce"] = self.get_nonce()
+                    if basicGas:
+                        gasfees = self.get_block_gas_fees()
+                        tx["maxFeePerGas"] = gasfees["maxFeePerGas"]
+                        tx["maxPriorityFeePerGas"] = gasfees["priorityFeePerGasMedian"]
+                    tx_hash = self._sign_and_send(tx, private_key)
                 print(f"Transaction Hash: {tx_hash.hex()}")
                 
                 tx_receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
                 
                 if tx_receipt['status'] == 1:
                     print(f"Transaction {i+1} successful!")
+                    self._learn_gas_used([tx], [tx_receipt])
                     continue  
                 else:
                     print(f"Transaction {i+1} failed!")
+                    # 残りのトランザクションに払い出し済みの nonce は欠番になるため、次回はノードの値から払い出す
+                    self.nonce_manager.resync()
                     return False  
                     
             except Exception as e:
                 print(f"Transaction {i+1} Error: {e}")
+                report_error(e)
+                self.nonce_manager.resync()
                 return False
         print("All transactions completed successfully!")               
         return True 
 
+    def _sign_and_send(self, tx: dict, private_key: str):
+        try:
+            signed_tx = self.w3.eth.account.sign_transaction(tx, private_key)
+            return self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
+        except Exception as e:
+            if not NonceManager.is_nonce_error(e):
+                raise
+            print(f"Nonce error ({e}), resyncing nonce and retrying")
+            self.nonce_manager.resync()
+            tx["nonce"] = self.get_nonce()
+            signed_tx = self.w3.eth.account.sign_transaction(tx, private_key)
+            return self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
+
+    def _send_signed(self, payload: SignedPayload):
+        try:
+            return self.w3.eth.send_raw_transaction(payload.raw_transaction)
+        except Exception as e:
+            # 署名済みのため nonce を振り直せない。以降の払い出しはノードの値に合わせる
+            if NonceManager.is_nonce_error(e):
+                self.nonce_manager.resync()
+            raise
+
+    def _send_pipelined_tx(self, txs: list, private_key: str, basicGas: bool = True) -> bool:
+        has_unsigned = any(not isinstance(tx, SignedPayload) for tx in txs)
+        gasfees = self.get_block_gas_fees() if basicGas and has_unsigned else None
+        tx_hashes = []
+        for i, tx in enumerate(txs):
+            try:
+                if isinstance(tx, SignedPayload):
+                    tx_hash = self._send_signed(tx)
+                else:
+                    if "nonce" not in tx:
+                        tx["nonce"] = self.get_nonce()
+                    if gasfees:
+                        tx["maxFeePerGas"] = gasfees["maxFeePerGas"]
+                        tx["maxPriorityFeePerGas"] = gasfees["priorityFeePerGasMedian"]
+                    tx_hash = self._sign_and_send(tx, private_key)
+                print(f"Transaction {i+1}/{len(txs)} Hash: {tx_hash.hex()}")
+                tx_hashes.append(tx_hash)
+            except Exception as e:
+                # 以降の nonce は欠番になるため送信を打ち切り、次回はノードの値から払い出す
+                print(f"Transaction {i+1} Error: {e}")
+                report_error(e)
+                self.nonce_manager.resync()
+                break
+
+        if not tx_hashes:
+            return False
+        try:
+            with ThreadPoolExecutor(max_workers=len(tx_hashes)) as executor:
+                tx_receipts = list(executor.map(self.w3.eth.wait_for_transaction_receipt, tx_hashes))
+        except Exception as e:
+            print(f"Error waiting for receipts: {e}")
+            report_error(e)
+            return False
+        return self._report_receipts(tx_receipts, txs)
+
+    def _report_receipts(self, tx_receipts: list, txs: list) -> bool:
+        self._learn_gas_used(txs, tx_receipts)
+        success = len(tx_receipts) == len(txs)
+        for i, tx_receipt in enumerate(tx_receipts):
+            if tx_receipt['status'] == 1:
+                print(f"Transaction {i+1} successful!")
+            else:
+                print(f"Transaction {i+1} failed!")
+                success = False
+        if success:
+            print("All transactions completed successfully!")
+        return success
+
     def get_token_info(self, token_address: str) -> dict:
         """
         トークンの基本情報（名前、シンボル、デシマル、総供給量、ユーザー残高）を取得します
         """
         token = self.load_erc20_contract(token_address)
         try:
+            metadata = self.get_token_metadata(token_address)
+            total_supply, balance = self.batch_call([
+                token.functions.totalSupply(),
+                token.functions.balanceOf(self.user_address),
+            ], allow_failure=False)
             return {
-                'name': token.functions.name().call(),
-                'symbol': token.functions.symbol().call(),
-                'decimals': token.functions.decimals().call(),
-                'total_supply': token.functions.totalSupply().call(),
-                'balance': token.functions.balanceOf(self.user_address).call()
+                'name': metadata['name'],
+                'symbol': metadata['symbol'],
+                'decimals': metadata['decimals'],
+                'total_supply': total_supply,
+                'balance': balance
             }
         except Exception as e:
             print(f"Error getting token info: {e}")
+            report_error(e)
             return None
\ No newline at end of file